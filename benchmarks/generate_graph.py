@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Synthetic linked-data graph generator for the LDR benchmarks.
+
+Writes a tree of JSON-LD documents linked by URL, plus back-links that form
+cycles, to a directory. Documents are addressed as http://bench.ldr/graph/...
+and reached through a mapping to the local files, so no network is involved.
+
+Usage:
+    python benchmarks/generate_graph.py OUT_DIR [--fan-out 4] [--depth 3] ...
+"""
+
+import argparse
+import json
+import os
+import random
+import string
+from typing import Dict, Any, List
+
+BASE_URL = "http://bench.ldr/graph/"
+
+
+def _context(index: int) -> Dict[str, Any]:
+    vocab = f"{BASE_URL}vocab-{index}#"
+    return {
+        "@context": {
+            "@vocab": vocab,
+            "name": "http://schema.org/name",
+            "description": "http://schema.org/description",
+            "children": {"@id": f"{vocab}children", "@type": "@id"},
+            "seeAlso": {"@id": "http://www.w3.org/2000/01/rdf-schema#seeAlso", "@type": "@id"},
+        }
+    }
+
+
+def _text(rng: random.Random, size: int) -> str:
+    words = []
+    length = 0
+    while length < size:
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10)))
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:size]
+
+
+def generate_graph(
+    out_dir: str,
+    fan_out: int = 4,
+    depth: int = 3,
+    cycle_density: float = 0.1,
+    contexts: int = 1,
+    doc_size: int = 512,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Generate a synthetic graph and return its manifest (also written to
+    OUT_DIR/manifest.json).
+
+    Args:
+        out_dir: Directory for the documents (created if needed)
+        fan_out: Children linked from every non-leaf document
+        depth: Levels below the root document
+        cycle_density: Chance that a document also links back to one of its ancestors
+        contexts: Number of distinct context documents shared by the documents
+        doc_size: Approximate bytes of literal text in each document
+        seed: Random seed; the same arguments always produce the same files
+
+    Returns:
+        Manifest with the arguments, root URL, all document URLs, the mappings
+        that reach the files, and document/link/byte counts
+    """
+    if fan_out < 1 or depth < 0 or contexts < 1:
+        raise ValueError("fan_out and contexts must be >= 1 and depth >= 0")
+
+    rng = random.Random(seed)
+    out_dir = os.path.abspath(out_dir)
+    os.makedirs(out_dir, exist_ok=True)
+
+    for index in range(contexts):
+        with open(os.path.join(out_dir, f"ctx-{index}.jsonld"), "w") as f:
+            json.dump(_context(index), f)
+
+    # Breadth-first numbering: document n has children n*fan_out+1 .. n*fan_out+fan_out
+    count = sum(fan_out**level for level in range(depth + 1))
+    leaves_from = count - fan_out**depth
+    urls: List[str] = [f"{BASE_URL}doc-{n}.jsonld" for n in range(count)]
+
+    links = 0
+    cycles = 0
+    total_bytes = 0
+    for n in range(count):
+        doc: Dict[str, Any] = {
+            "@context": f"{BASE_URL}ctx-{n % contexts}.jsonld",
+            "@id": urls[n],
+            "@type": "Node",
+            "name": f"Node {n}",
+            "description": _text(rng, doc_size),
+        }
+        if n < leaves_from:
+            doc["children"] = urls[n * fan_out + 1 : (n + 1) * fan_out + 1]
+            links += fan_out
+        if n > 0 and rng.random() < cycle_density:
+            ancestors = []
+            parent = n
+            while parent > 0:
+                parent = (parent - 1) // fan_out
+                ancestors.append(parent)
+            doc["seeAlso"] = urls[rng.choice(ancestors)]
+            links += 1
+            cycles += 1
+
+        data = json.dumps(doc, indent=2)
+        total_bytes += len(data)
+        with open(os.path.join(out_dir, f"doc-{n}.jsonld"), "w") as f:
+            f.write(data)
+
+    manifest = {
+        "params": {
+            "fan_out": fan_out,
+            "depth": depth,
+            "cycle_density": cycle_density,
+            "contexts": contexts,
+            "doc_size": doc_size,
+            "seed": seed,
+        },
+        "root": urls[0],
+        "urls": urls,
+        "mappings": {f"{BASE_URL}*": f"{out_dir}/${{rest}}"},
+        "documents": count,
+        "links": links,
+        "cycles": cycles,
+        "bytes": total_bytes,
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def add_graph_arguments(parser: argparse.ArgumentParser):
+    """Graph shape options shared with run_benchmarks.py."""
+    parser.add_argument("--fan-out", type=int, default=4, help="Children per document (default: 4)")
+    parser.add_argument("--depth", type=int, default=3, help="Levels below the root (default: 3)")
+    parser.add_argument(
+        "--cycle-density",
+        type=float,
+        default=0.1,
+        help="Chance of a back-link to an ancestor per document (default: 0.1)",
+    )
+    parser.add_argument(
+        "--contexts", type=int, default=1, help="Shared context documents (default: 1)"
+    )
+    parser.add_argument(
+        "--doc-size", type=int, default=512, help="Literal bytes per document (default: 512)"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+
+
+def graph_kwargs(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "fan_out": args.fan_out,
+        "depth": args.depth,
+        "cycle_density": args.cycle_density,
+        "contexts": args.contexts,
+        "doc_size": args.doc_size,
+        "seed": args.seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic JSON-LD graph")
+    parser.add_argument("out_dir", help="Directory to write the documents to")
+    add_graph_arguments(parser)
+    args = parser.parse_args()
+
+    manifest = generate_graph(args.out_dir, **graph_kwargs(args))
+    print(
+        f"Wrote {manifest['documents']} documents ({manifest['bytes']} bytes, "
+        f"{manifest['links']} links, {manifest['cycles']} cycles) "
+        f"to {os.path.abspath(args.out_dir)}"
+    )
+    print(f"Root: {manifest['root']}")
+
+
+if __name__ == "__main__":
+    main()
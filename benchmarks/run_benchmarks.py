@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for expand, compact and batch through LdrClient.
+
+Generates a synthetic graph (see generate_graph.py), starts a private server
+on a Unix domain socket (or uses --url), and times each scenario with a cold
+cache (cleared before every iteration) and a warm one. Results are printed as
+a table and written as JSON; pass a previous results file as --baseline to
+compare versions.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--depth 3 --fan-out 4 ...] [--output results.json]
+    python benchmarks/run_benchmarks.py --baseline results-old.json --output results-new.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Callable
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lib import LdrClient, __version__  # noqa: E402
+from generate_graph import generate_graph, add_graph_arguments, graph_kwargs  # noqa: E402
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Linearly interpolated percentile, q in [0, 100]."""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class PeakMemory:
+    """
+    Peak resident memory of a server process, from /proc (Linux only).
+    reset() restarts the measurement so each scenario reports its own peak.
+    """
+
+    def __init__(self, pid: Optional[int]):
+        self.pid = pid
+        self.available = pid is not None and os.path.exists(f"/proc/{pid}/status")
+
+    def reset(self):
+        if not self.available:
+            return
+        try:
+            with open(f"/proc/{self.pid}/clear_refs", "w") as f:
+                f.write("5")
+        except OSError:
+            pass
+
+    def peak(self) -> Optional[int]:
+        if not self.available:
+            return None
+        with open(f"/proc/{self.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+        return None
+
+
+def client_peak_rss() -> int:
+    """Peak resident memory of this process so far, in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def clear_cache(client: LdrClient):
+    with contextlib.redirect_stdout(io.StringIO()):
+        client.cache_clear()
+
+
+def run_scenario(
+    name: str,
+    client: LdrClient,
+    memory: PeakMemory,
+    call: Callable[[], Any],
+    items: int,
+    iterations: int,
+    warmup: int,
+    cold: bool,
+) -> Dict[str, Any]:
+    """Time call() `iterations` times; items is the number of documents each call returns."""
+    for _ in range(warmup):
+        if cold:
+            clear_cache(client)
+        call()
+
+    latencies = []
+    memory.reset()
+    for _ in range(iterations):
+        if cold:
+            clear_cache(client)
+        started = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - started)
+
+    total = sum(latencies)
+    return {
+        "name": name,
+        "cache": "cold" if cold else "warm",
+        "iterations": iterations,
+        "items_per_call": items,
+        "throughput_per_s": round(iterations * items / total, 2) if total else None,
+        "latency_ms": {
+            "mean": round(total / iterations * 1000, 3),
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "min": round(min(latencies) * 1000, 3),
+            "max": round(max(latencies) * 1000, 3),
+        },
+        "server_peak_rss_bytes": memory.peak(),
+        "client_peak_rss_bytes": client_peak_rss(),
+    }
+
+
+def run_benchmarks(
+    client: LdrClient, manifest: Dict[str, Any], memory: PeakMemory, args
+) -> List[Dict[str, Any]]:
+    root = manifest["root"]
+    depth = args.expand_depth
+    batch = manifest["urls"][: args.batch_size]
+
+    scenarios = [
+        ("expand", 1, lambda: client.expand(root, depth=depth, verbose=False)),
+        ("compact", 1, lambda: client.compact(root, depth=depth, verbose=False)),
+        ("batch", len(batch), lambda: client.compact_batch(batch, depth=depth, verbose=False)),
+    ]
+
+    results = []
+    for name, items, call in scenarios:
+        if args.only and name not in args.only:
+            continue
+        for cold in (True, False):
+            result = run_scenario(
+                name, client, memory, call, items, args.iterations, args.warmup, cold
+            )
+            results.append(result)
+            print_result(result)
+    return results
+
+
+def print_result(result: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    latency = result["latency_ms"]
+    peak = result["server_peak_rss_bytes"]
+    line = (
+        f"{result['name']:<8} {result['cache']:<5} "
+        f"{result['throughput_per_s'] or 0:>10.1f}/s "
+        f"p50 {latency['p50']:>9.2f}ms  p99 {latency['p99']:>9.2f}ms  "
+        f"server peak {peak / 1048576 if peak else float('nan'):>7.1f}MiB"
+    )
+    if baseline:
+        line += "  " + compare(result, baseline)
+    print(line, flush=True)
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any]) -> str:
+    """Relative change against the same scenario in an earlier run."""
+
+    def change(new, old):
+        return f"{(new - old) / old * 100:+.1f}%" if new is not None and old else "n/a"
+
+    throughput = change(result["throughput_per_s"], baseline["throughput_per_s"])
+    return (
+        f"vs baseline: throughput {throughput}, "
+        f"p50 {change(result['latency_ms']['p50'], baseline['latency_ms']['p50'])}, "
+        f"p99 {change(result['latency_ms']['p99'], baseline['latency_ms']['p99'])}"
+    )
+
+
+def node_version() -> Optional[str]:
+    try:
+        return (
+            subprocess.run(["node", "--version"], capture_output=True, text=True).stdout.strip()
+            or None
+        )
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark LDR expand/compact/batch through LdrClient"
+    )
+    add_graph_arguments(parser)
+    parser.add_argument("--graph-dir", help="Write the graph here instead of a temporary directory")
+    parser.add_argument(
+        "--expand-depth",
+        type=int,
+        default=None,
+        help="Depth passed to expand/compact (default: graph depth + 1)",
+    )
+    parser.add_argument(
+        "--iterations", type=int, default=20, help="Timed calls per scenario (default: 20)"
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=2, help="Untimed calls per scenario (default: 2)"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=50, help="URLs per batch call (default: 50)"
+    )
+    parser.add_argument(
+        "--only", nargs="+", choices=["expand", "compact", "batch"], help="Run only these scenarios"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=0, help="LDR_WORKERS for the private server (default: 0)"
+    )
+    parser.add_argument("--url", help="Benchmark an already running server instead of starting one")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--baseline", help="Compare with an earlier JSON results file")
+    args = parser.parse_args()
+
+    if args.expand_depth is None:
+        args.expand_depth = args.depth + 1
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    with tempfile.TemporaryDirectory(prefix="ldr-bench-") as tmp:
+        manifest = generate_graph(
+            args.graph_dir or os.path.join(tmp, "graph"), **graph_kwargs(args)
+        )
+        print(
+            f"Graph: {manifest['documents']} documents, {manifest['links']} links, "
+            f"{manifest['cycles']} cycles, {manifest['bytes']} bytes",
+            flush=True,
+        )
+
+        if args.url:
+            client = LdrClient(args.url, timeout=600)
+            client.set_mappings(manifest["mappings"])
+        else:
+            os.environ["LDR_WORKERS"] = str(args.workers)
+            client = LdrClient(
+                auto_start_server=True,
+                socket_path=os.path.join(tmp, "ldr.sock"),
+                mappings=manifest["mappings"],
+                timeout=600,
+            )
+
+        try:
+            memory = PeakMemory(client.server_pid)
+            health = client.health()
+            results = run_benchmarks(client, manifest, memory, args)
+        finally:
+            if client.server_process is not None:
+                client.server_process.terminate()
+                client.server_process.wait()
+            client.close()
+
+    report = {
+        "version": __version__,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "node": node_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "workers": (health.get("workers") or {}).get("workers", 0),
+        },
+        "graph": {
+            key: manifest[key] for key in ("params", "documents", "links", "cycles", "bytes")
+        },
+        "options": {
+            "expand_depth": args.expand_depth,
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "batch_size": args.batch_size,
+        },
+        "results": results,
+    }
+    if baseline:
+        print(f"\nCompared with {args.baseline} (version {baseline.get('version')})")
+        if (
+            baseline["graph"]["params"] != report["graph"]["params"]
+            or baseline["options"] != report["options"]
+        ):
+            print("Warning: the baseline used different graph or run options")
+        previous = {(r["name"], r["cache"]): r for r in baseline["results"]}
+        for result in results:
+            if (result["name"], result["cache"]) in previous:
+                print_result(result, previous[(result["name"], result["cache"])])
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,12 @@ jsonld-recursive Python client library
 """
 
 from .ldr_client import LdrClient
+from .ldr_async_client import AsyncLdrClient
+from .ldr_trace import summarize_trace
 from .test_install import test, get_test_data_dir
 
 try:
     from .version import __version__
 except ImportError:
     __version__ = "unknown"
-__all__ = ["LdrClient", "test", "get_test_data_dir"]
+__all__ = ["LdrClient", "AsyncLdrClient", "summarize_trace", "test", "get_test_data_dir"]
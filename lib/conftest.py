@@ -0,0 +1,44 @@
+"""
+Shared pytest fixtures for the jsonld-recursive tests.
+
+The server's modules are JavaScript; the `node` fixture lets a test run a
+snippet against them and check what it returns.
+"""
+
+import json
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+LIB_DIR = Path(__file__).parent
+
+
+@pytest.fixture
+def node():
+    """
+    Run a snippet of JavaScript under Node.js and return its result.
+
+    The snippet is the body of an async function run from lib/ (so modules are
+    required as './ldr-cache.js'); whatever it returns comes back decoded from
+    JSON. Skips the test when Node.js is not installed.
+    """
+    if not shutil.which("node"):
+        pytest.skip("Node.js not found")
+
+    def run(body: str):
+        script = (
+            "(async () => {\n" + body + "\n})().then(\n"
+            "  result => console.log('\\n' + JSON.stringify(result ?? null)),\n"
+            "  error => { console.error(error.stack || error); process.exit(1); }\n"
+            ");"
+        )
+        result = subprocess.run(
+            ["node", "-e", script], cwd=str(LIB_DIR), capture_output=True, text=True, timeout=60
+        )
+        assert result.returncode == 0, result.stderr
+        # Modules log as they work; the result is the last line printed
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    return run
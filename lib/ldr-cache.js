@@ -0,0 +1,257 @@
+// ldr-cache.js
+// Size-aware LRU cache used by the LDR server
+
+// Rough byte size of a JSON-serialisable value: about the length of its JSON
+// text, counted without building it (strings count characters, numbers a
+// fixed width). Callers that hold the serialised bytes pass their length to
+// LruCache.set instead.
+function estimateSize(value) {
+  switch (typeof value) {
+    case 'string':
+      return value.length + 2;
+    case 'number':
+      return 8;
+    case 'boolean':
+      return 5;
+    case 'object': {
+      if (value === null) return 4;
+      let size = 2;
+      if (Array.isArray(value)) {
+        for (const item of value) size += estimateSize(item) + 1;
+      } else {
+        for (const key of Object.keys(value)) size += key.length + 4 + estimateSize(value[key]);
+      }
+      return size;
+    }
+    default:
+      return 0;
+  }
+}
+
+/**
+ * LRU cache bounded by entry count and estimated bytes, with optional TTL (ms).
+ * onEvict(key, value) is called for entries dropped to stay within budget or
+ * because they expired, not for explicit delete() or clear().
+ */
+class LruCache {
+  constructor({ maxEntries = Infinity, maxBytes = Infinity, ttl = 0, sizeOf = estimateSize, onEvict = null } = {}) {
+    this.maxEntries = maxEntries;
+    this.maxBytes = maxBytes;
+    this.ttl = ttl;
+    this.sizeOf = sizeOf;
+    this.onEvict = onEvict;
+    this.map = new Map();  // Map iteration order doubles as recency order
+    this.bytes = 0;
+    this.hits = 0;
+    this.misses = 0;
+    this.evictions = 0;
+  }
+
+  get size() {
+    return this.map.size;
+  }
+
+  _live(key) {
+    const entry = this.map.get(key);
+    if (entry && entry.expires && entry.expires <= Date.now()) {
+      this._evict(key);
+      return undefined;
+    }
+    return entry;
+  }
+
+  _evict(key) {
+    const entry = this.map.get(key);
+    this.delete(key);
+    this.evictions++;
+    if (this.onEvict) this.onEvict(key, entry.value);
+  }
+
+  // Drop every expired entry
+  prune() {
+    if (!this.ttl) return;
+    const now = Date.now();
+    for (const [key, entry] of Array.from(this.map)) {
+      if (entry.expires <= now) this._evict(key);
+    }
+  }
+
+  has(key) {
+    return this._live(key) !== undefined;
+  }
+
+  // Look up without touching recency or hit/miss counters
+  peek(key) {
+    const entry = this._live(key);
+    return entry ? entry.value : undefined;
+  }
+
+  get(key) {
+    const entry = this._live(key);
+    if (!entry) {
+      this.misses++;
+      return undefined;
+    }
+    this.map.delete(key);
+    this.map.set(key, entry);
+    this.hits++;
+    return entry.value;
+  }
+
+  set(key, value, size = this.sizeOf(value)) {
+    this.delete(key);
+    if (size > this.maxBytes) return false;
+
+    this.map.set(key, { value, size, expires: this.ttl ? Date.now() + this.ttl : 0 });
+    this.bytes += size;
+
+    while (this.map.size > this.maxEntries || this.bytes > this.maxBytes) {
+      this._evict(this.map.keys().next().value);
+    }
+    return true;
+  }
+
+  delete(key) {
+    const entry = this.map.get(key);
+    if (!entry) return false;
+    this.map.delete(key);
+    this.bytes -= entry.size;
+    return true;
+  }
+
+  clear() {
+    this.map.clear();
+    this.bytes = 0;
+  }
+
+  keys() {
+    this.prune();
+    return Array.from(this.map.keys());
+  }
+
+  *entries() {
+    for (const [key, entry] of this.map) {
+      yield [key, entry.value];
+    }
+  }
+
+  // The n largest entries by estimated size
+  heaviest(n = 10) {
+    this.prune();
+    return Array.from(this.map, ([key, entry]) => ({ key, bytes: entry.size }))
+      .sort((a, b) => b.bytes - a.bytes)
+      .slice(0, n);
+  }
+
+  stats() {
+    this.prune();
+    const lookups = this.hits + this.misses;
+    return {
+      size: this.map.size,
+      bytes: this.bytes,
+      max_entries: Number.isFinite(this.maxEntries) ? this.maxEntries : null,
+      max_bytes: Number.isFinite(this.maxBytes) ? this.maxBytes : null,
+      ttl_seconds: this.ttl ? this.ttl / 1000 : null,
+      hits: this.hits,
+      misses: this.misses,
+      evictions: this.evictions,
+      hit_ratio: lookups ? this.hits / lookups : 0
+    };
+  }
+}
+
+/**
+ * Coalesces concurrent calls for the same key onto one pending promise.
+ * The first caller's fn runs; later callers with the same key share its
+ * result until it settles.
+ */
+class SingleFlight {
+  constructor() {
+    this.pending = new Map();
+  }
+
+  get size() {
+    return this.pending.size;
+  }
+
+  has(key) {
+    return this.pending.has(key);
+  }
+
+  run(key, fn) {
+    if (this.pending.has(key)) return this.pending.get(key);
+
+    const promise = Promise.resolve()
+      .then(fn)
+      .finally(() => this.pending.delete(key));
+    this.pending.set(key, promise);
+    return promise;
+  }
+}
+
+/**
+ * Records which source documents each cached result was built from, and the
+ * reverse index from a document to the results that depend on it. A result's
+ * dependencies map a document (see documentKey in ldr-loader.js) to the
+ * version loaded: { mtime } for local files, { etag } / { last_modified } for
+ * remote documents, {} when unknown or the load failed.
+ */
+class DependencyIndex {
+  constructor() {
+    this.byKey = new Map();       // result key -> { document: version }
+    this.byDocument = new Map();  // document -> Set of result keys
+  }
+
+  // Number of distinct documents tracked
+  get size() {
+    return this.byDocument.size;
+  }
+
+  get(key) {
+    return this.byKey.get(key);
+  }
+
+  set(key, dependencies) {
+    this.delete(key);
+    this.byKey.set(key, dependencies);
+    for (const document of Object.keys(dependencies)) {
+      if (!this.byDocument.has(document)) this.byDocument.set(document, new Set());
+      this.byDocument.get(document).add(key);
+    }
+  }
+
+  delete(key) {
+    const dependencies = this.byKey.get(key);
+    if (!dependencies) return false;
+    this.byKey.delete(key);
+    for (const document of Object.keys(dependencies)) {
+      const keys = this.byDocument.get(document);
+      keys.delete(key);
+      if (keys.size === 0) this.byDocument.delete(document);
+    }
+    return true;
+  }
+
+  clear() {
+    this.byKey.clear();
+    this.byDocument.clear();
+  }
+
+  // Result keys built from any of the given documents
+  dependents(documents) {
+    const keys = new Set();
+    for (const document of documents) {
+      for (const key of this.byDocument.get(document) || []) keys.add(key);
+    }
+    return keys;
+  }
+
+  // [document, [[result key, version], ...]] for every tracked document
+  *documents() {
+    for (const [document, keys] of this.byDocument) {
+      yield [document, Array.from(keys, key => [key, this.byKey.get(key)[document]])];
+    }
+  }
+}
+
+module.exports = { LruCache, SingleFlight, DependencyIndex, estimateSize };
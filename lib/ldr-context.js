@@ -0,0 +1,111 @@
+// ldr-context.js
+// Compile a document's @context into one self-contained context (/context)
+
+const crypto = require('crypto');
+const path = require('path');
+
+// Resolve a (possibly relative) @context reference against the URL a document
+// was loaded from, the way jsonld would: file:// paths stay unencoded
+function resolveReference(reference, base) {
+  if (/^[a-z][a-z0-9+.-]*:/i.test(reference)) return reference;
+  if (base.startsWith('file://')) {
+    return 'file://' + path.resolve(path.dirname(base.slice('file://'.length)), reference);
+  }
+  return new URL(reference, base).href;
+}
+
+function isObject(value) {
+  return value !== null && typeof value === 'object' && !Array.isArray(value);
+}
+
+// Objects that change how the terms around them are processed stay separate
+function mergeable(context) {
+  return isObject(context) && !('@protected' in context) && !('@propagate' in context);
+}
+
+// Merge runs of consecutive context objects, later terms winning as they do
+// when jsonld processes the array in order
+function merge(contexts) {
+  const merged = [];
+  for (const context of contexts) {
+    const last = merged[merged.length - 1];
+    if (mergeable(context) && mergeable(last)) merged[merged.length - 1] = { ...last, ...context };
+    else merged.push(context);
+  }
+  return merged;
+}
+
+async function loadContext(documentLoader, reference) {
+  const loaded = await documentLoader(reference);
+  const context = loaded.document && loaded.document['@context'];
+  if (context === undefined) throw new Error(`No @context in ${reference}`);
+  return { context, base: loaded.documentUrl };
+}
+
+// Compile one context (a value of @context) to a list of contexts to merge.
+// depth is how many more documents may be loaded below this one; remote is
+// true for a context that came from a loaded context document.
+async function compileEntries(documentLoader, context, base, depth, remote) {
+  const entries = await Promise.all([].concat(context).map(async entry => {
+    if (typeof entry === 'string') {
+      const reference = resolveReference(entry, base);
+      if (depth < 1) return [reference];
+      const loaded = await loadContext(documentLoader, reference);
+      return compileEntries(documentLoader, loaded.context, loaded.base, depth - 1, true);
+    }
+    if (isObject(entry)) return [await compileObject(documentLoader, entry, base, depth, remote)];
+    return [entry];
+  }));
+  return merge(entries.flat());
+}
+
+async function compileValue(documentLoader, context, base, depth, remote) {
+  const entries = await compileEntries(documentLoader, context, base, depth, remote);
+  return entries.length === 1 ? entries[0] : entries;
+}
+
+async function compileObject(documentLoader, context, base, depth, remote) {
+  const compiled = {};
+  for (const [key, value] of Object.entries(context)) {
+    // jsonld ignores @base in a remote context
+    if (key === '@base' && remote) continue;
+    if (key === '@import' && typeof value === 'string') {
+      // Inlined below unless it is too deep to load
+      if (depth < 1) compiled[key] = resolveReference(value, base);
+    } else if (isObject(value) && '@context' in value) {
+      // Scoped context of a term definition
+      compiled[key] = { ...value, '@context': await compileValue(documentLoader, value['@context'], base, depth, false) };
+    } else {
+      compiled[key] = value;
+    }
+  }
+
+  if (typeof context['@import'] !== 'string' || depth < 1) return compiled;
+
+  // @import: the imported context's terms, overridden by this one's
+  const reference = resolveReference(context['@import'], base);
+  const loaded = await loadContext(documentLoader, reference);
+  const imported = await compileObject(documentLoader, loaded.context, loaded.base, depth - 1, true);
+  return { ...imported, ...compiled };
+}
+
+/**
+ * Resolve the @context of the document at url into one context that needs
+ * no further loading: referenced contexts (relative to the document that
+ * references them), @import and scoped contexts in term definitions are
+ * loaded with documentLoader and inlined, and consecutive context objects
+ * are merged. depth counts documents from url itself, so depth 1 returns
+ * url's own @context with its references made absolute, and references
+ * deeper than depth are left that way.
+ */
+async function compileContext(documentLoader, url, depth = 2) {
+  const loaded = await loadContext(documentLoader, url);
+  return compileValue(documentLoader, loaded.context, loaded.base, depth - 1, false);
+}
+
+// Content fingerprint of a compiled context (sha256 of its JSON)
+function fingerprint(context) {
+  return crypto.createHash('sha256').update(JSON.stringify(context)).digest('hex');
+}
+
+module.exports = { compileContext, fingerprint, resolveReference };
@@ -1,28 +1,243 @@
 // ldr-core.js
 // Universal JSON-LD recursive expand/compact functions
 
-async function expandRecursive(jsonld, url, maxDepth = 2, currentDepth = 0, visited = new Set()) {
+function defaultHostOf(url) {
+  try {
+    const parsed = new URL(url);
+    return parsed.protocol.startsWith('http') ? parsed.host : 'local';
+  } catch (e) {
+    return 'local';
+  }
+}
+
+// Limits how many documents are loaded at once, overall and per host.
+// Queued tasks with a lower priority (shallower depth) start first.
+function createScheduler({ concurrency = Infinity, perHost = Infinity, hostOf = defaultHostOf } = {}) {
+  const queues = new Map();        // priority -> Map(host -> [job])
+  const activeByHost = new Map();
+  let active = 0;
+  let queued = 0;
+
+  function next() {
+    const priorities = Array.from(queues.keys()).sort((a, b) => a - b);
+    for (const priority of priorities) {
+      const hosts = queues.get(priority);
+      for (const [host, jobs] of hosts) {
+        if ((activeByHost.get(host) || 0) >= perHost) continue;
+        const job = jobs.shift();
+        if (jobs.length === 0) hosts.delete(host);
+        if (hosts.size === 0) queues.delete(priority);
+        return job;
+      }
+    }
+    return null;
+  }
+
+  function pump() {
+    while (active < concurrency) {
+      const job = next();
+      if (!job) return;
+      queued--;
+      active++;
+      activeByHost.set(job.host, (activeByHost.get(job.host) || 0) + 1);
+      Promise.resolve()
+        .then(job.task)
+        .then(job.resolve, job.reject)
+        .finally(() => {
+          active--;
+          activeByHost.set(job.host, activeByHost.get(job.host) - 1);
+          pump();
+        });
+    }
+  }
+
+  function run(url, priority, task) {
+    return new Promise((resolve, reject) => {
+      const host = hostOf(url);
+      if (!queues.has(priority)) queues.set(priority, new Map());
+      const hosts = queues.get(priority);
+      if (!hosts.has(host)) hosts.set(host, []);
+      hosts.get(host).push({ host, task, resolve, reject });
+      queued++;
+      pump();
+    });
+  }
+
+  function stats() {
+    return { active, queued, concurrency, per_host: perHost };
+  }
+
+  return { run, stats };
+}
+
+// Per-request state shared by every branch of one expansion.
+// observe(phase, seconds), if given, receives jsonld.expand/compact timings.
+// tracer, if given, records each expanded URL (see ldr-trace.js).
+// bind(fn), if given, ties a document expansion to the calling request's
+// async context before the scheduler runs it later from elsewhere.
+// expandedCache, if given, keeps jsonld.expand results across requests:
+// get(url) returns a cached result or undefined, load(url, expand) runs
+// expand() and caches its result.
+function createExpansionState({ scheduler = null, observe = null, tracer = null, bind = null, expandedCache = null } = {}) {
+  return {
+    scheduler,
+    observe,
+    tracer,
+    bind,
+    expandedCache,
+    subtrees: new Map(),   // "remainingDepth:url" -> Promise of expanded subtree (see Expanded)
+    documents: new Map()   // url -> Promise of jsonld.expand result
+  };
+}
+
+function now() {
+  return typeof performance !== 'undefined' ? performance.now() : Date.now();
+}
+
+// Run an async step, reporting its duration to state.observe when set
+async function timed(state, phase, fn) {
+  if (!state.observe) return fn();
+  const started = now();
+  try {
+    return await fn();
+  } finally {
+    state.observe(phase, (now() - started) / 1000);
+  }
+}
+
+function expandDocument(jsonld, url, currentDepth, state) {
+  if (state.documents.has(url)) {
+    if (state.tracer) state.tracer.annotate({ document: 'reused' });
+    return state.documents.get(url);
+  }
+
+  // Expanded by an earlier request: no load, no scheduling
+  const cache = state.expandedCache;
+  const cached = cache ? cache.get(url) : undefined;
+  if (cached !== undefined) {
+    if (state.tracer) state.tracer.annotate({ document: 'cached' });
+    state.documents.set(url, Promise.resolve(cached));
+    return state.documents.get(url);
+  }
+
+  if (state.tracer) state.tracer.annotate({ document: 'expanded' });
+  let load = () => timed(state, 'expand', () => jsonld.expand(url));
+  if (cache) {
+    const expand = load;
+    load = () => cache.load(url, expand);
+  }
+  if (state.bind) load = state.bind(load);
+  state.documents.set(url, state.scheduler ? state.scheduler.run(url, currentDepth, load) : load());
+  return state.documents.get(url);
+}
+
+// Nodes of the tree expandNode builds before resolveTree finishes it.
+// Expanded is a document expanded in place. Cycle is a reference to a document
+// that was already on the path when it was reached: it is left for resolveTree
+// to stub, or to expand if the subtree holding it is reused somewhere that
+// document is not an ancestor. Memoized subtrees hold these nodes rather than
+// @id stubs, so they stay valid wherever they are reused.
+class Expanded {
+  constructor(url, value) {
+    this.url = url;
+    this.value = value;
+  }
+}
+
+class Cycle {
+  constructor(url, depth) {
+    this.url = url;
+    this.depth = depth;
+  }
+}
+
+// Objects and arrays that contain Expanded or Cycle nodes; anything else is
+// already final and resolveTree passes it through as is
+const unresolved = new WeakSet();
+
+function isUnresolved(value) {
+  return value instanceof Expanded || value instanceof Cycle ||
+    (value !== null && typeof value === 'object' && unresolved.has(value));
+}
+
+// `visited` holds the URLs being expanded on the path from the root to here.
+// A URL that is already on the path is a cycle and is left as an @id stub.
+// Subtrees are memoized per (url, remaining depth), so a document referenced
+// from many places is fetched and expanded once per request. Cycles inside a
+// memoized subtree are only decided by resolveTree, against the path it is
+// actually reused under.
+async function expandRecursive(jsonld, url, maxDepth = 2, currentDepth = 0, visited = new Set(), state = createExpansionState()) {
+  const tree = await expandNode(jsonld, url, maxDepth, currentDepth, visited, state);
+  return resolveTree(jsonld, tree, maxDepth, visited, state);
+}
+
+function expandNode(jsonld, url, maxDepth, currentDepth, visited, state) {
   if (currentDepth >= maxDepth) {
+    if (state.tracer) state.tracer.mark({ url, depth: currentDepth, stub: 'depth' });
     return { "@id": url };
   }
-  
-  visited.add(url);
-  
+  if (visited.has(url)) {
+    if (state.tracer) state.tracer.mark({ url, depth: currentDepth, stub: 'cycle' });
+    return new Cycle(url, currentDepth);
+  }
+
+  const key = `${maxDepth - currentDepth}:${url}`;
+  if (!state.subtrees.has(key)) {
+    const path = new Set(visited).add(url);
+    const expand = () => expandSubtree(jsonld, url, maxDepth, currentDepth, path, state);
+    state.subtrees.set(key, state.tracer ? state.tracer.span({ url, depth: currentDepth }, expand) : expand());
+  } else if (state.tracer) {
+    state.tracer.mark({ url, depth: currentDepth, reused: true });
+  }
+  return state.subtrees.get(key);
+}
+
+async function expandSubtree(jsonld, url, maxDepth, currentDepth, visited, state) {
   try {
-    const expanded = await jsonld.expand(url);
+    const expanded = await expandDocument(jsonld, url, currentDepth, state);
     const doc = Array.isArray(expanded) && expanded.length === 1 ? expanded[0] : expanded;
-    const processed = await processObject(jsonld, doc, maxDepth, currentDepth + 1, visited);
-    return processed;
+    const processed = await processTree(jsonld, doc, maxDepth, currentDepth + 1, visited, state);
+    return new Expanded(url, processed);
   } catch (error) {
-    return { "@id": url, "_error": error.message };
+    if (state.tracer) state.tracer.fail(error);
+    return new Expanded(url, { "@id": url, "_error": error.message });
   }
 }
 
-async function processObject(jsonld, obj, maxDepth, currentDepth, visited) {
+// Finish a tree from expandNode for the path `visited`: a document already on
+// the path becomes an @id stub, and a Cycle off the path is expanded
+async function resolveTree(jsonld, node, maxDepth, visited, state) {
+  if (node instanceof Cycle) {
+    if (visited.has(node.url)) return { "@id": node.url };
+    const tree = await expandNode(jsonld, node.url, maxDepth, node.depth, visited, state);
+    return resolveTree(jsonld, tree, maxDepth, visited, state);
+  }
+  if (node instanceof Expanded) {
+    if (visited.has(node.url)) return { "@id": node.url };
+    return resolveTree(jsonld, node.value, maxDepth, new Set(visited).add(node.url), state);
+  }
+  if (!isUnresolved(node)) return node;
+
+  if (Array.isArray(node)) {
+    return Promise.all(node.map(item => resolveTree(jsonld, item, maxDepth, visited, state)));
+  }
+  const entries = await Promise.all(Object.entries(node).map(
+    async ([key, value]) => [key, await resolveTree(jsonld, value, maxDepth, visited, state)]
+  ));
+  return Object.fromEntries(entries);
+}
+
+async function processObject(jsonld, obj, maxDepth, currentDepth, visited = new Set(), state = createExpansionState()) {
+  const tree = await processTree(jsonld, obj, maxDepth, currentDepth, visited, state);
+  return resolveTree(jsonld, tree, maxDepth, visited, state);
+}
+
+async function processTree(jsonld, obj, maxDepth, currentDepth, visited, state) {
   if (Array.isArray(obj)) {
     const processed = await Promise.all(
-      obj.map(item => processObject(jsonld, item, maxDepth, currentDepth, visited))
+      obj.map(item => processTree(jsonld, item, maxDepth, currentDepth, visited, state))
     );
+    if (processed.some(isUnresolved)) unresolved.add(processed);
     return processed.length === 1 ? processed[0] : processed;
   }
   
@@ -36,38 +251,48 @@ async function processObject(jsonld, obj, maxDepth, currentDepth, visited) {
   if (keys.length === 1 && keys[0] === '@id' && typeof obj['@id'] === 'string' && 
       (obj['@id'].startsWith('http') || obj['@id'].startsWith('file://')) && 
       currentDepth < maxDepth) {
-    return await expandRecursive(jsonld, obj['@id'], maxDepth, currentDepth, visited);
+    return await expandNode(jsonld, obj['@id'], maxDepth, currentDepth, visited, state);
   }
   
   const result = {};
   for (const [key, value] of Object.entries(obj)) {
     if (Array.isArray(value)) {
       const processed = await Promise.all(
-        value.map(item => processObject(jsonld, item, maxDepth, currentDepth, visited))
+        value.map(item => processTree(jsonld, item, maxDepth, currentDepth, visited, state))
       );
+      if (processed.some(isUnresolved)) unresolved.add(processed);
       result[key] = processed.length === 1 ? processed[0] : processed;
     } else if (value && typeof value === 'object') {
-      result[key] = await processObject(jsonld, value, maxDepth, currentDepth, visited);
+      result[key] = await processTree(jsonld, value, maxDepth, currentDepth, visited, state);
     } else {
       result[key] = value;
     }
   }
+  if (Object.values(result).some(isUnresolved)) unresolved.add(result);
   return result;
 }
 
-async function compactJsonLd(jsonld, url, depth = 2) {
+async function compactJsonLd(jsonld, url, depth = 2, state = createExpansionState()) {
   // Expand recursively
-  const expanded = await expandRecursive(jsonld, url, depth);
+  const expanded = await expandRecursive(jsonld, url, depth, 0, new Set(), state);
   
-  // Compact using the original URL as context
-  // jsonld will load it and extract @context, then resolve relative contexts automatically!
-  const compacted = await jsonld.compact(expanded, url);
+  return compactExpanded(jsonld, expanded, url, state);
+}
+
+// Compact an expanded tree of `url`. By default the original URL is the context:
+// jsonld will load it and extract @context, then resolve relative contexts automatically!
+// A caller that already knows the document's @context can pass it instead;
+// relative IRIs are compacted against the original URL either way, and the
+// result's "@context" is still the original URL.
+async function compactExpanded(jsonld, expanded, url, state = createExpansionState(), context = url) {
+  const compacted = await timed(state, 'compact', () => jsonld.compact(expanded, context, { base: url }));
+  if (context !== url && compacted["@context"] !== undefined) compacted["@context"] = url;
   
   return compacted["@graph"] ?? compacted;
 }
 
 if (typeof module !== 'undefined' && module.exports) {
-  module.exports = { expandRecursive, compactJsonLd, processObject };
+  module.exports = { expandRecursive, compactJsonLd, compactExpanded, processObject, createExpansionState, createScheduler };
 } else if (typeof window !== 'undefined') {
-  window.LdrCore = { expandRecursive, compactJsonLd, processObject };
+  window.LdrCore = { expandRecursive, compactJsonLd, compactExpanded, processObject, createExpansionState, createScheduler };
 }
@@ -0,0 +1,258 @@
+// ldr-engine.js
+// Expand/compact engine shared by the LDR server and its worker threads
+
+const path = require('path');
+const { AsyncLocalStorage, AsyncResource } = require('async_hooks');
+const { expandRecursive, compactExpanded, createExpansionState, createScheduler } = require('./ldr-core.js');
+const { createDocumentLoader, isRemote, documentKey, localFileChanged } = require('./ldr-loader.js');
+const { LruCache, SingleFlight } = require('./ldr-cache.js');
+const { compileContext, resolveReference } = require('./ldr-context.js');
+const { Trace, recordLoad } = require('./ldr-trace.js');
+
+// Dependencies ({ document: version }) of the operation running in the current async context
+const collecting = new AsyncLocalStorage();
+
+// Documents loaded by the jsonld call running in the current async context, in
+// order, as [url, { document: version }] pairs (see ResolvedContextCache)
+const callLoads = new AsyncLocalStorage();
+
+// Resolved contexts jsonld keeps between operations (its own default size)
+const RESOLVED_CONTEXTS_MAX_ENTRIES = 100;
+
+// The ContextResolver class of the jsonld installed at jsonldPath, or null
+// for a jsonld without one (it is not part of jsonld's public API)
+function loadContextResolver(jsonldPath) {
+  try {
+    return require(path.join(path.dirname(jsonldPath), 'ContextResolver.js'));
+  } catch (error) {
+    return null;
+  }
+}
+
+function versionOf(load) {
+  if (load.mtime !== undefined) return { mtime: load.mtime };
+  const version = {};
+  if (load.etag) version.etag = load.etag;
+  if (load.last_modified) version.last_modified = load.last_modified;
+  return version;
+}
+
+function recordDependency(load) {
+  const dependencies = collecting.getStore();
+  if (dependencies) dependencies[documentKey(load.resolved)] = versionOf(load);
+  const loads = callLoads.getStore();
+  if (loads) loads.push([load.url, { [documentKey(load.resolved)]: versionOf(load) }]);
+}
+
+/**
+ * jsonld.expand results per document URL, shared by every request. An
+ * expansion at any depth reuses the documents earlier requests expanded, at
+ * whatever depth, and only expands documents beyond what they reached.
+ * Each entry keeps the documents loaded to produce it (the document and its
+ * contexts), which are added to the dependencies of every operation reusing
+ * it. An entry built from a local file that has changed since is dropped
+ * when next looked up. limits are LruCache options; entries are sized by
+ * estimated serialised length.
+ */
+class ExpandedDocumentCache {
+  constructor(limits = {}) {
+    this.cache = new LruCache(limits);
+    this.inflight = new SingleFlight();
+  }
+
+  get size() {
+    return this.cache.size;
+  }
+
+  get(url) {
+    const entry = this.cache.get(url);
+    if (entry === undefined) return undefined;
+    const changed = Object.entries(entry.dependencies).some(
+      ([document, version]) => !isRemote(document) && version.mtime !== undefined && localFileChanged(document, version.mtime)
+    );
+    if (changed) {
+      this.cache.delete(url);
+      return undefined;
+    }
+    const dependencies = collecting.getStore();
+    if (dependencies) Object.assign(dependencies, entry.dependencies);
+    return entry.value;
+  }
+
+  load(url, expand) {
+    const loaded = this.inflight.run(url, async () => {
+      const dependencies = {};
+      const value = await collecting.run(dependencies, expand);
+      this.cache.set(url, { value, dependencies });
+      return { value, dependencies };
+    });
+    return loaded.then(({ value, dependencies }) => {
+      const outer = collecting.getStore();
+      if (outer) Object.assign(outer, dependencies);
+      return value;
+    });
+  }
+
+  // Drop expansions that loaded any of `documents` (a Set of documentKey()s)
+  invalidate(documents) {
+    for (const [url, entry] of Array.from(this.cache.entries())) {
+      if (Object.keys(entry.dependencies).some(document => documents.has(document))) this.cache.delete(url);
+    }
+  }
+
+  clear() {
+    this.cache.clear();
+  }
+
+  stats() {
+    return this.cache.stats();
+  }
+}
+
+/**
+ * Resolved contexts per context URL, the sharedCache of jsonld's
+ * ContextResolver. A context found here is not loaded again, so each entry
+ * keeps the documents loaded to resolve it (the context and those it
+ * references, loaded by the same jsonld call after it) and adds them to the
+ * dependencies of every operation reusing it, as ExpandedDocumentCache does.
+ */
+class ResolvedContextCache {
+  constructor(maxEntries) {
+    this.cache = new LruCache({ maxEntries, sizeOf: () => 0 });
+  }
+
+  get(url) {
+    const entry = this.cache.get(url);
+    if (entry === undefined) return undefined;
+    const dependencies = collecting.getStore();
+    if (dependencies) Object.assign(dependencies, entry.dependencies);
+    const loads = callLoads.getStore();
+    if (loads) loads.push([url, entry.dependencies]);
+    return entry.value;
+  }
+
+  set(url, value) {
+    // From the load of this context on (from the start of the call if not found)
+    const loads = callLoads.getStore() || [];
+    let start = loads.length - 1;
+    while (start > 0 && loads[start][0] !== url) start--;
+    const dependencies = Object.assign({}, ...loads.slice(Math.max(start, 0)).map(([, loaded]) => loaded));
+    this.cache.set(url, { value, dependencies });
+  }
+}
+
+/**
+ * Wire a jsonld instance to a mapping-aware document loader and a load
+ * scheduler, and return the operations run for /expand, /compact and /context.
+ * run(operation, url, depth) resolves to { result, dependencies }, the
+ * source documents loaded to build the result (see DependencyIndex);
+ * compact(url, expanded) does the same for compacting an existing
+ * expansion; traced(operation, url, depth) also returns a trace tree.
+ *
+ * mappings is a MappingResolver, documentCache an LruCache for loaded source
+ * documents, expandedCache an optional ExpandedDocumentCache; concurrency and
+ * perHost cap simultaneous document loads.
+ * observe(phase, seconds), if given, receives per-phase timings from the
+ * loader and from jsonld.expand/compact.
+ *
+ * jsonld otherwise keeps the contexts it resolves in one process-wide cache
+ * keyed by URL, which outlives invalidated documents and mapping changes.
+ * With ContextResolver (see loadContextResolver) every operation resolves
+ * contexts through a cache owned by the engine instead, and resetContexts()
+ * starts a new one.
+ */
+function createEngine(jsonld, { mappings, documentCache, expandedCache = null, concurrency = 64, perHost = 16, observe = null, ContextResolver = null }) {
+  const resolveUrl = url => mappings.resolve(url);
+
+  const documentLoader = createDocumentLoader({
+    resolveUrl,
+    cache: documentCache,
+    observe,
+    onLoad: load => {
+      recordLoad(load);
+      recordDependency(load);
+    }
+  });
+
+  // Caps simultaneous document loads across all requests, overall and per (mapped) host
+  const scheduler = createScheduler({
+    concurrency,
+    perHost,
+    hostOf: url => {
+      const resolvedUrl = resolveUrl(url);
+      return isRemote(resolvedUrl) ? new URL(resolvedUrl).host : 'local';
+    }
+  });
+
+  jsonld.documentLoader = documentLoader;
+
+  let resolvedContexts = new ResolvedContextCache(RESOLVED_CONTEXTS_MAX_ENTRIES);
+  const withContexts = (options, call) => callLoads.run([], () => call({
+    contextResolver: new ContextResolver({ sharedCache: resolvedContexts }),
+    ...options
+  }));
+  const contextual = ContextResolver
+    ? {
+      expand: (input, options = {}) => withContexts(options, all => jsonld.expand(input, all)),
+      compact: (input, context, options = {}) => withContexts(options, all => jsonld.compact(input, context, all))
+    }
+    : jsonld;
+
+  function resetContexts() {
+    resolvedContexts = new ResolvedContextCache(RESOLVED_CONTEXTS_MAX_ENTRIES);
+  }
+
+  const state = tracer => createExpansionState({ scheduler, observe, tracer, bind: AsyncResource.bind, expandedCache });
+  // Compact with the document's own @context URL(s) rather than the document
+  // URL, so every document sharing a context shares jsonld's resolved copy of
+  // it (cached per context URL until resetContexts()) instead of each adding
+  // its own entry. Inline contexts fall back to the document URL.
+  async function compactionContext(url) {
+    let loaded;
+    try {
+      loaded = await documentLoader(url);
+    } catch (error) {
+      return url;  // jsonld.compact reports the failure
+    }
+    const context = loaded.document['@context'];
+    const references = [].concat(context === undefined ? [] : context);
+    if (references.length === 0 || !references.every(reference => typeof reference === 'string')) return url;
+    const resolved = references.map(reference => resolveReference(reference, loaded.documentUrl));
+    return Array.isArray(context) ? resolved : resolved[0];
+  }
+
+  async function compactTree(url, expanded, tracer = null) {
+    return compactExpanded(contextual, expanded, url, state(tracer), await compactionContext(url));
+  }
+
+  const operations = {
+    expand: (url, depth, tracer = null) => expandRecursive(contextual, url, depth, 0, new Set(), state(tracer)),
+    compact: async (url, depth, tracer = null) => compactTree(url, await operations.expand(url, depth, tracer), tracer),
+    context: (url, depth) => compileContext(documentLoader, url, depth)
+  };
+
+  async function collect(fn) {
+    const dependencies = {};
+    const result = await collecting.run(dependencies, fn);
+    return { result, dependencies };
+  }
+
+  function run(operation, url, depth) {
+    return collect(() => operations[operation](url, depth));
+  }
+
+  function compact(url, expanded) {
+    return collect(() => compactTree(url, expanded));
+  }
+
+  async function traced(operation, url, depth) {
+    const trace = new Trace({ operation, url, depth, resolveUrl });
+    const dependencies = {};
+    const result = await collecting.run(dependencies, () => trace.run(() => operations[operation](url, depth, trace)));
+    return { result, trace: trace.root, dependencies };
+  }
+
+  return { documentLoader, scheduler, operations, run, compact, traced, resetContexts };
+}
+
+module.exports = { createEngine, ExpandedDocumentCache, loadContextResolver };
@@ -0,0 +1,283 @@
+// ldr-loader.js
+// jsonld document loader for the LDR server: URL mappings, local files and HTTP(S)
+
+const http = require('http');
+const https = require('https');
+const fs = require('fs');
+const path = require('path');
+const zlib = require('zlib');
+const { SingleFlight } = require('./ldr-cache.js');
+
+function isRemote(url) {
+  return url.startsWith('http://') || url.startsWith('https://');
+}
+
+// Identity of a loaded document for dependency tracking: the absolute path of
+// a local file (however it was spelled), or the remote URL
+function documentKey(resolvedUrl) {
+  return isRemote(resolvedUrl) ? resolvedUrl : path.resolve(resolvedUrl.replace('file://', ''));
+}
+
+// Whether the local file at absolutePath (a documentKey()) no longer has the
+// modification time (ms), and size if given, it was loaded with. A file that
+// cannot be stat'ed has changed.
+function localFileChanged(absolutePath, mtime, size = undefined) {
+  try {
+    const stat = fs.statSync(absolutePath);
+    return stat.mtimeMs !== mtime || (size !== undefined && stat.size !== size);
+  } catch (error) {
+    return true;
+  }
+}
+
+function loadLocal(resolvedUrl) {
+  try {
+    const absolutePath = path.resolve(resolvedUrl.replace('file://', ''));
+    // Stat first: a file edited while it is read is then seen as changed later
+    const { mtimeMs } = fs.statSync(absolutePath);
+    const content = fs.readFileSync(absolutePath, 'utf8');
+    const document = JSON.parse(content);
+
+    console.log(`Loaded local: ${absolutePath}`);
+
+    // Return with file:// URL - jsonld uses this to resolve relative @context paths!
+    return {
+      document: document,
+      documentUrl: 'file://' + absolutePath,
+      bytes: Buffer.byteLength(content),
+      mtime: mtimeMs
+    };
+  } catch (error) {
+    throw new Error(`Could not load local file ${resolvedUrl}: ${error.message}`);
+  }
+}
+
+function secondsSince(started) {
+  return Number(process.hrtime.bigint() - started) / 1e9;
+}
+
+const REDIRECT_CODES = new Set([301, 302, 303, 307, 308]);
+const MAX_REDIRECTS = 5;
+
+function decoderFor(encoding) {
+  switch ((encoding || '').trim().toLowerCase()) {
+    case 'gzip':
+    case 'x-gzip':
+      return zlib.createGunzip();
+    case 'deflate':
+      return zlib.createInflate();
+    case 'br':
+      return zlib.createBrotliDecompress();
+    default:
+      return null;
+  }
+}
+
+// Single GET. Resolves to a loaded entry, or { redirect, permanent } for 3xx responses.
+function fetchRemote(resolvedUrl, agent) {
+  return new Promise((resolve, reject) => {
+    const client = resolvedUrl.startsWith('https:') ? https : http;
+    const headers = {
+      'Accept': 'application/ld+json, application/json',
+      'Accept-Encoding': 'gzip, deflate, br'
+    };
+
+    client.get(resolvedUrl, { agent, headers }, (res) => {
+      if (REDIRECT_CODES.has(res.statusCode) && res.headers.location) {
+        res.resume();
+        resolve({ redirect: res.headers.location, permanent: res.statusCode === 301 || res.statusCode === 308 });
+        return;
+      }
+
+      if (res.statusCode !== 200) {
+        res.resume();
+        reject(new Error(`HTTP ${res.statusCode}: ${res.statusMessage}`));
+        return;
+      }
+
+      const decoder = decoderFor(res.headers['content-encoding']);
+      const body = decoder ? res.pipe(decoder) : res;
+      const chunks = [];
+
+      res.on('error', reject);
+      body.on('error', error => reject(new Error(`Failed to decode ${resolvedUrl}: ${error.message}`)));
+      body.on('data', chunk => chunks.push(chunk));
+      body.on('end', () => {
+        const data = Buffer.concat(chunks);
+        try {
+          let document = JSON.parse(data.toString('utf8'));
+          if (Array.isArray(document)) {
+            document = { '@context': document };
+          }
+          const entry = { document: document, documentUrl: resolvedUrl, bytes: data.length };
+          if (res.headers.etag) entry.etag = res.headers.etag;
+          if (res.headers['last-modified']) entry.lastModified = res.headers['last-modified'];
+          resolve(entry);
+        } catch (error) {
+          reject(new Error(`Failed to parse JSON from ${resolvedUrl}: ${error.message}`));
+        }
+      });
+    }).on('error', reject);
+  });
+}
+
+/**
+ * Create a jsonld documentLoader.
+ *
+ * resolveUrl maps a requested URL to the location actually loaded. Loaded
+ * documents are kept in `cache` (an LruCache keyed by documentKey() of the
+ * resolved URL, sized by source bytes) so shared contexts and linked documents
+ * are read only once, however a local path is spelled. A cached local file is
+ * reused only while its modification time and size are unchanged. Concurrent
+ * loads of the same document share a single fetch.
+ *
+ * Remote documents are fetched over keep-alive connections pooled per origin,
+ * with compressed transfer. Redirect chains are bounded, and permanent
+ * (301/308) redirects are remembered so later loads go straight to the target.
+ * Targets are remembered as sent and mapped through resolveUrl on each use,
+ * so they follow mapping changes; documentLoader.forgetRedirects() drops them.
+ *
+ * observe(phase, seconds), if given, receives the time spent resolving
+ * mappings ('mapping') and loading uncached documents ('fetch_local' or
+ * 'fetch_remote'). onLoad(load), if given, is called for every load with
+ * its URL, resolved URL, source, cache status, bytes, ms and any error, plus
+ * the version loaded: mtime (ms) of a local file, etag / last_modified of a
+ * remote document when the server sent them.
+ */
+function createDocumentLoader({ resolveUrl = url => url, cache = null, maxSockets = 16, observe = null, onLoad = null } = {}) {
+  const inflight = new SingleFlight();
+  const agents = new Map();               // origin -> keep-alive Agent
+  const permanentRedirects = new Map();   // url -> redirect target, before mapping
+
+  function agentFor(url) {
+    const { protocol, host } = new URL(url);
+    const origin = `${protocol}//${host}`;
+    if (!agents.has(origin)) {
+      const Agent = protocol === 'https:' ? https.Agent : http.Agent;
+      agents.set(origin, new Agent({ keepAlive: true, maxSockets }));
+    }
+    return agents.get(origin);
+  }
+
+  async function fetchFollowingRedirects(resolvedUrl) {
+    let currentUrl = resolvedUrl;
+    for (let redirects = 0; redirects <= MAX_REDIRECTS; redirects++) {
+      if (permanentRedirects.has(currentUrl)) currentUrl = resolveUrl(permanentRedirects.get(currentUrl));
+      if (!isRemote(currentUrl)) return loadLocal(currentUrl);
+
+      const response = await fetchRemote(currentUrl, agentFor(currentUrl));
+      if (!response.redirect) return response;
+
+      const target = new URL(response.redirect, currentUrl).href;
+      if (response.permanent) permanentRedirects.set(currentUrl, target);
+      currentUrl = resolveUrl(target);
+    }
+    throw new Error(`Too many redirects loading ${resolvedUrl}`);
+  }
+
+  // Report a load to onLoad: cache is 'hit' (document cache), 'shared'
+  // (joined a load already in flight) or 'miss'
+  function reportLoad(url, resolvedUrl, cacheStatus, started, entry, error) {
+    if (!onLoad) return;
+    const load = {
+      url,
+      resolved: resolvedUrl,
+      source: isRemote(resolvedUrl) ? 'remote' : 'local',
+      cache: cacheStatus,
+      ms: secondsSince(started) * 1000
+    };
+    if (entry) {
+      load.bytes = entry.bytes;
+      if (entry.mtime !== undefined) load.mtime = entry.mtime;
+      if (entry.etag) load.etag = entry.etag;
+      if (entry.lastModified) load.last_modified = entry.lastModified;
+    }
+    if (error) load.error = error.message;
+    onLoad(load);
+  }
+
+  async function loadResolved(resolvedUrl, url = resolvedUrl) {
+    const started = process.hrtime.bigint();
+    const key = documentKey(resolvedUrl);
+
+    if (cache) {
+      const cached = cache.get(key);
+      if (cached && cached.mtime !== undefined && localFileChanged(documentKey(cached.documentUrl), cached.mtime, cached.bytes)) {
+        cache.delete(key);
+      } else if (cached) {
+        reportLoad(url, resolvedUrl, 'hit', started, cached);
+        return cached;
+      }
+    }
+
+    const cacheStatus = inflight.has(key) ? 'shared' : 'miss';
+    try {
+      const entry = await inflight.run(key, async () => {
+        const remote = isRemote(resolvedUrl);
+        const entry = remote
+          ? await fetchFollowingRedirects(resolvedUrl)
+          : loadLocal(resolvedUrl);
+        if (observe) observe(remote ? 'fetch_remote' : 'fetch_local', secondsSince(started));
+
+        if (cache) {
+          cache.set(key, entry, entry.bytes);
+        }
+        return entry;
+      });
+      reportLoad(url, resolvedUrl, cacheStatus, started, entry);
+      return entry;
+    } catch (error) {
+      reportLoad(url, resolvedUrl, cacheStatus, started, null, error);
+      throw error;
+    }
+  }
+
+  async function documentLoader(url) {
+    const started = process.hrtime.bigint();
+    const resolvedUrl = resolveUrl(url);
+    if (observe) observe('mapping', secondsSince(started));
+
+    if (resolvedUrl !== url) {
+      console.log(`Mapping: ${url} -> ${resolvedUrl}`);
+    }
+
+    const entry = await loadResolved(resolvedUrl, url);
+    return { contextUrl: null, document: entry.document, documentUrl: entry.documentUrl };
+  }
+
+  documentLoader.forgetRedirects = () => permanentRedirects.clear();
+
+  // Close pooled connections
+  documentLoader.close = () => {
+    for (const agent of agents.values()) agent.destroy();
+    agents.clear();
+  };
+
+  return documentLoader;
+}
+
+// Drop cached source documents whose documentKey() is in `documents` (a Set)
+function forgetDocuments(cache, documents) {
+  for (const key of documents) cache.delete(key);
+}
+
+// Remote documents held in `cache` as [documentKey, entry] pairs, for a cache
+// snapshot. Local files are left out: they are cheap to read and their paths
+// may not exist where the snapshot is imported.
+function exportDocuments(cache) {
+  cache.prune();
+  return Array.from(cache.entries()).filter(([key]) => isRemote(key));
+}
+
+// Add snapshot entries to `cache`, keeping documents already loaded here.
+// Returns how many were added.
+function importDocuments(cache, entries) {
+  let imported = 0;
+  for (const [key, entry] of entries) {
+    if (!entry || cache.has(key)) continue;
+    if (cache.set(key, entry, entry.bytes)) imported++;
+  }
+  return imported;
+}
+
+module.exports = { createDocumentLoader, isRemote, documentKey, localFileChanged, forgetDocuments, exportDocuments, importDocuments };
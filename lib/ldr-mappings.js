@@ -0,0 +1,116 @@
+// ldr-mappings.js
+// Compiled URL mapping resolver with wildcard support and chaining
+
+const { LruCache } = require('./ldr-cache.js');
+
+const groupPatterns = [];
+
+// Cached /\$i/g for replacing the i-th capture group
+function groupPattern(i) {
+  if (!groupPatterns[i]) groupPatterns[i] = new RegExp(`\\$${i}`, 'g');
+  return groupPatterns[i];
+}
+
+function compileRule(pattern, replacement, index) {
+  const regexPattern = pattern.replace(/[.+?^${}()|[\]\\]/g, '\\$&').replace(/\*/g, '(.*)');
+  return {
+    index,
+    replacement,
+    regex: new RegExp('^' + regexPattern + '$'),
+    prefix: pattern.slice(0, pattern.indexOf('*'))
+  };
+}
+
+/**
+ * Mappings are compiled once when set:
+ *   - exact patterns go into a Map
+ *   - wildcard patterns are compiled to RegExps and indexed in a prefix trie
+ *     on their literal text before the first '*'
+ * A lookup walks the trie along the URL, so only rules whose literal prefix
+ * matches are tried, in their original order. Fully chained resolutions are
+ * memoized until the mappings change.
+ */
+class MappingResolver {
+  constructor({ maxChain = 10, memoSize = 10000 } = {}) {
+    this.maxChain = maxChain;
+    this.memo = new LruCache({ maxEntries: memoSize });
+    this.set({});
+  }
+
+  get size() {
+    return this.exact.size;
+  }
+
+  set(mappings) {
+    this.mappings = mappings;
+    this.exact = new Map(Object.entries(mappings));
+    this.trie = { children: new Map(), rules: [] };
+
+    Object.entries(mappings).forEach(([pattern, replacement], index) => {
+      if (!pattern.includes('*')) return;
+      const rule = compileRule(pattern, replacement, index);
+      let node = this.trie;
+      for (const ch of rule.prefix) {
+        if (!node.children.has(ch)) node.children.set(ch, { children: new Map(), rules: [] });
+        node = node.children.get(ch);
+      }
+      node.rules.push(rule);
+    });
+
+    this.memo.clear();
+  }
+
+  // Wildcard rules whose literal prefix is a prefix of url, in original order
+  candidates(url) {
+    const rules = [...this.trie.rules];
+    let node = this.trie;
+    for (const ch of url) {
+      node = node.children.get(ch);
+      if (!node) break;
+      rules.push(...node.rules);
+    }
+    return rules.sort((a, b) => a.index - b.index);
+  }
+
+  applyOnce(url) {
+    if (this.exact.get(url)) return this.exact.get(url);
+
+    for (const rule of this.candidates(url)) {
+      const match = url.match(rule.regex);
+      if (match) {
+        let result = rule.replacement.replace(/\$\{rest\}/g, match[1] || '');
+        for (let i = 0; i < match.length; i++) {
+          result = result.replace(groupPattern(i), match[i] || '');
+        }
+        return result;
+      }
+    }
+
+    return url;
+  }
+
+  // Apply mappings repeatedly until the URL stops changing
+  resolve(url) {
+    const memoized = this.memo.get(url);
+    if (memoized !== undefined) return memoized;
+
+    let currentUrl = url;
+    let depth = 0;
+
+    while (depth < this.maxChain) {
+      const nextUrl = this.applyOnce(currentUrl);
+      if (nextUrl === currentUrl) break;
+      currentUrl = nextUrl;
+      depth++;
+    }
+
+    if (depth >= this.maxChain) {
+      console.warn(`Max mapping depth (${this.maxChain}) reached for ${url}`);
+    }
+
+    this.memo.set(url, currentUrl, 1);
+    return currentUrl;
+  }
+}
+
+module.exports = { MappingResolver };
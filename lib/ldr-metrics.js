@@ -0,0 +1,156 @@
+// ldr-metrics.js
+// Minimal Prometheus metrics registry (text exposition format 0.0.4)
+
+const { monitorEventLoopDelay } = require('perf_hooks');
+
+// Seconds; covers sub-millisecond cache hits up to very large compactions
+const DEFAULT_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60];
+
+function escapeLabel(value) {
+  return String(value).replace(/\\/g, '\\\\').replace(/\n/g, '\\n').replace(/"/g, '\\"');
+}
+
+function formatLabels(labels) {
+  const entries = Object.entries(labels);
+  if (entries.length === 0) return '';
+  return '{' + entries.map(([name, value]) => `${name}="${escapeLabel(value)}"`).join(',') + '}';
+}
+
+/**
+ * Counter or gauge. Values are either recorded with inc()/set(), or read at
+ * scrape time from collect(), which returns a number or [labels, value] pairs.
+ */
+class Metric {
+  constructor(name, help, type, collect = null) {
+    this.name = name;
+    this.help = help;
+    this.type = type;
+    this.collect = collect;
+    this.values = new Map();  // formatted labels -> value
+  }
+
+  inc(labels = {}, amount = 1) {
+    const key = formatLabels(labels);
+    this.values.set(key, (this.values.get(key) || 0) + amount);
+  }
+
+  set(labels, value) {
+    this.values.set(formatLabels(labels), value);
+  }
+
+  *samples() {
+    if (this.collect) {
+      const collected = this.collect();
+      const pairs = typeof collected === 'number' ? [[{}, collected]] : collected;
+      for (const [labels, value] of pairs) yield `${this.name}${formatLabels(labels)} ${value}`;
+      return;
+    }
+    for (const [labels, value] of this.values) yield `${this.name}${labels} ${value}`;
+  }
+}
+
+class Histogram {
+  constructor(name, help, buckets = DEFAULT_BUCKETS) {
+    this.name = name;
+    this.help = help;
+    this.type = 'histogram';
+    this.buckets = buckets;
+    this.series = new Map();  // formatted labels -> { labels, counts, sum, count }
+  }
+
+  observe(labels, value) {
+    const key = formatLabels(labels);
+    let series = this.series.get(key);
+    if (!series) {
+      series = { labels, counts: new Array(this.buckets.length).fill(0), sum: 0, count: 0 };
+      this.series.set(key, series);
+    }
+    const index = this.buckets.findIndex(bound => value <= bound);
+    if (index !== -1) series.counts[index]++;
+    series.sum += value;
+    series.count++;
+  }
+
+  *samples() {
+    for (const { labels, counts, sum, count } of this.series.values()) {
+      let cumulative = 0;
+      for (let i = 0; i < this.buckets.length; i++) {
+        cumulative += counts[i];
+        yield `${this.name}_bucket${formatLabels({ ...labels, le: this.buckets[i] })} ${cumulative}`;
+      }
+      yield `${this.name}_bucket${formatLabels({ ...labels, le: '+Inf' })} ${count}`;
+      yield `${this.name}_sum${formatLabels(labels)} ${sum}`;
+      yield `${this.name}_count${formatLabels(labels)} ${count}`;
+    }
+  }
+}
+
+class MetricsRegistry {
+  constructor() {
+    this.metrics = [];
+  }
+
+  _register(metric) {
+    this.metrics.push(metric);
+    return metric;
+  }
+
+  counter(name, help, collect = null) {
+    return this._register(new Metric(name, help, 'counter', collect));
+  }
+
+  gauge(name, help, collect = null) {
+    return this._register(new Metric(name, help, 'gauge', collect));
+  }
+
+  histogram(name, help, buckets = DEFAULT_BUCKETS) {
+    return this._register(new Histogram(name, help, buckets));
+  }
+
+  render() {
+    const lines = [];
+    for (const metric of this.metrics) {
+      lines.push(`# HELP ${metric.name} ${metric.help}`);
+      lines.push(`# TYPE ${metric.name} ${metric.type}`);
+      for (const sample of metric.samples()) lines.push(sample);
+    }
+    return lines.join('\n') + '\n';
+  }
+}
+
+// Stopwatch: returns a function giving the seconds elapsed since the call
+function startTimer() {
+  const started = process.hrtime.bigint();
+  return () => Number(process.hrtime.bigint() - started) / 1e9;
+}
+
+// Event-loop lag (since the previous scrape), CPU and memory of this process
+function registerProcessMetrics(registry) {
+  const resolutionMs = 10;
+  const loopDelay = monitorEventLoopDelay({ resolution: resolutionMs });
+  loopDelay.enable();
+
+  // Samples include the sampling interval itself; report only the lag beyond it
+  const lag = nanoseconds => Math.max(0, nanoseconds / 1e9 - resolutionMs / 1000);
+
+  registry.gauge('ldr_event_loop_lag_seconds', 'Event loop delay since the previous scrape', () => {
+    const quantiles = [0.5, 0.9, 0.99].map(q => [{ quantile: q }, lag(loopDelay.percentile(q * 100))]);
+    const max = lag(loopDelay.max);
+    loopDelay.reset();
+    return [...quantiles, [{ quantile: 1 }, max]];
+  });
+
+  registry.counter('process_cpu_seconds_total', 'User and system CPU time spent', () => {
+    const { user, system } = process.cpuUsage();
+    return (user + system) / 1e6;
+  });
+
+  registry.gauge('process_resident_memory_bytes', 'Resident set size', () => process.memoryUsage().rss);
+
+  registry.gauge('nodejs_heap_bytes', 'V8 heap used and total, and memory held outside the heap', () => {
+    const { heapUsed, heapTotal, external } = process.memoryUsage();
+    return [[{ type: 'used' }, heapUsed], [{ type: 'total' }, heapTotal], [{ type: 'external' }, external]];
+  });
+}
+
+module.exports = { MetricsRegistry, registerProcessMetrics, startTimer, DEFAULT_BUCKETS };
@@ -0,0 +1,116 @@
+// ldr-pool.js
+// Pool of worker_threads that run expand/compact for the LDR server
+
+const { Worker } = require('worker_threads');
+
+/**
+ * Fixed-size pool of ldr-worker.js threads. Each task goes to the worker
+ * with the fewest tasks outstanding and resolves to { result, dependencies,
+ * trace }. Broadcast messages (mappings, document cache clears and
+ * invalidations) go to every worker and are replayed to a worker that
+ * replaces one that crashed; tasks on a crashed worker are rejected.
+ * request(message) sends a message to every worker and resolves to their
+ * replies' results (used to export and prime the workers' document caches).
+ * Phase timings reported by workers are passed to observe(phase, seconds);
+ * workerStats() returns the cache and scheduler figures each last reported.
+ */
+class WorkerPool {
+  constructor({ size, script, workerData, observe = null }) {
+    this.script = script;
+    this.workerData = workerData;
+    this.observe = observe;
+    this.nextId = 0;
+    this.completed = 0;
+    this.closed = false;
+    this.broadcasts = new Map();  // message type -> latest message
+    this.slots = Array.from({ length: size }, () => this._spawn());
+  }
+
+  get size() {
+    return this.slots.length;
+  }
+
+  _spawn() {
+    const worker = new Worker(this.script, { workerData: this.workerData });
+    const slot = { worker, pending: new Map(), stats: null };
+
+    worker.on('message', ({ id, result, dependencies, trace, error, observations, stats }) => {
+      if (this.observe && observations) {
+        for (const [phase, seconds] of observations) this.observe(phase, seconds);
+      }
+      if (stats) slot.stats = stats;
+      const task = slot.pending.get(id);
+      if (!task) return;
+      slot.pending.delete(id);
+      this.completed++;
+      if (error !== undefined) task.reject(new Error(error));
+      else task.resolve({ result, dependencies, trace });
+    });
+
+    const failPending = error => {
+      for (const task of slot.pending.values()) task.reject(error);
+      slot.pending.clear();
+    };
+
+    worker.on('error', error => {
+      console.error(`Worker ${worker.threadId} failed: ${error.message}`);
+      failPending(error);
+    });
+
+    worker.on('exit', code => {
+      failPending(new Error(`Worker exited with code ${code}`));
+      if (this.closed) return;
+      const index = this.slots.indexOf(slot);
+      if (index !== -1) this.slots[index] = this._spawn();
+    });
+
+    for (const message of this.broadcasts.values()) worker.postMessage(message);
+    return slot;
+  }
+
+  _send(slot, message) {
+    const id = this.nextId++;
+    return new Promise((resolve, reject) => {
+      slot.pending.set(id, { resolve, reject });
+      slot.worker.postMessage({ ...message, id });
+    });
+  }
+
+  run(task) {
+    if (this.closed) return Promise.reject(new Error('Worker pool is closed'));
+
+    const slot = this.slots.reduce((a, b) => (b.pending.size < a.pending.size ? b : a));
+    return this._send(slot, { type: 'run', ...task });
+  }
+
+  async request(message) {
+    if (this.closed) throw new Error('Worker pool is closed');
+    const replies = await Promise.all(this.slots.map(slot => this._send(slot, message)));
+    return replies.map(reply => reply.result);
+  }
+
+  broadcast(message) {
+    this.broadcasts.set(message.type, message);
+    for (const slot of this.slots) slot.worker.postMessage(message);
+  }
+
+  workerStats() {
+    return this.slots.map(slot => slot.stats).filter(Boolean);
+  }
+
+  stats() {
+    return {
+      workers: this.slots.length,
+      busy: this.slots.filter(slot => slot.pending.size > 0).length,
+      pending: this.slots.reduce((total, slot) => total + slot.pending.size, 0),
+      completed: this.completed
+    };
+  }
+
+  close() {
+    this.closed = true;
+    return Promise.all(this.slots.map(slot => slot.worker.terminate()));
+  }
+}
+
+module.exports = { WorkerPool };
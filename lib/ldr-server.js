@@ -11,8 +11,26 @@ const https = require('https');
 const fs = require('fs');
 const path = require('path');
 
+// LDR_READY_FD: a file descriptor (usually a pipe) inherited from whatever
+// launched the server. One JSON line is written to it and it is closed:
+// { ready: true, port, socket, pid, mappings } once the server is listening
+// with its initial mappings (mappings: how many rules), or
+// { ready: false, error } if it cannot start.
+const READY_FD = process.env.LDR_READY_FD ? parseInt(process.env.LDR_READY_FD) : null;
+
+function signalReady(status) {
+  if (READY_FD === null) return;
+  try {
+    fs.writeSync(READY_FD, JSON.stringify(status) + '\n');
+    fs.closeSync(READY_FD);
+  } catch (error) {
+    console.error(`Could not signal readiness on fd ${READY_FD}: ${error.message}`);
+  }
+}
+
 // Try to load jsonld from multiple locations
 let jsonld;
+let jsonldPath;
 const jsonldPaths = [
   'jsonld',  // Normal require (global or local node_modules)
   path.join(__dirname, 'node_modules', 'jsonld'),
@@ -27,6 +45,7 @@ const jsonldPaths = [
 for (const p of jsonldPaths) {
   try {
     jsonld = require(p);
+    jsonldPath = require.resolve(p);
     console.log(`Loaded jsonld from: ${p}`);
     break;
   } catch (e) {
@@ -42,121 +61,361 @@ if (!jsonld) {
   console.error('  npm install -g jsonld');
   console.error('  npm install jsonld');
   console.error('  cd ' + __dirname + ' && npm install jsonld');
+  signalReady({ ready: false, error: 'jsonld package not found' });
   process.exit(1);
 }
 
-// Load ldr-core from same directory
-const { expandRecursive, compactJsonLd } = require('./ldr-core.js');
+// Load ldr-core and helpers from same directory
+const { DEFAULT_PORT } = require('./config.js');
+const { LruCache, SingleFlight, DependencyIndex } = require('./ldr-cache.js');
+const { isRemote, documentKey, forgetDocuments, exportDocuments, importDocuments } = require('./ldr-loader.js');
+const { CacheLog, writeSnapshot, readSnapshot } = require('./ldr-store.js');
+const { MappingResolver } = require('./ldr-mappings.js');
+const { createEngine, ExpandedDocumentCache, loadContextResolver } = require('./ldr-engine.js');
+const { fingerprint } = require('./ldr-context.js');
+const { WorkerPool } = require('./ldr-pool.js');
+const { MetricsRegistry, registerProcessMetrics, startTimer } = require('./ldr-metrics.js');
+const wire = require('./ldr-wire.js');
+
+// Optional on-disk log so cached results survive restarts
+const CACHE_FILE = process.env.CACHE_FILE;
+const cacheLog = CACHE_FILE
+  ? new CacheLog(CACHE_FILE, {
+    liveSize: () => cache.size,
+    liveEntries: function* () {
+      for (const [key, value] of cache.entries()) yield [key, value, dependencies.get(key)];
+    }
+  })
+  : null;
+
+// In-memory result cache and mappings
+const cache = new LruCache({
+  maxEntries: parseInt(process.env.CACHE_MAX_ENTRIES) || 1000,
+  maxBytes: parseInt(process.env.CACHE_MAX_BYTES) || 256 * 1024 * 1024,
+  ttl: (parseFloat(process.env.CACHE_TTL) || 0) * 1000,
+  onEvict: key => {
+    dependencies.delete(key);
+    if (cacheLog) cacheLog.remove(key);
+  }
+});
+const mappings = new MappingResolver();
+
+// Source documents each cached result was built from, for POST /cache/invalidate
+const dependencies = new DependencyIndex();
+
+// Results currently being computed, keyed like the cache
+const inflight = new SingleFlight();
+
+// Raw source documents keyed by resolved URL, shared by every expansion
+const documentCacheLimits = {
+  maxEntries: parseInt(process.env.DOCUMENT_CACHE_MAX_ENTRIES) || 10000,
+  maxBytes: parseInt(process.env.DOCUMENT_CACHE_MAX_BYTES) || 64 * 1024 * 1024
+};
+const documentCache = new LruCache(documentCacheLimits);
+
+// jsonld.expand results per document, reused by requests at any depth
+const expandedCacheLimits = {
+  maxEntries: parseInt(process.env.EXPANDED_CACHE_MAX_ENTRIES) || 10000,
+  maxBytes: parseInt(process.env.EXPANDED_CACHE_MAX_BYTES) || 128 * 1024 * 1024
+};
+const expandedCache = new ExpandedDocumentCache(expandedCacheLimits);
+
+// Prometheus metrics served at /metrics
+const metrics = new MetricsRegistry();
+const ENDPOINTS = new Set([
+  '/health', '/metrics', '/mappings', '/cache', '/cache/stats', '/cache/list', '/cache/invalidate',
+  '/cache/export', '/cache/import',
+  '/resolve', '/test-load', '/expand', '/compact', '/context', '/batch'
+]);
+const httpRequests = metrics.counter('ldr_http_requests_total', 'HTTP requests by endpoint, method and status');
+const httpDuration = metrics.histogram('ldr_http_request_duration_seconds', 'HTTP request latency by endpoint');
+const phaseDuration = metrics.histogram(
+  'ldr_phase_duration_seconds',
+  'Time per processing phase: mapping, fetch_local, fetch_remote, expand and compact (jsonld.expand/compact, including the loads they trigger), serialize'
+);
+let requestsInFlight = 0;
+metrics.gauge('ldr_http_requests_in_flight', 'HTTP requests being served', () => requestsInFlight);
+metrics.gauge('ldr_operations_in_flight', 'Distinct expand/compact computations running', () => inflight.size);
+
+// Totals of the stats objects reported by each worker: counts and limits add
+// up (limits are per worker), hit_ratio is recomputed from the totals
+function sumStats(all) {
+  const total = {};
+  for (const stats of all) {
+    for (const [key, value] of Object.entries(stats)) {
+      if (typeof value === 'number' && key !== 'ttl_seconds') total[key] = (total[key] || 0) + value;
+      else if (!(key in total)) total[key] = value;
+    }
+  }
+  if ('hits' in total) {
+    const lookups = total.hits + total.misses;
+    total.hit_ratio = lookups ? total.hits / lookups : 0;
+  }
+  return total;
+}
+
+// Document caches and load scheduler of the threads running expand/compact:
+// with workers, the totals across them (this thread's then serve only
+// /resolve and /test-load)
+function workStats() {
+  if (!pool) return { documents: documentCache.stats(), expanded: expandedCache.stats(), scheduler: scheduler.stats() };
+  const all = pool.workerStats();
+  return {
+    documents: sumStats(all.map(stats => stats.documents)),
+    expanded: sumStats(all.map(stats => stats.expanded)),
+    scheduler: sumStats(all.map(stats => stats.scheduler))
+  };
+}
+
+const cacheStats = () => {
+  const { documents, expanded } = workStats();
+  return [['results', cache.stats()], ['documents', documents], ['expanded', expanded]];
+};
+metrics.counter('ldr_cache_hits_total', 'Cache lookups that hit', () => cacheStats().map(([name, stats]) => [{ cache: name }, stats.hits]));
+metrics.counter('ldr_cache_misses_total', 'Cache lookups that missed', () => cacheStats().map(([name, stats]) => [{ cache: name }, stats.misses]));
+metrics.counter('ldr_cache_evictions_total', 'Entries evicted for space or expiry', () => cacheStats().map(([name, stats]) => [{ cache: name }, stats.evictions]));
+metrics.gauge('ldr_cache_hit_ratio', 'Cache hits / lookups since start', () => cacheStats().map(([name, stats]) => [{ cache: name }, stats.hit_ratio]));
+metrics.gauge('ldr_cache_entries', 'Entries in the cache', () => cacheStats().map(([name, stats]) => [{ cache: name }, stats.size]));
+metrics.gauge('ldr_cache_bytes', 'Estimated bytes held by the cache', () => cacheStats().map(([name, stats]) => [{ cache: name }, stats.bytes]));
+registerProcessMetrics(metrics);
+
+function observePhase(phase, seconds) {
+  phaseDuration.observe({ phase }, seconds);
+}
 
-// In-memory cache and mappings
-const cache = new Map();
-let urlMappings = {};
+// Apply URL mappings with wildcard support and chaining (compiled, memoized)
+function applyMappings(url) {
+  return mappings.resolve(url);
+}
 
-// Apply URL mappings with wildcard support and chaining
-function applyMappings(url, maxDepth = 10) {
-  let currentUrl = url;
-  let depth = 0;
-  
-  while (depth < maxDepth) {
-    const nextUrl = applySingleMapping(currentUrl);
-    if (nextUrl === currentUrl) break;
-    currentUrl = nextUrl;
-    depth++;
+const loadConcurrency = {
+  concurrency: parseInt(process.env.LDR_CONCURRENCY) || 64,
+  perHost: parseInt(process.env.LDR_PER_HOST_CONCURRENCY) || 16
+};
+
+// Document loader, load scheduler and expand/compact on this thread
+const {
+  documentLoader, scheduler, run: localRun, compact: localCompact, traced: localTraced, resetContexts
+} = createEngine(jsonld, {
+  mappings,
+  documentCache,
+  expandedCache,
+  ...loadConcurrency,
+  observe: observePhase,
+  ContextResolver: loadContextResolver(jsonldPath)
+});
+
+// With LDR_WORKERS=N, expand/compact run on N worker threads so CPU-heavy
+// jsonld work does not block the event loop. The result cache, request
+// coalescing, mappings and /resolve stay on this thread.
+const WORKERS = parseInt(process.env.LDR_WORKERS) || 0;
+const pool = WORKERS > 0
+  ? new WorkerPool({
+    size: WORKERS,
+    script: path.join(__dirname, 'ldr-worker.js'),
+    workerData: { jsonldPath, documentCache: documentCacheLimits, expandedCache: expandedCacheLimits, ...loadConcurrency },
+    observe: observePhase
+  })
+  : null;
+
+const OPERATIONS = new Set(['expand', 'compact', 'context']);
+
+// Run an operation, or compact an expanded tree ({ result, dependencies })
+const compute = pool
+  ? (operation, url, depth) => pool.run({ operation, url, depth })
+  : localRun;
+const compactTree = pool
+  ? (url, depth, expanded) => pool.run({ operation: 'compact', url, depth, expanded })
+  : (url, depth, expanded) => localCompact(url, expanded);
+
+// Run an operation with a trace tree ({ result, trace, dependencies })
+const traced = pool
+  ? (operation, url, depth) => pool.run({ operation, url, depth, trace: true })
+  : localTraced;
+
+// Expanded documents are dropped too: the same URL may now load another document
+function setMappings(newMappings) {
+  mappings.set(newMappings);
+  expandedCache.clear();
+  resetContexts();
+  if (pool) pool.broadcast({ type: 'mappings', mappings: newMappings });
+}
+
+function getCacheKey(url, depth, operation) {
+  return `${operation}:${url}:${depth}`;
+}
+
+// Compute a result and the documents it was built from. compact compacts the
+// expansion at the same depth, so it reuses one that is cached or in flight
+// (and caches it for /expand) rather than expanding again.
+async function computeOperation(operation, url, depth) {
+  if (operation !== 'compact') return compute(operation, url, depth);
+
+  const expanded = await resolveOperation('expand', url, depth);
+  const compacted = await compactTree(url, depth, expanded.result);
+  return { result: compacted.result, dependencies: { ...expanded.dependencies, ...compacted.dependencies } };
+}
+
+// Look up or compute a result ({ result, dependencies, cached, coalesced? }).
+// Concurrent identical requests wait for the first one instead of repeating the work.
+async function resolveOperation(operation, url, depth) {
+  const cacheKey = getCacheKey(url, depth, operation);
+
+  const cached = cache.get(cacheKey);
+  if (cached !== undefined) {
+    console.log(`Cache HIT: ${cacheKey}`);
+    return { result: cached, dependencies: dependencies.get(cacheKey) || {}, cached: true };
   }
-  
-  if (depth >= maxDepth) {
-    console.warn(`Max mapping depth (${maxDepth}) reached for ${url}`);
+
+  if (inflight.has(cacheKey)) {
+    console.log(`Cache WAIT: ${cacheKey}`);
+    return { ...await inflight.run(cacheKey), cached: false, coalesced: true };
   }
-  
-  return currentUrl;
+
+  console.log(`Cache MISS: ${cacheKey}`);
+  const computed = await inflight.run(cacheKey, async () => {
+    const outcome = await computeOperation(operation, url, depth);
+    cacheSet(cacheKey, outcome.result, outcome.dependencies);
+    return outcome;
+  });
+  return { ...computed, cached: false };
 }
 
-function applySingleMapping(url) {
-  if (urlMappings[url]) return urlMappings[url];
-  
-  for (const [pattern, replacement] of Object.entries(urlMappings)) {
-    if (pattern.includes('*')) {
-      const regexPattern = pattern.replace(/[.+?^${}()|[\]\\]/g, '\\$&').replace(/\*/g, '(.*)');
-      const regex = new RegExp('^' + regexPattern + '$');
-      const match = url.match(regex);
-      
-      if (match) {
-        let result = replacement;
-        result = result.replace(/\$\{rest\}/g, match[1] || '');
-        for (let i = 0; i < match.length; i++) {
-          result = result.replace(new RegExp(`\\$${i}`, 'g'), match[i] || '');
-        }
-        return result;
-      }
+// Run an operation through the result cache
+async function runOperation(operation, url, depth) {
+  const { dependencies: documents, ...outcome } = await resolveOperation(operation, url, depth);
+  return outcome;
+}
+
+// Run an operation with tracing. The cache lookup and request coalescing are
+// skipped so the trace shows the real work; the fresh result is still cached.
+// A failed operation is reported in trace.error with a null result.
+async function runTracedOperation(operation, url, depth) {
+  const cacheKey = getCacheKey(url, depth, operation);
+  console.log(`TRACE: ${cacheKey}`);
+  const { result, trace, dependencies: documents } = await traced(operation, url, depth);
+  if (!trace.error) cacheSet(cacheKey, result, documents);
+  return { result, cached: false, trace };
+}
+
+// Fingerprints of cached compiled contexts, computed once per cached value
+const contextFingerprints = new WeakMap();
+
+function contextFingerprint(context) {
+  if (context === null || typeof context !== 'object') return fingerprint(context);
+  if (!contextFingerprints.has(context)) contextFingerprints.set(context, fingerprint(context));
+  return contextFingerprints.get(context);
+}
+
+// Store a result and the documents it was built from. size is its byte
+// size when already known (estimated otherwise).
+function remember(key, value, documents, size = undefined) {
+  dependencies.delete(key);
+  if (!cache.set(key, value, size)) return false;
+  if (documents) dependencies.set(key, documents);
+  return true;
+}
+
+// Store a result, writing through to the cache log when enabled. The log
+// serialises the result anyway, so the cache is sized from that.
+function cacheSet(key, value, documents) {
+  const serialized = cacheLog ? JSON.stringify(value) : undefined;
+  const stored = remember(key, value, documents, serialized && Buffer.byteLength(serialized));
+  if (stored && cacheLog) cacheLog.append(key, value, documents, serialized);
+  return stored;
+}
+
+// Drop a cached result, keeping the cache log in step
+function cacheDelete(key) {
+  cache.delete(key);
+  dependencies.delete(key);
+  if (cacheLog) cacheLog.remove(key);
+}
+
+// Invalidate the cached results built from any of `documents` (documentKey()s),
+// and the cached copies of the documents themselves
+function invalidateDocuments(documents) {
+  const keys = dependencies.dependents(documents);
+  for (const key of keys) cacheDelete(key);
+  forgetDocuments(documentCache, documents);
+  expandedCache.invalidate(documents);
+  resetContexts();
+  if (pool) pool.broadcast({ type: 'invalidate', documents: Array.from(documents) });
+  console.log(`Cache invalidated: ${keys.size} entries depending on ${documents.size} documents`);
+  return { invalidated: keys.size, keys: Array.from(keys), documents: Array.from(documents) };
+}
+
+// Local documents whose modification time differs from the one recorded by
+// some cached result (or that no longer exist). Remote documents are not checked.
+function changedDocuments() {
+  const changed = new Set();
+  for (const [document, versions] of dependencies.documents()) {
+    if (isRemote(document)) continue;
+    let mtime = null;
+    try {
+      mtime = fs.statSync(document).mtimeMs;
+    } catch (e) {
+      // Missing: changed if a result loaded it successfully
     }
+    if (versions.some(([, version]) => (version.mtime ?? null) !== mtime)) changed.add(document);
   }
-  
-  return url;
+  return changed;
 }
 
-// Custom document loader
-async function documentLoader(url) {
-  const resolvedUrl = applyMappings(url);
-  
-  if (resolvedUrl !== url) {
-    console.log(`Mapping: ${url} -> ${resolvedUrl}`);
+// Replay the cache log in the background; entries computed meanwhile win
+async function loadCacheLog() {
+  const entries = await cacheLog.load();
+  for (const [key, { value, dependencies: documents }] of entries) {
+    if (!cache.has(key)) remember(key, value, documents);
   }
-  
-  // Local file path
-  if (!resolvedUrl.startsWith('http://') && !resolvedUrl.startsWith('https://')) {
-    try {
-      const absolutePath = path.resolve(resolvedUrl.replace('file://', ''));
-      const content = fs.readFileSync(absolutePath, 'utf8');
-      const document = JSON.parse(content);
-      
-      console.log(`Loaded local: ${absolutePath}`);
-      
-      return {
-        contextUrl: null,
-        document: document,
-        documentUrl: 'file://' + absolutePath
-      };
-    } catch (error) {
-      throw new Error(`Could not load local file ${resolvedUrl}: ${error.message}`);
+  console.log(`Loaded ${entries.size} cached results from ${CACHE_FILE}`);
+  await cacheLog.maybeCompact();
+}
+
+// Snapshot of the result cache and of the remote documents loaded so far (by
+// every worker with LDR_WORKERS), for priming another server
+async function exportSnapshot() {
+  let documents = exportDocuments(documentCache);
+  if (pool) {
+    const merged = new Map(documents);
+    for (const entries of await pool.request({ type: 'export-documents' })) {
+      for (const [resolvedUrl, entry] of entries) merged.set(resolvedUrl, entry);
     }
+    documents = merged;
   }
-  
-  // HTTP/HTTPS URLs
-  return new Promise((resolve, reject) => {
-    const client = resolvedUrl.startsWith('https:') ? https : http;
-    
-    client.get(resolvedUrl, { headers: { 'Accept': 'application/ld+json, application/json' } }, (res) => {
-      let data = '';
-      
-      if (res.statusCode === 301 || res.statusCode === 302) {
-        return documentLoader(res.headers.location).then(resolve).catch(reject);
-      }
-      
-      if (res.statusCode !== 200) {
-        reject(new Error(`HTTP ${res.statusCode}: ${res.statusMessage}`));
-        return;
-      }
-      
-      res.on('data', chunk => data += chunk);
-      res.on('end', () => {
-        try {
-          let document = JSON.parse(data);
-          if (Array.isArray(document)) {
-            document = { '@context': document };
-          }
-          resolve({ contextUrl: null, document: document, documentUrl: resolvedUrl });
-        } catch (error) {
-          reject(new Error(`Failed to parse JSON from ${resolvedUrl}: ${error.message}`));
-        }
-      });
-    }).on('error', reject);
-  });
+  cache.prune();
+  const results = Array.from(cache.entries(), ([key, value]) => [key, value, dependencies.get(key)]);
+  return writeSnapshot(results, documents);
 }
 
-jsonld.documentLoader = documentLoader;
+// Prime the caches from a snapshot (a Buffer); entries already cached here win
+async function importSnapshot(buffer) {
+  const snapshot = readSnapshot(buffer);
+  let results = 0;
+  for (const [key, value, documents] of snapshot.results) {
+    if (!cache.has(key) && cacheSet(key, value, documents)) results++;
+  }
+  const documents = pool
+    ? (await pool.request({ type: 'import-documents', documents: snapshot.documents }))[0]
+    : importDocuments(documentCache, snapshot.documents);
+  console.log(`Imported cache snapshot: ${results} results, ${documents} documents`);
+  return { results, documents, skipped: snapshot.results.length - results };
+}
 
-function getCacheKey(url, depth, operation) {
-  return `${operation}:${url}:${depth}`;
+function shutdown() {
+  cache.clear();
+  documentLoader.close();
+  const closed = Promise.all([cacheLog && cacheLog.close(), pool && pool.close()]);
+  closed.then(() => server.close(() => process.exit(0)));
+}
+
+function readBody(req) {
+  return new Promise((resolve, reject) => {
+    const chunks = [];
+    req.on('data', chunk => chunks.push(chunk));
+    req.on('end', () => resolve(Buffer.concat(chunks)));
+    req.on('error', reject);
+  });
 }
 
 function parseBody(req) {
@@ -173,37 +432,107 @@ function parseBody(req) {
   });
 }
 
+const CORS_HEADERS = {
+  'Access-Control-Allow-Origin': '*',
+  'Access-Control-Allow-Methods': 'GET, POST, DELETE, OPTIONS',
+  'Access-Control-Allow-Headers': 'Content-Type'
+};
+
+// Send data in the format negotiated for this request (minified JSON by default)
 function sendJson(res, statusCode, data) {
-  res.writeHead(statusCode, {
-    'Content-Type': 'application/json',
-    'Access-Control-Allow-Origin': '*',
-    'Access-Control-Allow-Methods': 'GET, POST, DELETE, OPTIONS',
-    'Access-Control-Allow-Headers': 'Content-Type'
+  const elapsed = startTimer();
+  const streaming = wire.send(res, statusCode, data, res.wire, CORS_HEADERS);
+  if (streaming) {
+    streaming
+      .then(() => observePhase('serialize', elapsed()))
+      .catch(error => {
+        console.error('Error streaming response:', error);
+        res.destroy(error);
+      });
+  } else {
+    observePhase('serialize', elapsed());
+  }
+}
+
+// Write one NDJSON line, waiting for the socket to drain when its buffer is full
+async function writeLine(res, data) {
+  if (!res.write(JSON.stringify(data) + '\n')) {
+    await new Promise(resolve => res.once('drain', resolve));
+  }
+}
+
+// Run batch items with bounded concurrency, streaming each result as it completes
+async function streamBatch(res, items, concurrency) {
+  let next = 0;
+  let closed = false;
+  // Stop picking up new items if the client goes away
+  res.on('close', () => { if (!res.writableEnded) closed = true; });
+
+  res.writeHead(200, { 'Content-Type': 'application/x-ndjson', ...CORS_HEADERS });
+
+  async function worker() {
+    while (next < items.length && !closed) {
+      const index = next++;
+      const item = items[index] || {};
+      const operation = item.operation || 'compact';
+      let line;
+      try {
+        if (!item.url) throw new Error('Missing url');
+        if (!OPERATIONS.has(operation)) throw new Error(`Unknown operation: ${operation}`);
+        const outcome = await runOperation(operation, item.url, item.depth || 2);
+        line = { index, url: item.url, operation, ...outcome };
+      } catch (error) {
+        line = { index, url: item.url, operation, error: error.message };
+      }
+      if (!closed) await writeLine(res, line);
+    }
+  }
+
+  const workers = Math.max(1, Math.min(concurrency, items.length));
+  await Promise.all(Array.from({ length: workers }, worker));
+  res.end();
+}
+
+// Count and time every request by endpoint
+function handleRequestWithMetrics(req, res) {
+  const elapsed = startTimer();
+  const pathname = req.url.split('?')[0];
+  const endpoint = ENDPOINTS.has(pathname) ? pathname : 'other';
+  requestsInFlight++;
+  res.on('close', () => {
+    requestsInFlight--;
+    httpRequests.inc({ endpoint, method: req.method, status: res.statusCode });
+    httpDuration.observe({ endpoint }, elapsed());
   });
-  res.end(JSON.stringify(data, null, 2));
+  return handleRequest(req, res);
 }
 
 async function handleRequest(req, res) {
   const url = new URL(req.url, `http://${req.headers.host}`);
+  res.wire = wire.negotiate(req, url.searchParams);
   
   if (req.method === 'OPTIONS') {
-    res.writeHead(204, {
-      'Access-Control-Allow-Origin': '*',
-      'Access-Control-Allow-Methods': 'GET, POST, DELETE, OPTIONS',
-      'Access-Control-Allow-Headers': 'Content-Type'
-    });
+    res.writeHead(204, CORS_HEADERS);
     res.end();
     return;
   }
 
   try {
     if (url.pathname === '/health' && req.method === 'GET') {
-      sendJson(res, 200, { status: 'ok', cache_size: cache.size, mappings_count: Object.keys(urlMappings).length });
+      const health = { status: 'ok', cache_size: cache.size, mappings_count: mappings.size, scheduler: workStats().scheduler };
+      if (pool) health.workers = pool.stats();
+      sendJson(res, 200, health);
+      return;
+    }
+
+    if (url.pathname === '/metrics' && req.method === 'GET') {
+      res.writeHead(200, { 'Content-Type': 'text/plain; version=0.0.4', ...CORS_HEADERS });
+      res.end(metrics.render());
       return;
     }
 
     if (url.pathname === '/mappings' && req.method === 'GET') {
-      sendJson(res, 200, { mappings: urlMappings });
+      sendJson(res, 200, { mappings: mappings.mappings });
       return;
     }
 
@@ -211,14 +540,14 @@ async function handleRequest(req, res) {
       const body = await parseBody(req);
       if (body.file) {
         try {
-          urlMappings = JSON.parse(fs.readFileSync(body.file, 'utf8'));
-          sendJson(res, 200, { message: 'Mappings loaded', count: Object.keys(urlMappings).length, mappings: urlMappings });
+          setMappings(JSON.parse(fs.readFileSync(body.file, 'utf8')));
+          sendJson(res, 200, { message: 'Mappings loaded', count: mappings.size, mappings: mappings.mappings });
         } catch (error) {
           sendJson(res, 400, { error: `Failed to load mappings: ${error.message}` });
         }
       } else if (body.mappings) {
-        urlMappings = body.mappings;
-        sendJson(res, 200, { message: 'Mappings set', count: Object.keys(urlMappings).length, mappings: urlMappings });
+        setMappings(body.mappings);
+        sendJson(res, 200, { message: 'Mappings set', count: mappings.size, mappings: mappings.mappings });
       } else {
         sendJson(res, 400, { error: 'Missing file or mappings' });
       }
@@ -226,29 +555,86 @@ async function handleRequest(req, res) {
     }
 
     if (url.pathname === '/mappings' && req.method === 'DELETE') {
-      const count = Object.keys(urlMappings).length;
-      urlMappings = {};
+      const count = mappings.size;
+      setMappings({});
       sendJson(res, 200, { cleared: count });
       return;
     }
 
     if (url.pathname === '/cache/stats' && req.method === 'GET') {
-      sendJson(res, 200, { size: cache.size, keys: Array.from(cache.keys()) });
+      const { documents, expanded } = workStats();
+      sendJson(res, 200, {
+        ...cache.stats(),
+        heaviest: cache.heaviest(10),
+        documents,
+        expanded,
+        tracked_documents: dependencies.size
+      });
       return;
     }
 
     if (url.pathname === '/cache/list' && req.method === 'GET') {
-      sendJson(res, 200, { count: cache.size, urls: Array.from(cache.keys()) });
+      sendJson(res, 200, { count: cache.size, urls: cache.keys() });
       return;
     }
 
     if (url.pathname === '/cache' && req.method === 'DELETE') {
       const size = cache.size;
       cache.clear();
+      dependencies.clear();
+      documentCache.clear();
+      expandedCache.clear();
+      resetContexts();
+      documentLoader.forgetRedirects();
+      if (pool) pool.broadcast({ type: 'clear' });
+      if (cacheLog) cacheLog.clear();
+      console.log(`Cache cleared: ${size} entries removed`);
       sendJson(res, 200, { cleared: size });
       return;
     }
 
+    // Invalidate only the results built from the given documents
+    if (url.pathname === '/cache/invalidate' && req.method === 'POST') {
+      const body = await parseBody(req);
+      const documents = new Set();
+      for (const u of [].concat(body.url || [])) documents.add(documentKey(applyMappings(u)));
+      for (const p of [].concat(body.path || [])) documents.add(path.resolve(p));
+      if (body.stale) {
+        for (const document of changedDocuments()) documents.add(document);
+      } else if (documents.size === 0) {
+        sendJson(res, 400, { error: 'Missing url, path or stale' });
+        return;
+      }
+      sendJson(res, 200, invalidateDocuments(documents));
+      return;
+    }
+
+    if (url.pathname === '/cache/export' && req.method === 'GET') {
+      const { snapshot, results, documents } = await exportSnapshot();
+      res.writeHead(200, {
+        'Content-Type': 'application/octet-stream',
+        'Content-Length': snapshot.length,
+        'X-LDR-Snapshot-Results': results,
+        'X-LDR-Snapshot-Documents': documents,
+        ...CORS_HEADERS
+      });
+      res.end(snapshot);
+      return;
+    }
+
+    if (url.pathname === '/cache/import' && req.method === 'POST') {
+      const body = await readBody(req);
+      let imported;
+      try {
+        imported = await importSnapshot(body);
+      } catch (error) {
+        sendJson(res, 400, { error: error.message });
+        return;
+      }
+      sendJson(res, 200, imported);
+      return;
+    }
+
     // Test URL resolution/mapping
     if (url.pathname === '/resolve' && req.method === 'POST') {
       const body = await parseBody(req);
@@ -256,7 +642,7 @@ async function handleRequest(req, res) {
 
       const originalUrl = body.url;
       const resolvedUrl = applyMappings(originalUrl);
-      const isLocal = !resolvedUrl.startsWith('http://') && !resolvedUrl.startsWith('https://');
+      const isLocal = !isRemote(resolvedUrl);
       
       let exists = false;
       let fileInfo = null;
@@ -333,43 +719,47 @@ async function handleRequest(req, res) {
       return;
     }
 
-    if (url.pathname === '/expand' && req.method === 'POST') {
+    if ((url.pathname === '/expand' || url.pathname === '/compact') && req.method === 'POST') {
       const body = await parseBody(req);
       if (!body.url) { sendJson(res, 400, { error: 'Missing url' }); return; }
 
       const depth = body.depth || 2;
-      const cacheKey = getCacheKey(body.url, depth, 'expand');
-      
-      if (cache.has(cacheKey)) {
-        console.log(`Cache HIT: ${cacheKey}`);
-        sendJson(res, 200, { result: cache.get(cacheKey), cached: true });
-        return;
-      }
-
-      console.log(`Cache MISS: ${cacheKey}`);
-      const result = await expandRecursive(jsonld, body.url, depth);
-      cache.set(cacheKey, result);
-      sendJson(res, 200, { result, cached: false });
+      const operation = url.pathname.slice(1);
+      sendJson(res, 200, body.trace
+        ? await runTracedOperation(operation, body.url, depth)
+        : await runOperation(operation, body.url, depth));
       return;
     }
 
-    if (url.pathname === '/compact' && req.method === 'POST') {
+    // A client that already holds the compiled context sends its fingerprint
+    // and gets { unchanged: true } instead of the context when it still matches
+    if (url.pathname === '/context' && req.method === 'POST') {
       const body = await parseBody(req);
       if (!body.url) { sendJson(res, 400, { error: 'Missing url' }); return; }
 
       const depth = body.depth || 2;
-      const cacheKey = getCacheKey(body.url, depth, 'compact');
-      
-      if (cache.has(cacheKey)) {
-        console.log(`Cache HIT: ${cacheKey}`);
-        sendJson(res, 200, { result: cache.get(cacheKey), cached: true });
+      if (body.trace) { sendJson(res, 200, await runTracedOperation('context', body.url, depth)); return; }
+
+      let outcome;
+      try {
+        outcome = await runOperation('context', body.url, depth);
+      } catch (error) {
+        // A missing or broken context document: not worth retrying
+        sendJson(res, 422, { error: error.message });
         return;
       }
+      const current = contextFingerprint(outcome.result);
+      sendJson(res, 200, body.fingerprint === current
+        ? { result: null, fingerprint: current, unchanged: true, cached: outcome.cached }
+        : { ...outcome, fingerprint: current });
+      return;
+    }
+
+    if (url.pathname === '/batch' && req.method === 'POST') {
+      const body = await parseBody(req);
+      if (!Array.isArray(body.items)) { sendJson(res, 400, { error: 'Missing items' }); return; }
 
-      console.log(`Cache MISS: ${cacheKey}`);
-      const result = await compactJsonLd(jsonld, body.url, depth);
-      cache.set(cacheKey, result);
-      sendJson(res, 200, { result, cached: false });
+      await streamBatch(res, body.items, parseInt(body.concurrency) || 8);
       return;
     }
 
@@ -380,13 +770,92 @@ async function handleRequest(req, res) {
   }
 }
 
-const PORT = process.env.PORT || 3000;
-const server = http.createServer(handleRequest);
+// PORT=0 listens on any free port; the port bound is logged and sent to LDR_READY_FD
+const PORT = process.env.PORT || DEFAULT_PORT;
+const SOCKET_PATH = process.env.SOCKET_PATH;
+const MAPPINGS_FILE = process.env.MAPPINGS_FILE;
+// Initial mappings as JSON, replacing MAPPINGS_FILE's (as a POST /mappings
+// right after startup would), so a launcher needs no follow-up request
+const MAPPINGS_JSON = process.env.MAPPINGS_JSON;
+
+// Load initial mappings before listening, so no request sees the server without them
+if (MAPPINGS_FILE) {
+  try {
+    setMappings(JSON.parse(fs.readFileSync(MAPPINGS_FILE, 'utf8')));
+    console.log(`Loaded ${mappings.size} URL mappings from ${MAPPINGS_FILE}`);
+  } catch (error) {
+    console.error(`Failed to load mappings from ${MAPPINGS_FILE}: ${error.message}`);
+  }
+}
+
+// Mappings handed over by a launcher must all be in place: failing to load
+// them fails the startup rather than serving without them
+if (MAPPINGS_JSON) {
+  try {
+    setMappings(JSON.parse(MAPPINGS_JSON));
+    console.log(`Loaded URL mappings from MAPPINGS_JSON (${mappings.size} rules)`);
+  } catch (error) {
+    const message = `Failed to load mappings from MAPPINGS_JSON: ${error.message}`;
+    console.error(message);
+    signalReady({ ready: false, error: message });
+    process.exit(1);
+  }
+}
+
+const server = http.createServer(handleRequestWithMetrics);
 
-server.listen(PORT, () => {
-  console.log(`LDR Server running on http://localhost:${PORT}`);
+// Listen on a Unix domain socket instead of TCP when SOCKET_PATH is set.
+// A socket file left behind by a crashed server would make listen() fail.
+if (SOCKET_PATH && fs.existsSync(SOCKET_PATH)) {
+  fs.unlinkSync(SOCKET_PATH);
+}
+
+server.on('error', error => {
+  console.error(`Server error: ${error.message}`);
+  if (!server.listening) {
+    signalReady({ ready: false, error: error.message });
+    process.exit(1);
+  }
+});
+
+server.listen(SOCKET_PATH || PORT, () => {
+  const port = SOCKET_PATH ? null : server.address().port;
+  if (SOCKET_PATH) {
+    console.log(`LDR Server (ldr-server) running on unix:${SOCKET_PATH}`);
+  } else {
+    console.log(`LDR Server (ldr-server) running on http://localhost:${port}`);
+  }
+  console.log(`Process title: ${process.title}`);
   console.log(`Stop with: pkill ldr-server`);
+  console.log('');
+  console.log('Endpoints:');
+  console.log('  POST /expand         - Expand JSON-LD');
+  console.log('  POST /compact        - Compact JSON-LD');
+  console.log('  POST /context        - Compiled @context of a document');
+  console.log('  POST /batch          - Expand/compact many URLs, streamed as NDJSON');
+  console.log('  GET  /health         - Health check');
+  console.log('  GET  /metrics        - Prometheus metrics');
+  console.log('  GET  /cache/stats    - Cache statistics');
+  console.log('  DELETE /cache        - Clear cache');
+  console.log('  POST /cache/invalidate - Drop results built from changed documents');
+  console.log('  GET  /cache/export   - Snapshot of the result and document caches');
+  console.log('  POST /cache/import   - Prime the caches from a snapshot');
+  console.log('  GET  /mappings       - Get URL mappings');
+  console.log('  POST /mappings       - Set URL mappings');
+  console.log('  DELETE /mappings     - Clear mappings');
+  console.log('');
+  
+  if (cacheLog) {
+    loadCacheLog().catch(error => console.error(`Failed to load cache from ${CACHE_FILE}: ${error.message}`));
+  }
+  
+  console.log(`Cache: ${cache.size} entries, ${cache.maxEntries} entries / ${cache.maxBytes} bytes budget${CACHE_FILE ? ` (persisted to ${CACHE_FILE})` : ''}`);
+  console.log(`Document cache: ${documentCache.maxBytes} bytes budget, expanded documents: ${expandedCacheLimits.maxBytes} bytes budget${pool ? ' (per worker)' : ''}`);
+  console.log(`Mappings: ${mappings.size} rules`);
+  console.log(`Concurrency: ${scheduler.stats().concurrency} loads, ${scheduler.stats().per_host} per host${pool ? ' (per worker)' : ''}`);
+  console.log(`Workers: ${pool ? `${pool.size} threads` : 'none (expand/compact on the main thread)'}`);
+  signalReady({ ready: true, port, socket: SOCKET_PATH || null, pid: process.pid, mappings: mappings.size });
 });
 
-process.on('SIGTERM', () => { cache.clear(); server.close(() => process.exit(0)); });
-process.on('SIGINT', () => { cache.clear(); server.close(() => process.exit(0)); });
+process.on('SIGTERM', shutdown);
+process.on('SIGINT', shutdown);
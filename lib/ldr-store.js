@@ -0,0 +1,276 @@
+// ldr-store.js
+// Append-only on-disk log backing the LDR server result cache, and cache snapshots
+
+const crypto = require('crypto');
+const fs = require('fs');
+const readline = require('readline');
+const zlib = require('zlib');
+
+// Whether file ends in the middle of a line, as after a crash mid-write
+function endsMidLine(file) {
+  let fd;
+  try {
+    fd = fs.openSync(file, 'r');
+    const { size } = fs.fstatSync(fd);
+    if (size === 0) return false;
+    const last = Buffer.alloc(1);
+    fs.readSync(fd, last, 0, 1, size - 1);
+    return last[0] !== 0x0a;
+  } catch (e) {
+    return false;
+  } finally {
+    if (fd !== undefined) fs.closeSync(fd);
+  }
+}
+
+/**
+ * Each line of the log is one JSON record:
+ *   {"k": key, "v": value}   entry set (with "deps": the documents it was
+ *                            built from, see DependencyIndex, when known)
+ *   {"k": key, "d": 1}       entry deleted
+ *   {"c": 1}                 all entries cleared
+ * Later records win, so replaying the file rebuilds the cache. A truncated
+ * last line (e.g. after a crash) is skipped.
+ *
+ * With liveSize() (the number of live entries) and liveEntries() (yielding
+ * them as [key, value, dependencies]), the log compacts itself once most of
+ * it is superseded records, checked after every write.
+ */
+class CacheLog {
+  constructor(file, { liveSize = null, liveEntries = null } = {}) {
+    this.file = file;
+    this.liveSize = liveSize;
+    this.liveEntries = liveEntries;
+    this.stream = null;
+    this.records = 0;
+    this.minRecords = 100;   // raised after a failed compaction, so it is not retried on every write
+    this.loading = false;
+    this.pending = null;     // lines written while a compaction runs
+    this.compacting = null;  // Promise of the running compaction
+  }
+
+  _open() {
+    if (!this.stream) {
+      const cutShort = endsMidLine(this.file);
+      this.stream = fs.createWriteStream(this.file, { flags: 'a' });
+      this.stream.on('error', error => console.error(`Cache log write failed: ${error.message}`));
+      // Keep the next record off a truncated last line
+      if (cutShort) this.stream.write('\n');
+    }
+    return this.stream;
+  }
+
+  _write(record) {
+    this._writeLine(JSON.stringify(record));
+  }
+
+  _writeLine(line) {
+    if (this.pending) {
+      this.pending.push(line);
+      return;
+    }
+    this._open().write(line + '\n');
+    this.records++;
+    this.maybeCompact();
+  }
+
+  // Replay the log, returning a Map of live entries: key -> { value, dependencies }
+  async load() {
+    const entries = new Map();
+    if (!fs.existsSync(this.file)) return entries;
+
+    this.loading = true;
+    try {
+      this.records = 0;
+      const lines = readline.createInterface({ input: fs.createReadStream(this.file), crlfDelay: Infinity });
+      for await (const line of lines) {
+        if (!line) continue;
+        let record;
+        try {
+          record = JSON.parse(line);
+        } catch (e) {
+          continue;
+        }
+        this.records++;
+        if (record.c) {
+          entries.clear();
+        } else if (record.d) {
+          entries.delete(record.k);
+        } else {
+          entries.set(record.k, { value: record.v, dependencies: record.deps });
+        }
+      }
+    } finally {
+      this.loading = false;
+    }
+    return entries;
+  }
+
+  // True when most of the log is superseded records. Never while the log is
+  // being replayed (its entries are not live yet) or compacted.
+  needsCompaction(liveEntries) {
+    if (this.loading || this.pending) return false;
+    return this.records > this.minRecords && this.records > liveEntries * 2;
+  }
+
+  // Compact from liveEntries() when needsCompaction() says so. Resolves once
+  // done (at once if not needed); failures are logged, not thrown.
+  maybeCompact() {
+    if (this.compacting) return this.compacting.catch(() => {});
+    if (!this.liveEntries || !this.needsCompaction(this.liveSize())) return Promise.resolve();
+    return this.compact(this.liveEntries).catch(error => {
+      this.minRecords = this.records * 2;
+      console.error(`Cache log compaction failed: ${error.message}`);
+    });
+  }
+
+  // Replace the log with one record per live entry. getEntries yields
+  // [key, value, dependencies] (dependencies may be undefined) and is called
+  // once earlier writes are flushed. Lines written meanwhile are held back:
+  // each write follows the change to the live entries it records, so they are
+  // already in getEntries() and are dropped once the new log is in place, or
+  // written to the old one if it cannot be. While a compaction runs,
+  // compact() returns it rather than starting another.
+  compact(getEntries) {
+    if (!this.compacting) {
+      this.compacting = this._compact(getEntries).finally(() => {
+        this.compacting = null;
+      });
+    }
+    return this.compacting;
+  }
+
+  async _compact(getEntries) {
+    this.pending = [];
+    let replaced = false;
+    try {
+      await this._flush();
+      const lines = [];
+      for (const [k, v, deps] of getEntries()) {
+        lines.push(JSON.stringify(deps ? { k, v, deps } : { k, v }));
+      }
+      const tmp = `${this.file}.tmp`;
+      fs.writeFileSync(tmp, lines.map(line => line + '\n').join(''));
+      fs.renameSync(tmp, this.file);
+      this.records = lines.length;
+      replaced = true;
+    } finally {
+      const pending = this.pending;
+      this.pending = null;
+      if (!replaced) for (const line of pending) this._writeLine(line);
+    }
+  }
+
+  append(key, value, dependencies = null, serialized = JSON.stringify(value)) {
+    const deps = dependencies ? `,"deps":${JSON.stringify(dependencies)}` : '';
+    this._writeLine(`{"k":${JSON.stringify(key)},"v":${serialized}${deps}}`);
+  }
+
+  remove(key) {
+    this._write({ k: key, d: 1 });
+  }
+
+  clear() {
+    this._write({ c: 1 });
+  }
+
+  // Flush pending writes, after any running compaction
+  async close() {
+    if (this.compacting) await this.compacting.catch(() => {});
+    return this._flush();
+  }
+
+  _flush() {
+    return new Promise(resolve => {
+      if (!this.stream) return resolve();
+      this.stream.end(() => resolve());
+      this.stream = null;
+    });
+  }
+}
+
+const SNAPSHOT_MAGIC = 'LDR-CACHE-SNAPSHOT 1';
+
+/**
+ * Serialise cached results and documents as one snapshot (a Buffer):
+ *
+ *   LDR-CACHE-SNAPSHOT 1\n
+ *   sha256:<hex digest of the payload>\n
+ *   <payload: gzipped NDJSON>
+ *
+ * The payload holds {"k", "v", "deps"} records for results (as in the cache
+ * log) and {"doc": documentKey, "e": entry} records for loaded documents.
+ * results yields [key, value, dependencies], documents [documentKey, entry].
+ * Only the compressed payload is held in memory while it is built.
+ */
+async function writeSnapshot(results, documents) {
+  const gzip = zlib.createGzip();
+  const hash = crypto.createHash('sha256');
+  const chunks = [];
+  gzip.on('data', chunk => {
+    hash.update(chunk);
+    chunks.push(chunk);
+  });
+  const done = new Promise((resolve, reject) => {
+    gzip.on('end', resolve);
+    gzip.on('error', reject);
+  });
+
+  const counts = { results: 0, documents: 0 };
+  const write = async record => {
+    if (!gzip.write(JSON.stringify(record) + '\n')) await new Promise(resolve => gzip.once('drain', resolve));
+  };
+  for (const [k, v, deps] of results) {
+    await write(deps ? { k, v, deps } : { k, v });
+    counts.results++;
+  }
+  for (const [doc, e] of documents) {
+    await write({ doc, e });
+    counts.documents++;
+  }
+  gzip.end();
+  await done;
+
+  const header = `${SNAPSHOT_MAGIC}\nsha256:${hash.digest('hex')}\n`;
+  return { snapshot: Buffer.concat([Buffer.from(header), ...chunks]), ...counts };
+}
+
+// Check and unpack a snapshot: { results: [[key, value, dependencies]], documents: [[documentKey, entry]] }.
+// Throws if it is not a snapshot, does not match its checksum or holds anything
+// but result and document records.
+function readSnapshot(buffer) {
+  const magicEnd = buffer.indexOf('\n');
+  const digestEnd = magicEnd === -1 ? -1 : buffer.indexOf('\n', magicEnd + 1);
+  if (digestEnd === -1 || buffer.toString('utf8', 0, magicEnd) !== SNAPSHOT_MAGIC) {
+    throw new Error('Not an LDR cache snapshot');
+  }
+  const expected = buffer.toString('utf8', magicEnd + 1, digestEnd).replace(/^sha256:/, '');
+  const payload = buffer.subarray(digestEnd + 1);
+  if (crypto.createHash('sha256').update(payload).digest('hex') !== expected) {
+    throw new Error('Snapshot checksum mismatch');
+  }
+
+  const results = [];
+  const documents = [];
+  let lines;
+  try {
+    lines = zlib.gunzipSync(payload).toString('utf8').split('\n');
+  } catch (error) {
+    throw new Error(`Corrupt snapshot: ${error.message}`);
+  }
+  lines.forEach((line, index) => {
+    if (!line) return;
+    let record;
+    try {
+      record = JSON.parse(line);
+    } catch (error) {
+      throw new Error(`Corrupt snapshot record ${index + 1}: ${error.message}`);
+    }
+    if (record && typeof record.doc === 'string' && record.e) documents.push([record.doc, record.e]);
+    else if (record && typeof record.k === 'string' && 'v' in record) results.push([record.k, record.v, record.deps]);
+    else throw new Error(`Corrupt snapshot record ${index + 1}: not a result or document`);
+  });
+  return { results, documents };
+}
+
+module.exports = { CacheLog, writeSnapshot, readSnapshot };
@@ -0,0 +1,87 @@
+// ldr-trace.js
+// Opt-in per-request expansion traces for the LDR server
+//
+// A Trace is handed to ldr-core as `state.tracer`. Each expanded URL becomes a
+// node; the current node travels with the async context (AsyncLocalStorage),
+// so document loads made deep inside jsonld.expand are attached to the URL
+// that triggered them.
+
+const { AsyncLocalStorage } = require('async_hooks');
+
+const storage = new AsyncLocalStorage();
+
+function now() {
+  return performance.now();
+}
+
+function roundMs(ms) {
+  return Math.round(ms * 100) / 100;
+}
+
+class Trace {
+  constructor({ operation, url, depth, resolveUrl = u => u }) {
+    this.resolveUrl = resolveUrl;
+    this.root = { operation, url, depth, ms: 0, fetches: [], children: [] };
+  }
+
+  _current() {
+    const store = storage.getStore();
+    return store && store.trace === this ? store.node : this.root;
+  }
+
+  _node(info) {
+    const node = { url: info.url };
+    const mapped = this.resolveUrl(info.url);
+    if (mapped !== info.url) node.mapped = mapped;
+    return Object.assign(node, info);
+  }
+
+  // Run the whole operation with the root node as the current node. A failure
+  // is recorded on the root (the trace is what the caller is after) and null returned.
+  async run(fn) {
+    const started = now();
+    try {
+      return await storage.run({ trace: this, node: this.root }, fn);
+    } catch (error) {
+      this.root.error = error.message;
+      return null;
+    } finally {
+      this.root.ms = roundMs(now() - started);
+    }
+  }
+
+  // Run fn as a child of the current node
+  span(info, fn) {
+    const node = this._node({ ...info, ms: 0, fetches: [], children: [] });
+    this._current().children.push(node);
+    const started = now();
+    return storage.run({ trace: this, node }, async () => {
+      try {
+        return await fn();
+      } finally {
+        node.ms = roundMs(now() - started);
+      }
+    });
+  }
+
+  // Leaf child that did no work of its own (cycle stub, reused subtree)
+  mark(info) {
+    this._current().children.push(this._node(info));
+  }
+
+  annotate(fields) {
+    Object.assign(this._current(), fields);
+  }
+
+  fail(error) {
+    this._current().error = error.message;
+  }
+}
+
+// Document loader hook: attach a load to the traced node that caused it, if any
+function recordLoad(load) {
+  const store = storage.getStore();
+  if (store) store.node.fetches.push({ ...load, ms: roundMs(load.ms) });
+}
+
+module.exports = { Trace, recordLoad };
@@ -0,0 +1,265 @@
+// ldr-wire.js
+// Response encoding for the LDR server: minified or pretty JSON, or CBOR,
+// optionally gzip/deflate compressed, negotiated from the request headers
+
+const zlib = require('zlib');
+const { pipeline } = require('stream');
+
+// Bodies smaller than this are not worth compressing
+const COMPRESS_MIN_BYTES = 1024;
+
+// Results with at least this many members are serialized incrementally
+const STREAM_MIN_ITEMS = 256;
+
+// Serialized members are coalesced into writes of about this size
+const CHUNK_BYTES = 64 * 1024;
+
+const COMPRESSORS = {
+  gzip: zlib.gzip,
+  deflate: zlib.deflate
+};
+
+const STREAM_COMPRESSORS = {
+  gzip: zlib.createGzip,
+  deflate: zlib.createDeflate
+};
+
+// Preferred compression from an Accept-Encoding header, or null
+function pickEncoding(header) {
+  let best = null;
+  let bestQ = 0;
+  for (const part of (header || '').split(',')) {
+    const [name, ...params] = part.trim().toLowerCase().split(';');
+    if (!COMPRESSORS[name]) continue;
+    const qParam = params.find(p => p.trim().startsWith('q='));
+    const q = qParam ? parseFloat(qParam.trim().slice(2)) : 1;
+    // Ties go to the first listed encoding
+    if (q > bestQ) {
+      best = name;
+      bestQ = q;
+    }
+  }
+  return best;
+}
+
+/**
+ * Response format for a request:
+ *   format   - 'cbor' when Accept names application/cbor, else 'json'
+ *   ndjson   - Accept names application/x-ndjson: stream result nodes one per line
+ *   pretty   - indented JSON, only with ?pretty (for people reading it)
+ *   encoding - 'gzip', 'deflate' or null from Accept-Encoding
+ */
+function negotiate(req, searchParams) {
+  const accept = req.headers['accept'] || '';
+  return {
+    format: accept.includes('application/cbor') ? 'cbor' : 'json',
+    ndjson: accept.includes('application/x-ndjson'),
+    pretty: searchParams.has('pretty') && searchParams.get('pretty') !== '0',
+    encoding: pickEncoding(req.headers['accept-encoding'])
+  };
+}
+
+const DEFAULT_WIRE = { format: 'json', ndjson: false, pretty: false, encoding: null };
+
+// Minimal CBOR (RFC 8949) encoder for JSON values
+class CborWriter {
+  constructor(size = 4096) {
+    this.buf = Buffer.allocUnsafe(size);
+    this.pos = 0;
+  }
+
+  ensure(n) {
+    if (this.pos + n <= this.buf.length) return;
+    const next = Buffer.allocUnsafe(Math.max(this.buf.length * 2, this.pos + n));
+    this.buf.copy(next, 0, 0, this.pos);
+    this.buf = next;
+  }
+
+  // Major type and length/value argument
+  head(major, n) {
+    const type = major << 5;
+    if (n < 24) {
+      this.ensure(1);
+      this.buf[this.pos++] = type | n;
+    } else if (n < 0x100) {
+      this.ensure(2);
+      this.buf[this.pos++] = type | 24;
+      this.buf[this.pos++] = n;
+    } else if (n < 0x10000) {
+      this.ensure(3);
+      this.buf[this.pos++] = type | 25;
+      this.pos = this.buf.writeUInt16BE(n, this.pos);
+    } else if (n < 0x100000000) {
+      this.ensure(5);
+      this.buf[this.pos++] = type | 26;
+      this.pos = this.buf.writeUInt32BE(n, this.pos);
+    } else {
+      this.ensure(9);
+      this.buf[this.pos++] = type | 27;
+      this.pos = this.buf.writeBigUInt64BE(BigInt(n), this.pos);
+    }
+  }
+
+  number(value) {
+    if (Number.isSafeInteger(value)) {
+      if (value >= 0) this.head(0, value);
+      else this.head(1, -1 - value);
+    } else if (Number.isFinite(value)) {
+      this.ensure(9);
+      this.buf[this.pos++] = 0xfb;
+      this.pos = this.buf.writeDoubleBE(value, this.pos);
+    } else {
+      this.value(null);  // as JSON.stringify does
+    }
+  }
+
+  string(value) {
+    const length = Buffer.byteLength(value);
+    this.head(3, length);
+    this.ensure(length);
+    this.pos += this.buf.write(value, this.pos, length, 'utf8');
+  }
+
+  value(value) {
+    if (value && typeof value.toJSON === 'function') value = value.toJSON();
+
+    if (value === null || value === undefined) {
+      this.ensure(1);
+      this.buf[this.pos++] = 0xf6;
+    } else if (value === true || value === false) {
+      this.ensure(1);
+      this.buf[this.pos++] = value ? 0xf5 : 0xf4;
+    } else if (typeof value === 'number') {
+      this.number(value);
+    } else if (typeof value === 'string') {
+      this.string(value);
+    } else if (Array.isArray(value)) {
+      this.head(4, value.length);
+      for (const item of value) this.value(item);
+    } else if (typeof value === 'object') {
+      // Keys JSON.stringify would drop are dropped here too
+      const keys = Object.keys(value).filter(key => value[key] !== undefined && typeof value[key] !== 'function');
+      this.head(5, keys.length);
+      for (const key of keys) {
+        this.string(key);
+        this.value(value[key]);
+      }
+    } else {
+      this.value(null);
+    }
+  }
+
+  result() {
+    return this.buf.subarray(0, this.pos);
+  }
+}
+
+function encodeCbor(value) {
+  const writer = new CborWriter();
+  writer.value(value);
+  return writer.result();
+}
+
+function encode(data, wire) {
+  if (wire.format === 'cbor') {
+    return { body: encodeCbor(data), contentType: 'application/cbor' };
+  }
+  const text = wire.pretty ? JSON.stringify(data, null, 2) : JSON.stringify(data);
+  return { body: Buffer.from(text), contentType: 'application/json' };
+}
+
+// Resolves once `out` can take more data, or the client has gone away
+function drained(out, res) {
+  return new Promise(resolve => {
+    const done = () => {
+      out.off('drain', done);
+      res.off('close', done);
+      resolve();
+    };
+    out.on('drain', done);
+    res.on('close', done);
+  });
+}
+
+// Write string pieces in ~CHUNK_BYTES writes, compressing on the fly and
+// honouring backpressure, so the full body is never held as one string
+async function writeStream(res, statusCode, headers, encoding, pieces) {
+  let out = res;
+  if (encoding) {
+    out = STREAM_COMPRESSORS[encoding]({ level: zlib.constants.Z_BEST_SPEED });
+    res.writeHead(statusCode, { ...headers, 'Content-Encoding': encoding });
+    pipeline(out, res, () => {});
+  } else {
+    res.writeHead(statusCode, headers);
+  }
+
+  let pending = '';
+  for (const piece of pieces) {
+    pending += piece;
+    if (pending.length < CHUNK_BYTES) continue;
+    if (res.destroyed) return;
+    const ok = out.write(pending);
+    pending = '';
+    if (!ok) await drained(out, res);
+  }
+  out.end(pending);
+}
+
+// {"result":[...],...rest} with each result member serialized separately
+function* jsonPieces(data) {
+  const { result, ...rest } = data;
+  yield '{"result":[';
+  for (let i = 0; i < result.length; i++) {
+    yield (i ? ',' : '') + (JSON.stringify(result[i]) ?? 'null');
+  }
+  const tail = JSON.stringify(rest);
+  yield tail === '{}' ? ']}' : '],' + tail.slice(1);
+}
+
+// One line per result node; a single object result is one line
+function* ndjsonPieces(result) {
+  for (const node of Array.isArray(result) ? result : [result]) {
+    yield JSON.stringify(node) + '\n';
+  }
+}
+
+// Encode data in the negotiated format and send it, compressing large bodies.
+// Operation results ({ result, ... }) are streamed as NDJSON nodes when asked
+// for, and large JSON result arrays are serialized incrementally.
+function send(res, statusCode, data, wire = DEFAULT_WIRE, headers = {}) {
+  const hasResult = data !== null && typeof data === 'object' && 'result' in data;
+
+  if (hasResult && wire.ndjson) {
+    const streamHeaders = { 'Content-Type': 'application/x-ndjson', 'Vary': 'Accept, Accept-Encoding', ...headers };
+    if (data.cached !== undefined) streamHeaders['X-LDR-Cached'] = String(data.cached);
+    return writeStream(res, statusCode, streamHeaders, wire.encoding, ndjsonPieces(data.result));
+  }
+
+  if (hasResult && wire.format === 'json' && !wire.pretty &&
+      Array.isArray(data.result) && data.result.length >= STREAM_MIN_ITEMS) {
+    const streamHeaders = { 'Content-Type': 'application/json', 'Vary': 'Accept, Accept-Encoding', ...headers };
+    return writeStream(res, statusCode, streamHeaders, wire.encoding, jsonPieces(data));
+  }
+
+  const { body, contentType } = encode(data, wire);
+  const responseHeaders = { 'Content-Type': contentType, 'Vary': 'Accept, Accept-Encoding', ...headers };
+
+  if (!wire.encoding || body.length < COMPRESS_MIN_BYTES) {
+    res.writeHead(statusCode, responseHeaders);
+    res.end(body);
+    return;
+  }
+
+  // Fastest level: responses are usually local, so CPU matters more than ratio
+  COMPRESSORS[wire.encoding](body, { level: zlib.constants.Z_BEST_SPEED }, (error, compressed) => {
+    if (error) {
+      res.writeHead(statusCode, responseHeaders);
+      res.end(body);
+      return;
+    }
+    res.writeHead(statusCode, { ...responseHeaders, 'Content-Encoding': wire.encoding });
+    res.end(compressed);
+  });
+}
+
+module.exports = { negotiate, send, writeStream, encode, encodeCbor, pickEncoding, DEFAULT_WIRE };
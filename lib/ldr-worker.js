@@ -0,0 +1,95 @@
+// ldr-worker.js
+// worker_threads entry point: runs expand/compact/context off the server's main thread
+//
+// Messages from the pool:
+//   { type: 'run', id, operation, url, depth, trace, expanded? }
+//        -> replies { id, result, dependencies, trace? } or { id, error }, plus phase timings observed
+//           since the last reply. A compact with `expanded` compacts that tree instead of expanding again.
+//   { type: 'mappings', mappings }             -> replace URL mappings (and drop expanded documents and resolved contexts)
+//   { type: 'clear' }                          -> drop cached source and expanded documents, resolved contexts and redirects
+//   { type: 'invalidate', documents }          -> drop these cached documents (documentKey()s), their expansions and resolved contexts
+//   { type: 'export-documents', id }           -> replies { id, result: [[resolvedUrl, entry]...] } (remote documents)
+//   { type: 'import-documents', id, documents } -> add snapshot documents, replies { id, result: count added }
+//
+// Every reply, and a message after each change to the caches, carries `stats`: the
+// document caches' and load scheduler's figures for the server's /cache/stats, /health and metrics.
+
+const { parentPort, workerData } = require('worker_threads');
+const { LruCache } = require('./ldr-cache.js');
+const { MappingResolver } = require('./ldr-mappings.js');
+const { createEngine, ExpandedDocumentCache, loadContextResolver } = require('./ldr-engine.js');
+const { forgetDocuments, exportDocuments, importDocuments } = require('./ldr-loader.js');
+
+const jsonld = require(workerData.jsonldPath);
+
+// Mappings arrive as a broadcast from the main thread
+const mappings = new MappingResolver();
+
+const documentCache = new LruCache(workerData.documentCache);
+const expandedCache = new ExpandedDocumentCache(workerData.expandedCache);
+
+// [phase, seconds] pairs, sent back with the next reply for the server's metrics
+const observations = [];
+
+const engine = createEngine(jsonld, {
+  mappings,
+  documentCache,
+  expandedCache,
+  concurrency: workerData.concurrency,
+  perHost: workerData.perHost,
+  observe: (phase, seconds) => observations.push([phase, seconds]),
+  ContextResolver: loadContextResolver(workerData.jsonldPath)
+});
+
+function stats() {
+  return { documents: documentCache.stats(), expanded: expandedCache.stats(), scheduler: engine.scheduler.stats() };
+}
+
+async function run({ id, operation, url, depth, trace, expanded }) {
+  try {
+    let reply;
+    if (trace) reply = await engine.traced(operation, url, depth);
+    else if (expanded !== undefined) reply = await engine.compact(url, expanded);
+    else reply = await engine.run(operation, url, depth);
+    parentPort.postMessage({ id, ...reply, observations: observations.splice(0), stats: stats() });
+  } catch (error) {
+    parentPort.postMessage({ id, error: error.message, observations: observations.splice(0), stats: stats() });
+  }
+}
+
+parentPort.postMessage({ stats: stats() });
+
+parentPort.on('message', message => {
+  switch (message.type) {
+    case 'run':
+      run(message);
+      break;
+    case 'mappings':
+      mappings.set(message.mappings);
+      expandedCache.clear();
+      engine.resetContexts();
+      parentPort.postMessage({ stats: stats() });
+      break;
+    case 'clear':
+      documentCache.clear();
+      expandedCache.clear();
+      engine.resetContexts();
+      engine.documentLoader.forgetRedirects();
+      parentPort.postMessage({ stats: stats() });
+      break;
+    case 'invalidate': {
+      const documents = new Set(message.documents);
+      forgetDocuments(documentCache, documents);
+      expandedCache.invalidate(documents);
+      engine.resetContexts();
+      parentPort.postMessage({ stats: stats() });
+      break;
+    }
+    case 'export-documents':
+      parentPort.postMessage({ id: message.id, result: exportDocuments(documentCache) });
+      break;
+    case 'import-documents':
+      parentPort.postMessage({ id: message.id, result: importDocuments(documentCache, message.documents), stats: stats() });
+      break;
+  }
+});
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+LDR (JSON-LD Recursive) asyncio Python Client Library
+
+Requires the optional aiohttp dependency:
+    pip install jsonld-recursive[async]
+"""
+
+import asyncio
+import json
+import os
+from typing import Dict, Any, AsyncIterator, List, Optional, Union
+
+try:
+    import aiohttp
+except ImportError:  # Optional dependency
+    aiohttp = None
+
+try:
+    import cbor2
+except ImportError:  # Optional dependency
+    cbor2 = None
+
+from .config import DEFAULT_PORT
+
+
+async def _iter_ndjson(response: "aiohttp.ClientResponse") -> AsyncIterator[Any]:
+    """Parse an NDJSON body line by line (lines may exceed aiohttp's readline limit)."""
+    buffer = b''
+    async for chunk in response.content.iter_any():
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if buffer.strip():
+        yield json.loads(buffer)
+
+
+class AsyncLdrClient:
+    """
+    asyncio client for LDR Server API.
+
+    Mirrors LdrClient. One pooled aiohttp session keeps many requests in
+    flight from a single event loop.
+
+    Example:
+        >>> async with AsyncLdrClient(auto_start_server=True) as client:
+        ...     results = await asyncio.gather(*(client.compact(u, depth=3) for u in urls))
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        base_url: str = None,
+        timeout: int = 30,
+        max_retries: int = 3,
+        pool_size: int = 100,
+        auto_start_server: bool = False,
+        mappings_file: Optional[str] = None,
+        mappings: Optional[Dict[str, str]] = None,
+        cache_file: Optional[str] = None,
+        socket_path: Optional[str] = None,
+        wire_format: str = "json",
+        compress: bool = False
+    ):
+        """
+        Initialize the client. The server is started (if requested) when the
+        client is entered with `async with` or `await client.start()`.
+
+        Args:
+            base_url: Base URL of the LDR server (default: http://localhost:3333)
+            timeout: Request timeout in seconds
+            max_retries: Maximum number of retries for failed requests
+            pool_size: Maximum number of pooled connections to the server
+            auto_start_server: Automatically start server if not running
+            mappings_file: Path to JSON file with URL mappings
+            mappings: Dictionary of URL mappings to set on start
+            cache_file: Persist the auto-started server's result cache to this file
+            socket_path: Talk to the server over this Unix domain socket instead of TCP
+            wire_format: Response encoding, "json" (minified) or "cbor" (requires cbor2)
+            compress: Ask for gzip/deflate-compressed responses
+        """
+        if aiohttp is None:
+            raise ImportError(
+                "AsyncLdrClient requires aiohttp. "
+                "Install with: pip install jsonld-recursive[async]"
+            )
+
+        if wire_format not in ("json", "cbor"):
+            raise ValueError(f"Unknown wire_format: {wire_format}")
+        if wire_format == "cbor" and cbor2 is None:
+            raise ImportError(
+                "wire_format='cbor' requires cbor2. "
+                "Install with: pip install jsonld-recursive[cbor]"
+            )
+
+        self.socket_path = os.path.abspath(socket_path) if socket_path else None
+        if self.socket_path:
+            from .ldr_client import SOCKET_BASE_URL
+            base_url = SOCKET_BASE_URL
+        self.base_url = (base_url or f"http://localhost:{DEFAULT_PORT}").rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.pool_size = pool_size
+        self.auto_start_server = auto_start_server
+        self.mappings_file = mappings_file
+        self.initial_mappings = mappings
+        self.cache_file = cache_file
+        self.headers = {
+            'Accept': 'application/cbor' if wire_format == "cbor" else 'application/json',
+            'Accept-Encoding': 'gzip, deflate' if compress else 'identity'
+        }
+        self.session = None
+        self._launcher = None
+        # Compiled contexts already fetched: (url, depth) -> (fingerprint, context)
+        self._contexts: Dict[Any, Any] = {}
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        """Create the pooled session on first use (must run inside the event loop)."""
+        if self.session is None or self.session.closed:
+            if self.socket_path:
+                connector = aiohttp.UnixConnector(path=self.socket_path, limit=self.pool_size)
+            else:
+                connector = aiohttp.TCPConnector(limit=self.pool_size)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self.session
+
+    async def _request(
+        self, method: str, endpoint: str, payload: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        """Send a request, retrying connection errors and retryable statuses with backoff."""
+        session = self._get_session()
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with session.request(
+                    method, f"{self.base_url}{endpoint}", json=payload
+                ) as response:
+                    if response.status in self.RETRY_STATUSES and attempt < self.max_retries:
+                        await asyncio.sleep(2 ** attempt)
+                        continue
+                    response.raise_for_status()
+                    if response.content_type == 'application/cbor':
+                        return cbor2.loads(await response.read())
+                    return await response.json(content_type=None)
+            except aiohttp.ClientConnectionError:
+                if attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(2 ** attempt)
+
+    async def start(self):
+        """Start the server if auto_start_server was requested and apply initial mappings."""
+        if self.auto_start_server and self._launcher is None:
+            # Server discovery and launch are blocking; reuse LdrClient's in a worker thread
+            from .ldr_client import LdrClient
+            loop = asyncio.get_running_loop()
+            self._launcher = await loop.run_in_executor(None, lambda: LdrClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                auto_start_server=True,
+                mappings=self.initial_mappings,
+                mappings_file=self.mappings_file,
+                cache_file=self.cache_file,
+                socket_path=self.socket_path
+            ))
+            self.base_url = self._launcher.base_url
+        elif self.initial_mappings:
+            # The launcher applies them (at launch, or to a server it reuses)
+            await self.set_mappings(self.initial_mappings)
+        return self
+
+    async def stop_server(self):
+        """Stop auto-started server."""
+        if self._launcher is not None:
+            launcher, self._launcher = self._launcher, None
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, launcher.stop_server)
+            launcher.close()
+
+    async def set_mappings(self, mappings: Dict[str, str]) -> Dict[str, Any]:
+        """Set URL mappings."""
+        return await self._request("POST", "/mappings", {"mappings": mappings})
+
+    async def load_mappings(self, file_path: str) -> Dict[str, Any]:
+        """Load URL mappings from file."""
+        return await self._request("POST", "/mappings", {"file": file_path})
+
+    async def get_mappings(self) -> Dict[str, str]:
+        """Get current URL mappings."""
+        return (await self._request("GET", "/mappings"))['mappings']
+
+    async def clear_mappings(self) -> int:
+        """Clear URL mappings."""
+        return (await self._request("DELETE", "/mappings"))['cleared']
+
+    async def health(self) -> Dict[str, Any]:
+        """Check server health."""
+        return await self._request("GET", "/health")
+
+    async def _operation(
+        self, operation: str, url: str, depth: int, verbose: bool
+    ) -> Dict[str, Any]:
+        data = await self._request("POST", f"/{operation}", {"url": url, "depth": depth})
+        if verbose:
+            status = "Cache HIT" if data.get('cached') else "Cache MISS"
+            print(f"[{status}] {url} (depth={depth})", flush=True)
+        return data['result']
+
+    async def expand(self, url: str, depth: int = 2, verbose: bool = False) -> Dict[str, Any]:
+        """Expand a JSON-LD document recursively."""
+        return await self._operation("expand", url, depth, verbose)
+
+    async def compact(self, url: str, depth: int = 2, verbose: bool = False) -> Dict[str, Any]:
+        """Expand and compact a JSON-LD document recursively."""
+        return await self._operation("compact", url, depth, verbose)
+
+    async def context(self, url: str, depth: int = 2, verbose: bool = False) -> Any:
+        """Compile the @context of a JSON-LD document into one context (see LdrClient.context)."""
+        key = (url, depth)
+        payload: Dict[str, Any] = {"url": url, "depth": depth}
+        if key in self._contexts:
+            payload["fingerprint"] = self._contexts[key][0]
+        data = await self._request("POST", "/context", payload)
+        if verbose:
+            status = "Cache HIT" if data.get('cached') else "Cache MISS"
+            print(f"[{status}] context {url} (depth={depth})", flush=True)
+        if data.get('unchanged'):
+            return self._contexts[key][1]
+        self._contexts[key] = (data['fingerprint'], data['result'])
+        return data['result']
+
+    async def trace(self, url: str, depth: int = 2, operation: str = "compact") -> Dict[str, Any]:
+        """Run an operation with tracing; returns the result and its trace (see summarize_trace)."""
+        return await self._request(
+            "POST", f"/{operation}", {"url": url, "depth": depth, "trace": True}
+        )
+
+    async def _iter_operation(self, operation: str, url: str, depth: int) -> AsyncIterator[Any]:
+        session = self._get_session()
+        async with session.post(
+            f"{self.base_url}/{operation}",
+            json={"url": url, "depth": depth},
+            headers={'Accept': 'application/x-ndjson'},
+            timeout=aiohttp.ClientTimeout(total=None, sock_read=self.timeout)
+        ) as response:
+            response.raise_for_status()
+            async for item in _iter_ndjson(response):
+                yield item
+
+    def iter_compact(self, url: str, depth: int = 2) -> AsyncIterator[Any]:
+        """Compact recursively, yielding result (@graph) nodes one at a time as they stream in."""
+        return self._iter_operation("compact", url, depth)
+
+    def iter_expand(self, url: str, depth: int = 2) -> AsyncIterator[Any]:
+        """Expand recursively, yielding result nodes one at a time as they stream in."""
+        return self._iter_operation("expand", url, depth)
+
+    async def gather(
+        self,
+        urls: List[str],
+        depth: int = 2,
+        operation: str = "compact",
+        max_concurrency: int = 50,
+        return_exceptions: bool = False
+    ) -> List[Any]:
+        """
+        Run one request per URL concurrently, at most max_concurrency at a time.
+        Results keep the order of urls, as with asyncio.gather.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(url: str) -> Any:
+            async with semaphore:
+                return await self._operation(operation, url, depth, verbose=False)
+
+        return await asyncio.gather(
+            *(run(url) for url in urls), return_exceptions=return_exceptions
+        )
+
+    async def iter_batch(
+        self,
+        urls: List[str],
+        depth: int = 2,
+        operation: str = "compact",
+        concurrency: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Expand or compact many URLs with one POST /batch request, yielding
+        items (index, url, result/cached or error) as the server completes them.
+        """
+        payload: Dict[str, Any] = {
+            "items": [{"url": url, "depth": depth, "operation": operation} for url in urls]
+        }
+        if concurrency:
+            payload["concurrency"] = concurrency
+
+        session = self._get_session()
+        async with session.post(
+            f"{self.base_url}/batch",
+            json=payload,
+            timeout=aiohttp.ClientTimeout(total=None, sock_read=self.timeout)
+        ) as response:
+            response.raise_for_status()
+            async for item in _iter_ndjson(response):
+                yield item
+
+    async def compact_batch(self, urls: List[str], depth: int = 2) -> List[Dict[str, Any]]:
+        """Compact multiple URLs in one streamed request. Results keep the order of urls."""
+        results: List[Any] = [None] * len(urls)
+        async for item in self.iter_batch(urls, depth):
+            if 'error' in item:
+                raise RuntimeError(f"compact failed for {item.get('url')}: {item['error']}")
+            results[item['index']] = item['result']
+        return results
+
+    async def cache_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        return await self._request("GET", "/cache/stats")
+
+    async def cache_list(self) -> Dict[str, Any]:
+        """List cached URLs."""
+        return await self._request("GET", "/cache/list")
+
+    async def cache_clear(self) -> int:
+        """Clear the cache."""
+        return (await self._request("DELETE", "/cache"))['cleared']
+
+    async def cache_invalidate(
+        self,
+        url: Union[str, List[str], None] = None,
+        path: Union[str, List[str], None] = None,
+        stale: bool = False
+    ) -> Dict[str, Any]:
+        """Drop the cached results built from these documents (see LdrClient.cache_invalidate)."""
+        payload: Dict[str, Any] = {"stale": stale}
+        if url:
+            payload["url"] = url
+        if path:
+            payload["path"] = path
+        return await self._request("POST", "/cache/invalidate", payload)
+
+    async def cache_export(self, path: str) -> Dict[str, Any]:
+        """Write a snapshot of the server's caches to path (see LdrClient.cache_export)."""
+        session = self._get_session()
+        async with session.get(f"{self.base_url}/cache/export") as response:
+            response.raise_for_status()
+            snapshot = await response.read()
+        with open(path, 'wb') as f:
+            f.write(snapshot)
+        return {
+            "results": int(response.headers.get('X-LDR-Snapshot-Results', 0)),
+            "documents": int(response.headers.get('X-LDR-Snapshot-Documents', 0)),
+            "bytes": len(snapshot)
+        }
+
+    async def cache_import(self, path: str) -> Dict[str, Any]:
+        """Prime the server's caches from a snapshot written by cache_export."""
+        with open(path, 'rb') as f:
+            snapshot = f.read()
+        session = self._get_session()
+        async with session.post(
+            f"{self.base_url}/cache/import",
+            data=snapshot,
+            headers={'Content-Type': 'application/octet-stream'}
+        ) as response:
+            response.raise_for_status()
+            if response.content_type == 'application/cbor':
+                return cbor2.loads(await response.read())
+            return await response.json(content_type=None)
+
+    async def resolve(self, url: str) -> Dict[str, Any]:
+        """Test how a URL gets resolved/mapped by the server."""
+        return await self._request("POST", "/resolve", {"url": url})
+
+    async def test_load(self, url: str) -> Dict[str, Any]:
+        """Test loading a document without processing it."""
+        return await self._request("POST", "/test-load", {"url": url})
+
+    async def close(self):
+        """Close the session."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        """Async context manager entry."""
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Async context manager exit."""
+        await self.stop_server()
+        await self.close()
@@ -4,15 +4,79 @@ LDR (JSON-LD Recursive) Python Client Library
 """
 
 import requests
+import hashlib
 import json
+import select
 import subprocess
 import time
 import os
 import shutil
+import socket
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Union
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+
+try:
+    import cbor2
+except ImportError:  # Optional dependency
+    cbor2 = None
 
 from .config import DEFAULT_PORT
+from .ldr_local import LocalEngine
+
+
+# Placeholder origin for requests sent over a Unix domain socket
+SOCKET_BASE_URL = "http://ldr-server"
+
+
+class _UnixSocketConnection(HTTPConnection):
+    """HTTP connection over a Unix domain socket."""
+    
+    def __init__(self, socket_path: str):
+        super().__init__('localhost')
+        self.socket_path = socket_path
+    
+    def _new_conn(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if isinstance(self.timeout, (int, float)):
+            sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+
+class _UnixSocketConnectionPool(HTTPConnectionPool):
+    def __init__(self, socket_path: str, maxsize: int):
+        super().__init__('localhost', maxsize=maxsize)
+        self.socket_path = socket_path
+    
+    def _new_conn(self):
+        return _UnixSocketConnection(self.socket_path)
+
+
+class _UnixSocketAdapter(HTTPAdapter):
+    """Transport adapter sending every request to one Unix domain socket."""
+    
+    def __init__(self, socket_path: str, pool_maxsize: int = 10, max_retries=0):
+        self.socket_path = socket_path
+        self.pool = _UnixSocketConnectionPool(socket_path, pool_maxsize)
+        super().__init__(pool_maxsize=pool_maxsize, max_retries=max_retries)
+    
+    def get_connection(self, url, proxies=None):
+        return self.pool
+    
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        return self.pool
+    
+    def request_url(self, request, proxies):
+        return request.path_url
+    
+    def close(self):
+        self.pool.close()
+        super().close()
 
 
 class LdrClient:
@@ -22,7 +86,7 @@ class LdrClient:
     Supports auto-starting server and connection pooling.
     """
     
-    MAX_PORT_ATTEMPTS = 10
+    STARTUP_TIMEOUT = 10
     
     def __init__(
         self, 
@@ -31,7 +95,13 @@ class LdrClient:
         max_retries: int = 3,
         auto_start_server: bool = False,
         mappings_file: Optional[str] = None,
-        mappings: Optional[Dict[str, str]] = None
+        mappings: Optional[Dict[str, str]] = None,
+        cache_file: Optional[str] = None,
+        pool_size: int = 10,
+        local_engine: bool = False,
+        socket_path: Optional[str] = None,
+        wire_format: str = "json",
+        compress: bool = False
     ):
         """
         Initialize the client.
@@ -43,7 +113,19 @@ class LdrClient:
             auto_start_server: Automatically start server if not running
             mappings_file: Path to JSON file with URL mappings
             mappings: Dictionary of URL mappings to set on initialization
+            cache_file: Persist the auto-started server's result cache to this file
+            pool_size: Connections kept open to the server (grown to match compact_batch workers)
+            local_engine: Expand and compact in-process with the pure-Python engine
+                instead of a server (requires PyLD; best for local, mapped files)
+            socket_path: Talk to the server over this Unix domain socket instead of
+                TCP (an auto-started server listens on it; base_url is ignored)
+            wire_format: Response encoding, "json" (minified) or "cbor" (requires cbor2)
+            compress: Ask for gzip/deflate-compressed responses (worthwhile when the
+                server is on another host; off by default for local servers)
         """
+        self.socket_path = os.path.abspath(socket_path) if socket_path else None
+        if self.socket_path:
+            base_url = SOCKET_BASE_URL
         self.base_url = (base_url or f"http://localhost:{DEFAULT_PORT}").rstrip('/')
         self.timeout = timeout
         self.auto_started = False
@@ -51,41 +133,98 @@ class LdrClient:
         self.server_process = None
         self.mappings_file = mappings_file
         self.initial_mappings = mappings
+        self.cache_file = cache_file
         self.port = self._extract_port(self.base_url)
         
-        # Create session with connection pooling
+        # Create session with connection pooling, and one without retries
+        # (same headers) for requests that should fail fast
         self.session = requests.Session()
+        self._fail_fast_session = requests.Session()
+        self._fail_fast_session.headers = self.session.headers
+        
+        # Negotiate the response encoding with the server
+        if wire_format not in ("json", "cbor"):
+            raise ValueError(f"Unknown wire_format: {wire_format}")
+        if wire_format == "cbor" and cbor2 is None:
+            raise ImportError(
+                "wire_format='cbor' requires cbor2. "
+                "Install with: pip install jsonld-recursive[cbor]"
+            )
+        self.wire_format = wire_format
+        self.session.headers['Accept'] = 'application/cbor' if wire_format == "cbor" else 'application/json'
+        self.session.headers['Accept-Encoding'] = 'gzip, deflate' if compress else 'identity'
         
         # Configure retries
-        from requests.adapters import HTTPAdapter
         from urllib3.util.retry import Retry
         
-        retry_strategy = Retry(
+        self.retry_strategy = Retry(
             total=max_retries,
             backoff_factor=1,
             status_forcelist=[429, 500, 502, 503, 504],
             allowed_methods=["HEAD", "GET", "POST", "DELETE"]
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
+        self.pool_size = 0
+        self._mount_adapter(pool_size)
+        
+        # Compiled contexts already fetched: (url, depth) -> (fingerprint, context)
+        self._contexts: Dict[Any, Any] = {}
+        
+        # In-process engine replaces the server entirely
+        self.engine = None
+        if local_engine:
+            self.engine = LocalEngine(mappings)
+            if mappings_file:
+                self.engine.load_mappings(mappings_file)
+            return
         
-        # Auto-start server if requested
+        # Auto-start server if requested (a started server gets the mappings at launch)
         if auto_start_server:
             if not self._is_server_running():
                 self._start_server()
-            
-            # Set mappings after server starts
-            if self.initial_mappings:
-                time.sleep(0.5)  # Give server a moment to fully start
+            elif self.initial_mappings:
                 self.set_mappings(self.initial_mappings)
     
+    def _mount_adapter(self, pool_size: int):
+        """Mount HTTP adapters keeping up to pool_size connections: retrying, and not."""
+        mounts = ((self.session, self.retry_strategy), (self._fail_fast_session, 0))
+        for session, max_retries in mounts:
+            if self.socket_path:
+                adapter = _UnixSocketAdapter(
+                    self.socket_path, pool_maxsize=pool_size, max_retries=max_retries
+                )
+            else:
+                adapter = HTTPAdapter(max_retries=max_retries, pool_maxsize=pool_size)
+            replaced = session.adapters.get("http://")
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            if replaced is not None:
+                replaced.close()
+        self.pool_size = pool_size
+    
+    def _decode(self, response: requests.Response) -> Any:
+        """Decode a JSON or CBOR response body (decompression is done by requests)."""
+        if response.headers.get('Content-Type', '').startswith('application/cbor'):
+            return cbor2.loads(response.content)
+        return response.json()
+    
     def _is_server_running(self, port: int = None) -> bool:
-        """Check if server is running on specified port."""
-        if port is None:
-            port = self.port
+        """Check if server is running on specified port (or on the client's socket)."""
+        # Probe with a plain connect first, then ask without retries: the
+        # session retries refused connections and timeouts with backoff,
+        # which would stall startup for seconds
+        if port is None and self.socket_path:
+            if not os.path.exists(self.socket_path):
+                return False
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+                if s.connect_ex(self.socket_path) != 0:
+                    return False
+            url = f"{self.base_url}/health"
+        else:
+            if not self._is_port_in_use(port or self.port):
+                return False
+            url = f"http://localhost:{port or self.port}/health"
         try:
-            response = self.session.get(f"http://localhost:{port}/health", timeout=2)
+            response = self._fail_fast_session.get(url, timeout=2)
             return response.status_code == 200
         except:
             return False
@@ -105,20 +244,39 @@ class LdrClient:
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             return s.connect_ex(('localhost', port)) == 0
     
-    def _find_available_port(self, start_port: int = None) -> int:
-        """Find an available port starting from start_port."""
-        if start_port is None:
-            start_port = DEFAULT_PORT
-        
-        for i in range(self.MAX_PORT_ATTEMPTS):
-            port = start_port + i
-            if not self._is_port_in_use(port):
-                return port
-        
-        raise RuntimeError(f"Could not find available port in range {start_port}-{start_port + self.MAX_PORT_ATTEMPTS}")
+    def _dependency_marker(self, server_script: str) -> Path:
+        """
+        Marker file recording that jsonld was found for this install: the
+        server script (path and modification time) and the node executable.
+        """
+        cache_dir = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'jsonld-recursive'
+        try:
+            mtime = os.path.getmtime(server_script)
+        except OSError:
+            mtime = 0
+        key = hashlib.sha256(f"{server_script}:{mtime}:{shutil.which('node')}".encode()).hexdigest()[:16]
+        return cache_dir / f"jsonld-{key}.ok"
+    
+    def _ensure_jsonld_installed(self, server_script: str) -> bool:
+        """
+        Ensure jsonld npm package is installed. Returns True if available.
+        A successful check is remembered per install (see _dependency_marker),
+        so later starts skip spawning node to probe for it.
+        """
+        marker = self._dependency_marker(server_script)
+        if marker.exists():
+            return True
+        available = self._check_jsonld_installed(str(Path(server_script).parent))
+        if available:
+            try:
+                marker.parent.mkdir(parents=True, exist_ok=True)
+                marker.touch()
+            except OSError:
+                pass
+        return available
     
-    def _ensure_jsonld_installed(self, server_script_dir: str) -> bool:
-        """Ensure jsonld npm package is installed. Returns True if available."""
+    def _check_jsonld_installed(self, server_script_dir: str) -> bool:
+        """Check for the jsonld npm package, installing it if missing."""
         # Check if jsonld is available globally or locally
         check_script = '''
         try {
@@ -162,21 +320,80 @@ class LdrClient:
         print("jsonld installed successfully", flush=True)
         return True
     
-    def _start_server(self, port: int = None):
-        """Start the server in background, finding an available port if needed."""
-        # First check if server is already running on default port
-        if self._is_server_running(DEFAULT_PORT):
-            self.port = DEFAULT_PORT
-            self.base_url = f"http://localhost:{self.port}"
-            print(f"Using existing server on port {self.port}", flush=True)
-            return
-        
-        # Find an available port
-        if port is None:
-            port = self._find_available_port(DEFAULT_PORT)
+    def _wait_for_ready(self, ready_fd: int) -> Dict[str, Any]:
+        """
+        Read the server's readiness line from the pipe passed as LDR_READY_FD:
+        {"ready": true, "port": ..., "pid": ...} or {"ready": false, "error": ...}.
+        """
+        deadline = time.monotonic() + self.STARTUP_TIMEOUT
+        data = b''
+        while b'\n' not in data:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([ready_fd], [], [], remaining)[0]:
+                return {"ready": False, "error": f"not ready within {self.STARTUP_TIMEOUT} seconds"}
+            chunk = os.read(ready_fd, 4096)
+            if not chunk:
+                code = self.server_process.wait()
+                return {"ready": False, "error": f"exited with code {code}"}
+            data += chunk
+        return json.loads(data.split(b'\n', 1)[0])
+    
+    def _wait_for_health(self) -> Dict[str, Any]:
+        """Poll /health until the server answers (where no readiness pipe can be passed)."""
+        deadline = time.monotonic() + self.STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self._is_server_running():
+                return {"ready": True, "port": None if self.socket_path else self.port}
+            time.sleep(0.05)
+        return {"ready": False, "error": f"not ready within {self.STARTUP_TIMEOUT} seconds"}
+    
+    def _launch(self, server_script: str, env: Dict[str, str]) -> Dict[str, Any]:
+        """Spawn ldr-server.js and wait for it to report readiness."""
+        # Use DEVNULL (not PIPE) for stdio so the server is not tied to this
+        # process's pipe lifecycle — PIPE causes the node process to get
+        # SIGHUP/die when the parent Python process exits. Readiness comes
+        # over a separate pipe the server closes once it has written to it.
+        popen_args = dict(stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+        if os.name == 'nt':
+            self.server_process = subprocess.Popen(['node', server_script], env=env, **popen_args)
+            return self._wait_for_health()
         
-        self.port = port
-        self.base_url = f"http://localhost:{self.port}"
+        ready_fd, write_fd = os.pipe()
+        env['LDR_READY_FD'] = str(write_fd)
+        try:
+            self.server_process = subprocess.Popen(['node', server_script], env=env, pass_fds=(write_fd,), **popen_args)
+        finally:
+            os.close(write_fd)
+        try:
+            status = self._wait_for_ready(ready_fd)
+        finally:
+            os.close(ready_fd)
+        if not status.get('ready') and self.server_process.poll() is None:
+            self.server_process.terminate()
+        return status
+    
+    def _start_server(self, port: int = None):
+        """
+        Start the server in background and wait for its readiness handshake.
+        It listens on DEFAULT_PORT if free, otherwise on a port the OS picks,
+        and receives the initial mappings at launch.
+        """
+        if self.socket_path:
+            # No port to share or probe: the socket path is the address
+            port = None
+        else:
+            # Check for a server already running on the default port
+            # (__init__ has already probed self.port)
+            if self.port != DEFAULT_PORT and self._is_server_running(DEFAULT_PORT):
+                self.port = DEFAULT_PORT
+                self.base_url = f"http://localhost:{self.port}"
+                print(f"Using existing server on port {self.port}", flush=True)
+                if self.initial_mappings:
+                    self.set_mappings(self.initial_mappings)
+                return
+            
+            if port is None:
+                port = 0 if self._is_port_in_use(DEFAULT_PORT) else DEFAULT_PORT
         
         # Find the server script first (preferred method - more reliable)
         server_script = self._find_server_script()
@@ -192,16 +409,25 @@ class LdrClient:
                 )
             
             # Ensure jsonld is installed
-            self._ensure_jsonld_installed(server_script_dir)
-            
-            print(f"Starting LDR server on port {port}...", flush=True)
+            self._ensure_jsonld_installed(server_script)
             
             env = os.environ.copy()
-            env['PORT'] = str(port)
+            if self.socket_path:
+                print(f"Starting LDR server on {self.socket_path}...", flush=True)
+                env['SOCKET_PATH'] = self.socket_path
+            else:
+                print(f"Starting LDR server on {f'port {port}' if port else 'a free port'}...", flush=True)
+                env['PORT'] = str(port)
             
             if self.mappings_file:
                 env['MAPPINGS_FILE'] = self.mappings_file
             
+            if self.initial_mappings:
+                env['MAPPINGS_JSON'] = json.dumps(self.initial_mappings)
+            
+            if self.cache_file:
+                env['CACHE_FILE'] = os.path.abspath(self.cache_file)
+            
             # Set NODE_PATH to help find jsonld module
             node_paths = [
                 os.path.join(server_script_dir, 'node_modules'),  # Local to script
@@ -216,53 +442,65 @@ class LdrClient:
                 node_paths.insert(0, existing_node_path)
             env['NODE_PATH'] = os.pathsep.join(node_paths)
             
-            # Start server in background with Popen
-            # Use DEVNULL (not PIPE) so the server is not tied to this process's
-            # pipe lifecycle — PIPE causes the node process to get SIGHUP/die
-            # when the parent Python process exits.
-            self.server_process = subprocess.Popen(
-                ['node', server_script],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                env=env,
-                start_new_session=True
-            )
+            status = self._launch(server_script, env)
             
-            self.server_pid = self.server_process.pid
-            self.auto_started = True
+            # Lost the default port to another process in the meantime
+            if not status.get('ready') and port and 'EADDRINUSE' in status.get('error', ''):
+                env['PORT'] = '0'
+                status = self._launch(server_script, env)
             
-            # Wait for server to start. Since we use DEVNULL for stdio,
-            # we can't read stderr — just poll the health endpoint.
-            for i in range(20):
-                time.sleep(0.5)
-                if self._is_server_running():
-                    print(f"Server started (PID: {self.server_pid})", flush=True)
-                    return
+            # jsonld was removed since the check was remembered: check (and install) again
+            if not status.get('ready') and 'jsonld' in status.get('error', ''):
+                try:
+                    self._dependency_marker(server_script).unlink()
+                except FileNotFoundError:
+                    pass
+                if self._ensure_jsonld_installed(server_script):
+                    status = self._launch(server_script, env)
+            
+            if not status.get('ready'):
+                raise RuntimeError(f"Server failed to start: {status.get('error')}")
             
-            raise RuntimeError("Server failed to start within 10 seconds")
+            self.server_pid = self.server_process.pid
+            self.auto_started = True
+            if not self.socket_path:
+                self.port = status['port']
+                self.base_url = f"http://localhost:{self.port}"
+            print(f"Server started (PID: {self.server_pid})", flush=True)
+            return
         
-        # Fallback: try global ldr command
+        # Fallback: try global ldr command, which returns once the server is ready
         if shutil.which('ldr'):
+            if not self.socket_path and not port:
+                with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+                    s.bind(('localhost', 0))
+                    port = s.getsockname()[1]
             print(f"Starting LDR server on port {port} (using global ldr command)...", flush=True)
             
+            cmd = ['ldr', 'server', 'start']
+            if self.socket_path:
+                cmd += ['--socket', self.socket_path]
+            else:
+                cmd.append(str(port))
+                self.port = port
+                self.base_url = f"http://localhost:{self.port}"
+            if self.initial_mappings:
+                cmd.append(json.dumps(self.initial_mappings))
+            
             # Use DEVNULL so the ldr CLI process (and the node server it spawns)
             # are not tied to this Python process's pipe lifecycle.
-            self.server_process = subprocess.Popen(
+            result = subprocess.run(
                 cmd,
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL,
-                start_new_session=True
+                timeout=self.STARTUP_TIMEOUT + 5
             )
+            if result.returncode != 0:
+                raise RuntimeError("Server failed to start (ldr server start exited with an error)")
             
             self.auto_started = True
-            
-            for i in range(20):
-                time.sleep(0.5)
-                if self._is_server_running():
-                    print(f"Server started on port {port}", flush=True)
-                    return
-            
-            raise RuntimeError("Server failed to start within 10 seconds")
+            print(f"Server started on {self.socket_path or f'port {port}'}", flush=True)
+            return
         
         raise RuntimeError(
             "Could not find ldr-server.js or ldr command. "
@@ -329,13 +567,15 @@ class LdrClient:
             ...     "https://old.com/data": "https://new.com/data"
             ... })
         """
+        if self.engine is not None:
+            return self.engine.set_mappings(mappings)
         response = self.session.post(
             f"{self.base_url}/mappings",
             json={"mappings": mappings},
             timeout=self.timeout
         )
         response.raise_for_status()
-        return response.json()
+        return self._decode(response)
     
     def load_mappings(self, file_path: str) -> Dict[str, Any]:
         """
@@ -347,48 +587,64 @@ class LdrClient:
         Example:
             >>> client.load_mappings("mappings.json")
         """
+        if self.engine is not None:
+            return self.engine.load_mappings(file_path)
         response = self.session.post(
             f"{self.base_url}/mappings",
             json={"file": file_path},
             timeout=self.timeout
         )
         response.raise_for_status()
-        return response.json()
+        return self._decode(response)
     
     def get_mappings(self) -> Dict[str, str]:
         """Get current URL mappings."""
+        if self.engine is not None:
+            return dict(self.engine.mappings)
         response = self.session.get(
             f"{self.base_url}/mappings",
             timeout=self.timeout
         )
         response.raise_for_status()
-        return response.json()['mappings']
+        return self._decode(response)['mappings']
     
     def clear_mappings(self) -> int:
         """Clear URL mappings."""
+        if self.engine is not None:
+            return self.engine.clear_mappings()
         response = self.session.delete(
             f"{self.base_url}/mappings",
             timeout=self.timeout
         )
         response.raise_for_status()
-        return response.json()['cleared']
+        return self._decode(response)['cleared']
     
     def health(self) -> Dict[str, Any]:
         """Check server health."""
+        if self.engine is not None:
+            return {
+                "status": "ok",
+                "engine": "local",
+                "cache_size": len(self.engine.results),
+                "mappings_count": len(self.engine.mappings)
+            }
         response = self.session.get(
             f"{self.base_url}/health",
             timeout=self.timeout
         )
         response.raise_for_status()
-        return response.json()
+        return self._decode(response)
     
     def expand(
         self, 
         url: str, 
         depth: int = 2,
-        verbose: bool = True
+        verbose: bool = True,
+        diagnose: bool = True
     ) -> Dict[str, Any]:
         """Expand a JSON-LD document recursively."""
+        if self.engine is not None:
+            return self.engine.expand(url, depth)
         try:
             response = self.session.post(
                 f"{self.base_url}/expand",
@@ -396,7 +652,7 @@ class LdrClient:
                 timeout=self.timeout
             )
             response.raise_for_status()
-            data = response.json()
+            data = self._decode(response)
             
             if verbose:
                 if data.get('cached'):
@@ -407,16 +663,20 @@ class LdrClient:
             return data['result']
         except Exception as e:
             # On failure, check if URL exists and provide helpful debug
-            self._diagnose_failure(url, "expand", e)
+            if diagnose:
+                self._diagnose_failure(url, "expand", e)
             raise
     
     def compact(
         self, 
         url: str, 
         depth: int = 2,
-        verbose: bool = True
+        verbose: bool = True,
+        diagnose: bool = True
     ) -> Dict[str, Any]:
         """Expand and compact a JSON-LD document recursively."""
+        if self.engine is not None:
+            return self.engine.compact(url, depth)
         try:
             response = self.session.post(
                 f"{self.base_url}/compact",
@@ -424,7 +684,7 @@ class LdrClient:
                 timeout=self.timeout
             )
             response.raise_for_status()
-            data = response.json()
+            data = self._decode(response)
             
             if verbose:
                 if data.get('cached'):
@@ -435,9 +695,125 @@ class LdrClient:
             return data['result']
         except Exception as e:
             # On failure, check if URL exists and provide helpful debug
-            self._diagnose_failure(url, "compact", e)
+            if diagnose:
+                self._diagnose_failure(url, "compact", e)
             raise
     
+    def trace(self, url: str, depth: int = 2, operation: str = "compact") -> Dict[str, Any]:
+        """
+        Run an operation with tracing, bypassing the server's result cache.
+        
+        Returns the full response: result, plus a trace tree of every URL
+        visited (mapped target, depth, ms, document loads with bytes and
+        cache status, errors). Summarize it with summarize_trace(). If the
+        operation fails, result is None and trace['error'] says why.
+        
+        Example:
+            >>> from jsonld_recursive import summarize_trace
+            >>> response = client.trace("cmip7:experiment/graph.jsonld", depth=4)
+            >>> summarize_trace(response['trace'])['slowest'][:3]
+        """
+        if self.engine is not None:
+            raise RuntimeError("Tracing requires the server; it is not available with local_engine=True")
+        response = self.session.post(
+            f"{self.base_url}/{operation}",
+            json={"url": url, "depth": depth, "trace": True},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return self._decode(response)
+    
+    def _iter_operation(self, operation: str, url: str, depth: int) -> Iterator[Any]:
+        """Stream an operation's result from the server as NDJSON, one node per line."""
+        if self.engine is not None:
+            result = getattr(self.engine, operation)(url, depth)
+            yield from (result if isinstance(result, list) else [result])
+            return
+        
+        with self.session.post(
+            f"{self.base_url}/{operation}",
+            json={"url": url, "depth": depth},
+            headers={'Accept': 'application/x-ndjson'},
+            timeout=self.timeout,
+            stream=True
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(chunk_size=64 * 1024):
+                if line:
+                    yield json.loads(line)
+    
+    def iter_compact(self, url: str, depth: int = 2) -> Iterator[Any]:
+        """
+        Compact a JSON-LD document recursively, yielding the members of the
+        result (its @graph nodes) one at a time as they arrive.
+        
+        Unlike compact(), the whole result is never held in memory at once,
+        so very large graphs can be processed with bounded memory.
+        
+        Example:
+            >>> for node in client.iter_compact("cmip7:vocab/graph.jsonld", depth=2):
+            ...     index[node['@id']] = node.get('label')
+        """
+        return self._iter_operation("compact", url, depth)
+    
+    def iter_expand(self, url: str, depth: int = 2) -> Iterator[Any]:
+        """Expand a JSON-LD document recursively, yielding result members one at a time."""
+        return self._iter_operation("expand", url, depth)
+    
+    def context(
+        self,
+        url: str,
+        depth: int = 2,
+        output: Optional[str] = None,
+        verbose: bool = True
+    ) -> Any:
+        """
+        Compile the @context of a JSON-LD document into one self-contained context.
+        
+        Referenced, imported and scoped contexts are loaded and inlined (relative
+        references resolved against the document referencing them), up to depth
+        documents deep counting url itself. The server caches the result; asking
+        again for a context this client already holds only checks its fingerprint,
+        so an unchanged context is not sent again.
+        
+        Args:
+            url: Document (or context document) URL or path
+            depth: 1 returns url's own @context with references made absolute,
+                each extra level inlines one more level of referenced contexts
+            output: Also write it as a context document ({"@context": ...}) to
+                this path, which downstream jobs can reference instead of the
+                original context without resolving anything
+        
+        Example:
+            >>> client.context("cmip7:experiment/graph.jsonld", depth=3, output="context.jsonld")
+        """
+        key = (url, depth)
+        if self.engine is not None:
+            context = self.engine.context(url, depth)
+        else:
+            payload: Dict[str, Any] = {"url": url, "depth": depth}
+            if key in self._contexts:
+                payload["fingerprint"] = self._contexts[key][0]
+            response = self.session.post(f"{self.base_url}/context", json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            data = self._decode(response)
+            
+            if verbose:
+                status = "Cache HIT" if data.get('cached') else "Cache MISS"
+                unchanged = ", unchanged" if data.get('unchanged') else ""
+                print(f"[{status}{unchanged}] context {url} (depth={depth})", flush=True)
+            
+            if data.get('unchanged'):
+                context = self._contexts[key][1]
+            else:
+                context = data['result']
+                self._contexts[key] = (data['fingerprint'], context)
+        
+        if output:
+            with open(output, 'w') as f:
+                json.dump({"@context": context}, f, indent=2)
+        return context
+    
     def _diagnose_failure(self, url: str, operation: str, error: Exception) -> None:
         """Diagnose why an operation failed."""
         print(f"\n{'!'*60}", flush=True)
@@ -474,12 +850,20 @@ class LdrClient:
             else:
                 print(f"  Load Error: {load_result.get('error')}", flush=True)
             
-            # If file exists but processing fails, try a single request without retry to get actual error
-            if resolve_result.get('exists'):
+            # If file exists but processing fails, run it once more at depth 1 to get the actual error
+            if resolve_result.get('exists') and self.engine is not None:
+                print(f"\nEngine Error Details:", flush=True)
+                try:
+                    self.engine.run(operation, url, 1)
+                    print(f"  Succeeded at depth 1", flush=True)
+                except Exception as engine_err:
+                    print(f"  Error: {engine_err}", flush=True)
+            elif resolve_result.get('exists'):
                 print(f"\nServer Error Details:", flush=True)
                 try:
-                    # Make request without retries to see actual error
-                    single_response = requests.post(
+                    # Make request without retries to see actual error (through
+                    # this client's adapters, so a socket client reaches its server)
+                    single_response = self._fail_fast_session.post(
                         f"{self.base_url}/{operation}",
                         json={"url": url, "depth": 1},
                         timeout=30
@@ -494,51 +878,264 @@ class LdrClient:
         
         print(f"{'!'*60}\n", flush=True)
     
+    def iter_batch(
+        self,
+        urls: List[str],
+        depth: int = 2,
+        operation: str = "compact",
+        concurrency: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Expand or compact many URLs in one request, yielding results as the
+        server completes them (not in input order).
+        
+        Each item has:
+        - index: Position of the URL in `urls`
+        - url: The requested URL
+        - result, cached: On success
+        - error: Error message if that URL failed
+        
+        With local_engine=True the URLs are processed in-process, in order.
+        
+        Example:
+            >>> for item in client.iter_batch(urls, depth=3):
+            ...     print(item['url'], 'error' in item)
+        """
+        if self.engine is not None:
+            for index, url in enumerate(urls):
+                item: Dict[str, Any] = {"index": index, "url": url, "operation": operation}
+                try:
+                    item.update(self.engine.run(operation, url, depth))
+                except Exception as e:
+                    item["error"] = str(e)
+                yield item
+            return
+        
+        payload: Dict[str, Any] = {
+            "items": [{"url": url, "depth": depth, "operation": operation} for url in urls]
+        }
+        if concurrency:
+            payload["concurrency"] = concurrency
+        
+        with self.session.post(
+            f"{self.base_url}/batch",
+            json=payload,
+            timeout=self.timeout,
+            stream=True
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+    
     def compact_batch(
         self,
         urls: List[str],
         depth: int = 2,
-        verbose: bool = True
-    ) -> List[Dict[str, Any]]:
-        """Compact multiple URLs."""
-        results = []
-        for i, url in enumerate(urls):
+        verbose: bool = True,
+        max_workers: Optional[int] = None,
+        return_errors: bool = False
+    ) -> List[Any]:
+        """
+        Compact multiple URLs. Results keep the order of urls.
+        
+        By default all URLs go to the server in one streamed /batch request.
+        With max_workers (or against a server without /batch) they are sent as
+        individual /compact requests from a thread pool that shares this
+        client's connection pool. These are not retried, so a failing URL
+        fails at once instead of backing off.
+        
+        Failures never stop the other URLs. They are diagnosed (when verbose)
+        once the batch has finished, then raised as a RuntimeError, or, with
+        return_errors=True, returned in place as the exception.
+        """
+        if self.engine is not None:
+            results = self._compact_batch_threaded(urls, depth, verbose, 1)
+        elif max_workers is None:
+            try:
+                results = self._compact_batch_streamed(urls, depth, verbose)
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code != 404:
+                    raise
+                results = self._compact_batch_threaded(urls, depth, verbose, 8)
+        else:
+            results = self._compact_batch_threaded(urls, depth, verbose, max_workers)
+        
+        failures = [(url, result) for url, result in zip(urls, results) if isinstance(result, Exception)]
+        if verbose:
+            for url, error in failures:
+                self._diagnose_failure(url, "compact", error)
+        if failures and not return_errors:
+            url, error = failures[0]
+            raise RuntimeError(f"compact failed for {len(failures)} of {len(urls)} URLs, first {url}: {error}")
+        return results
+    
+    def _compact_batch_streamed(self, urls: List[str], depth: int, verbose: bool) -> List[Any]:
+        """Compact through POST /batch, placing errors in their result slot."""
+        results: List[Any] = [None] * len(urls)
+        for done, item in enumerate(self.iter_batch(urls, depth), 1):
             if verbose:
-                print(f"Processing {i+1}/{len(urls)}: {url}")
-            result = self.compact(url, depth, verbose=verbose)
-            results.append(result)
+                status = "Cache HIT" if item.get('cached') else "Done"
+                print(f"[{status}] {done}/{len(urls)}: {item.get('url')}", flush=True)
+            if 'error' in item:
+                results[item['index']] = RuntimeError(item['error'])
+            else:
+                results[item['index']] = item['result']
+        return results
+    
+    def _compact_batch_threaded(self, urls: List[str], depth: int, verbose: bool, max_workers: int) -> List[Any]:
+        """Compact with one /compact request per URL from a thread pool, placing errors in their result slot."""
+        if self.pool_size < max_workers:
+            self._mount_adapter(max_workers)
+        
+        results: List[Any] = [None] * len(urls)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(self._compact_once, url, depth): index
+                for index, url in enumerate(urls)
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    results[index] = e
+                if verbose:
+                    status = "Failed" if isinstance(results[index], Exception) else "Done"
+                    print(f"[{status}] {done}/{len(urls)}: {urls[index]}", flush=True)
         return results
     
+    def _compact_once(self, url: str, depth: int) -> Any:
+        """Compact one URL of a batch, without retries."""
+        if self.engine is not None:
+            return self.engine.compact(url, depth)
+        response = self._fail_fast_session.post(
+            f"{self.base_url}/compact",
+            json={"url": url, "depth": depth},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return self._decode(response)['result']
+    
     def cache_stats(self) -> Dict[str, Any]:
         """Get cache statistics."""
+        if self.engine is not None:
+            return self.engine.cache_stats()
         response = self.session.get(
             f"{self.base_url}/cache/stats",
             timeout=self.timeout
         )
         response.raise_for_status()
-        return response.json()
+        return self._decode(response)
     
     def cache_list(self) -> Dict[str, Any]:
         """List cached URLs."""
+        if self.engine is not None:
+            return self.engine.cache_list()
         response = self.session.get(
             f"{self.base_url}/cache/list",
             timeout=self.timeout
         )
         response.raise_for_status()
-        return response.json()
+        return self._decode(response)
     
     def cache_clear(self) -> int:
         """Clear the cache."""
+        if self.engine is not None:
+            cleared = self.engine.cache_clear()
+            print(f"Cache cleared: {cleared} entries removed", flush=True)
+            return cleared
         response = self.session.delete(
             f"{self.base_url}/cache",
             timeout=self.timeout
         )
         response.raise_for_status()
-        data = response.json()
+        data = self._decode(response)
         cleared = data['cleared']
         print(f"Cache cleared: {cleared} entries removed", flush=True)
         return cleared
     
+    def cache_invalidate(
+        self,
+        url: Union[str, List[str], None] = None,
+        path: Union[str, List[str], None] = None,
+        stale: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Drop only the cached results built from the given source documents.
+        
+        Args:
+            url: Document URL(s), resolved through the current mappings
+            path: Local file path(s)
+            stale: Also drop results built from local files that changed
+                (or disappeared) since they were loaded
+        
+        Returns:
+            {"invalidated": count, "keys": [cache keys], "documents": [documents]}
+        """
+        if self.engine is not None:
+            data = self.engine.cache_invalidate(url, path, stale)
+        else:
+            payload: Dict[str, Any] = {"stale": stale}
+            if url:
+                payload["url"] = url
+            if path:
+                payload["path"] = path
+            response = self.session.post(
+                f"{self.base_url}/cache/invalidate",
+                json=payload,
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            data = self._decode(response)
+        print(f"Cache invalidated: {data['invalidated']} entries removed", flush=True)
+        return data
+    
+    def cache_export(self, path: str) -> Dict[str, Any]:
+        """
+        Write a checksummed snapshot of the server's result cache and loaded
+        remote documents to path, for priming other servers with cache_import().
+        
+        Returns:
+            {"results": count, "documents": count, "bytes": snapshot size}
+        """
+        if self.engine is not None:
+            raise RuntimeError("Cache snapshots require the server; they are not available with local_engine=True")
+        response = self.session.get(f"{self.base_url}/cache/export", timeout=self.timeout)
+        response.raise_for_status()
+        with open(path, 'wb') as f:
+            f.write(response.content)
+        data = {
+            "results": int(response.headers.get('X-LDR-Snapshot-Results', 0)),
+            "documents": int(response.headers.get('X-LDR-Snapshot-Documents', 0)),
+            "bytes": len(response.content)
+        }
+        print(f"Cache exported: {data['results']} results, {data['documents']} documents to {path}", flush=True)
+        return data
+    
+    def cache_import(self, path: str) -> Dict[str, Any]:
+        """
+        Prime the server's caches from a snapshot written by cache_export().
+        Results the server already holds are kept.
+        
+        Returns:
+            {"results": imported, "documents": imported, "skipped": results already cached}
+        """
+        if self.engine is not None:
+            raise RuntimeError("Cache snapshots require the server; they are not available with local_engine=True")
+        with open(path, 'rb') as f:
+            snapshot = f.read()
+        response = self.session.post(
+            f"{self.base_url}/cache/import",
+            data=snapshot,
+            headers={'Content-Type': 'application/octet-stream'},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        data = self._decode(response)
+        print(f"Cache imported: {data['results']} results, {data['documents']} documents from {path}", flush=True)
+        return data
+    
     def resolve(self, url: str) -> Dict[str, Any]:
         """
         Test how a URL gets resolved/mapped by the server.
@@ -552,14 +1149,18 @@ class LdrClient:
         - fileInfo: For local files, size and path info
         - httpStatus: For HTTP URLs, status code
         - error: Any error message
+        
+        With local_engine=True the in-process engine's mappings are used.
         """
+        if self.engine is not None:
+            return self.engine.resolve(url)
         response = self.session.post(
             f"{self.base_url}/resolve",
             json={"url": url},
             timeout=self.timeout
         )
         response.raise_for_status()
-        return response.json()
+        return self._decode(response)
     
     def test_load(self, url: str) -> Dict[str, Any]:
         """
@@ -572,14 +1173,18 @@ class LdrClient:
         - keys: Top-level keys in the document
         - preview: First 500 chars of the document
         - error: Error message if failed
+        
+        With local_engine=True the in-process engine's loader is used.
         """
+        if self.engine is not None:
+            return self.engine.test_load(url)
         response = self.session.post(
             f"{self.base_url}/test-load",
             json={"url": url},
             timeout=self.timeout
         )
         response.raise_for_status()
-        return response.json()
+        return self._decode(response)
     
     def check_url_exists(self, url: str) -> bool:
         """
@@ -633,8 +1238,9 @@ class LdrClient:
         print('='*60 + "\n")
     
     def close(self):
-        """Close the session."""
+        """Close the sessions."""
         self.session.close()
+        self._fail_fast_session.close()
     
     def __enter__(self):
         """Context manager entry."""
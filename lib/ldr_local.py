@@ -0,0 +1,555 @@
+#!/usr/bin/env python3
+"""
+In-process JSON-LD recursive expansion engine.
+
+A pure-Python counterpart of ldr-core.js and the server's document loader,
+for graphs whose documents are local files (usually reached through URL
+mappings). No Node.js server, HTTP hop or re-serialisation is involved.
+
+Requires the optional PyLD dependency:
+    pip install jsonld-recursive[local]
+"""
+
+import json
+import os
+import re
+from collections import OrderedDict
+from urllib.parse import urljoin
+from typing import Dict, Any, List, Optional, Set, Tuple, Union
+
+import requests
+
+try:
+    from pyld import jsonld
+except ImportError:  # Optional dependency
+    jsonld = None
+
+
+MAX_MAPPING_DEPTH = 10
+MAX_RESULTS = 1000        # as CACHE_MAX_ENTRIES on the server
+MAX_DOCUMENTS = 10000     # as DOCUMENT_CACHE_MAX_ENTRIES on the server
+
+
+def _is_remote(url: str) -> bool:
+    return url.startswith('http://') or url.startswith('https://')
+
+
+def _document_key(resolved: str) -> str:
+    """Absolute path of a local document, or the remote URL (see documentKey in ldr-loader.js)."""
+    return resolved if _is_remote(resolved) else os.path.abspath(resolved.replace('file://', ''))
+
+
+def _mtime(document: str) -> Optional[float]:
+    try:
+        return os.path.getmtime(document) * 1000
+    except OSError:
+        return None
+
+
+def _resolve_reference(reference: str, base: str) -> str:
+    """Resolve a relative @context reference against the URL its document was loaded from."""
+    if re.match(r'^[a-z][a-z0-9+.-]*:', reference, re.I):
+        return reference
+    if base.startswith('file://'):
+        return 'file://' + os.path.normpath(os.path.join(os.path.dirname(base[len('file://'):]), reference))
+    return urljoin(base, reference)
+
+
+def _mergeable(context: Any) -> bool:
+    return isinstance(context, dict) and '@protected' not in context and '@propagate' not in context
+
+
+def _merge_contexts(contexts: List[Any]) -> List[Any]:
+    """Merge runs of consecutive context objects, later terms winning."""
+    merged: List[Any] = []
+    for context in contexts:
+        if merged and _mergeable(context) and _mergeable(merged[-1]):
+            merged[-1] = {**merged[-1], **context}
+        else:
+            merged.append(context)
+    return merged
+
+
+class _Expanded:
+    """A document expanded in place (see Expanded in ldr-core.js)."""
+
+    def __init__(self, url: str, value: Any):
+        self.url = url
+        self.value = value
+
+
+class _Cycle:
+    """A link back to a document already on the path (see Cycle in ldr-core.js)."""
+
+    def __init__(self, url: str, depth: int):
+        self.url = url
+        self.depth = depth
+
+
+class _Pending:
+    """A list or object holding _Expanded or _Cycle nodes."""
+
+    def __init__(self, value: Any):
+        self.value = value
+
+
+_UNRESOLVED = (_Expanded, _Cycle, _Pending)
+
+
+def _compile_mapping(pattern: str, replacement: str) -> Tuple[Any, str]:
+    """Compile a wildcard pattern the same way the server does."""
+    regex = re.compile('^' + re.escape(pattern).replace(r'\*', '(.*)') + '$')
+    return regex, replacement
+
+
+class LocalEngine:
+    """
+    Recursively expand and compact JSON-LD documents in-process.
+
+    Mirrors the server: chained wildcard URL mappings, local files loaded as
+    file:// documents so relative @context references resolve, depth limits,
+    per-request subtree memoization and cycle stubs, and a result cache keyed
+    by operation, URL and depth that records the documents each result was
+    built from, for cache_invalidate(). Results and loaded documents are kept
+    least recently used first and bounded by max_results and max_documents.
+    """
+
+    def __init__(
+        self,
+        mappings: Optional[Dict[str, str]] = None,
+        max_results: int = MAX_RESULTS,
+        max_documents: int = MAX_DOCUMENTS
+    ):
+        if jsonld is None:
+            raise ImportError(
+                "The in-process engine requires PyLD. "
+                "Install with: pip install jsonld-recursive[local]"
+            )
+        self.mappings: Dict[str, str] = {}
+        self._wildcards: List[Tuple[Any, str]] = []
+        self._resolved: Dict[str, str] = {}
+        self.max_results = max_results
+        self.max_documents = max_documents
+        self.documents: Dict[str, Dict[str, Any]] = OrderedDict()
+        self.results: Dict[str, Any] = OrderedDict()
+        self.dependencies: Dict[str, Dict[str, Dict[str, Any]]] = {}  # result key -> {document: version}
+        self._collecting: List[Dict[str, Dict[str, Any]]] = []        # dependencies of results being computed
+        self.hits = 0
+        self.misses = 0
+        self._remote_loader = jsonld.requests_document_loader()
+        if mappings:
+            self.set_mappings(mappings)
+
+    # Mappings
+
+    def set_mappings(self, mappings: Dict[str, str]) -> Dict[str, Any]:
+        self.mappings = dict(mappings)
+        self._wildcards = [
+            _compile_mapping(pattern, replacement)
+            for pattern, replacement in self.mappings.items()
+            if '*' in pattern
+        ]
+        self._resolved = {}
+        return {"message": "Mappings set", "count": len(self.mappings), "mappings": self.mappings}
+
+    def load_mappings(self, file_path: str) -> Dict[str, Any]:
+        with open(file_path) as f:
+            result = self.set_mappings(json.load(f))
+        result["message"] = "Mappings loaded"
+        return result
+
+    def clear_mappings(self) -> int:
+        count = len(self.mappings)
+        self.set_mappings({})
+        return count
+
+    def _apply_single_mapping(self, url: str) -> str:
+        if self.mappings.get(url):
+            return self.mappings[url]
+
+        for regex, replacement in self._wildcards:
+            match = regex.match(url)
+            if match:
+                groups = [match.group(0)] + list(match.groups())
+                result = replacement.replace('${rest}', groups[1] if len(groups) > 1 else '')
+                for i, group in enumerate(groups):
+                    result = result.replace(f'${i}', group or '')
+                return result
+        return url
+
+    def apply_mappings(self, url: str) -> str:
+        """Apply mappings repeatedly until the URL stops changing (memoized until mappings change)."""
+        if url in self._resolved:
+            return self._resolved[url]
+        current = url
+        for _ in range(MAX_MAPPING_DEPTH):
+            mapped = self._apply_single_mapping(current)
+            if mapped == current:
+                break
+            current = mapped
+        self._resolved[url] = current
+        return current
+
+    # Loading
+
+    def _record_dependency(self, document: str, version: Dict[str, Any]):
+        for dependencies in self._collecting:
+            dependencies[document] = version
+
+    def document_loader(self, url: str, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """PyLD document loader: mapped local files, falling back to HTTP."""
+        resolved = self.apply_mappings(url)
+        document_key = _document_key(resolved)
+        cached = self.documents.get(document_key)
+        # A local file is read again once it changes, as by the server's loader
+        if (cached is not None and not _is_remote(document_key)
+                and cached['version'].get('mtime') != _mtime(document_key)):
+            del self.documents[document_key]
+            cached = None
+        if cached is not None:
+            self.documents.move_to_end(document_key)
+            self._record_dependency(document_key, cached.get('version', {}))
+            return cached
+
+        # A failed load is a dependency too: the result holds an error stub for it
+        self._record_dependency(document_key, {})
+
+        if _is_remote(resolved):
+            remote = self._remote_loader(resolved, options or {})
+        else:
+            absolute_path = os.path.abspath(resolved.replace('file://', ''))
+            mtime = _mtime(absolute_path)  # before reading: an edit meanwhile is seen later
+            try:
+                with open(absolute_path) as f:
+                    document = json.load(f)
+            except (OSError, ValueError) as e:
+                raise jsonld.JsonLdError(
+                    f"Could not load local file {resolved}: {e}",
+                    'jsonld.LoadDocumentError', code='loading document failed'
+                )
+            remote = {
+                'contextUrl': None,
+                'documentUrl': 'file://' + absolute_path,
+                'document': document,
+                'version': {'mtime': mtime}
+            }
+
+        self._record_dependency(document_key, remote.get('version', {}))
+        self.documents[document_key] = remote
+        while len(self.documents) > self.max_documents:
+            self.documents.popitem(last=False)
+        return remote
+
+    def _options(self, **extra) -> Dict[str, Any]:
+        return dict(documentLoader=self.document_loader, **extra)
+
+    # Recursive expansion (see expandRecursive in ldr-core.js)
+
+    def _expand_recursive(
+        self,
+        url: str,
+        max_depth: int,
+        current_depth: int,
+        visited: Set[str],
+        subtrees: Dict[str, Any]
+    ) -> Any:
+        tree = self._expand_node(url, max_depth, current_depth, visited, subtrees)
+        return self._resolve(tree, max_depth, visited, subtrees)
+
+    def _expand_node(
+        self,
+        url: str,
+        max_depth: int,
+        current_depth: int,
+        visited: Set[str],
+        subtrees: Dict[str, Any]
+    ) -> Any:
+        if current_depth >= max_depth:
+            return {"@id": url}
+        if url in visited:
+            return _Cycle(url, current_depth)
+
+        # Memoized subtrees keep cycles as _Cycle nodes, so they hold wherever they are reused
+        key = f"{max_depth - current_depth}:{url}"
+        if key not in subtrees:
+            try:
+                expanded = jsonld.expand(url, self._options())
+                doc = expanded[0] if isinstance(expanded, list) and len(expanded) == 1 else expanded
+                value = self._process_object(
+                    doc, max_depth, current_depth + 1, visited | {url}, subtrees
+                )
+            except Exception as e:
+                value = {"@id": url, "_error": str(e)}
+            subtrees[key] = _Expanded(url, value)
+        return subtrees[key]
+
+    def _resolve(
+        self,
+        node: Any,
+        max_depth: int,
+        visited: Set[str],
+        subtrees: Dict[str, Any]
+    ) -> Any:
+        """Finish a tree from _expand_node for the path `visited` (see resolveTree)."""
+        if isinstance(node, _Cycle):
+            if node.url in visited:
+                return {"@id": node.url}
+            tree = self._expand_node(node.url, max_depth, node.depth, visited, subtrees)
+            return self._resolve(tree, max_depth, visited, subtrees)
+        if isinstance(node, _Expanded):
+            if node.url in visited:
+                return {"@id": node.url}
+            return self._resolve(node.value, max_depth, visited | {node.url}, subtrees)
+        if not isinstance(node, _Pending):
+            return node
+
+        if isinstance(node.value, list):
+            return [self._resolve(item, max_depth, visited, subtrees) for item in node.value]
+        return {
+            key: self._resolve(value, max_depth, visited, subtrees)
+            for key, value in node.value.items()
+        }
+
+    def _process_object(self, obj: Any, max_depth: int, current_depth: int, visited: Set[str], subtrees: Dict[str, Any]) -> Any:
+        if isinstance(obj, list):
+            processed = [self._process_object(item, max_depth, current_depth, visited, subtrees) for item in obj]
+            if len(processed) == 1:
+                return processed[0]
+            if any(isinstance(item, _UNRESOLVED) for item in processed):
+                return _Pending(processed)
+            return processed
+
+        if not isinstance(obj, dict):
+            return obj
+
+        ref = obj.get('@id')
+        if (len(obj) == 1 and isinstance(ref, str)
+                and (ref.startswith('http') or ref.startswith('file://'))
+                and current_depth < max_depth):
+            return self._expand_node(ref, max_depth, current_depth, visited, subtrees)
+
+        result = {}
+        for key, value in obj.items():
+            if isinstance(value, (list, dict)):
+                result[key] = self._process_object(value, max_depth, current_depth, visited, subtrees)
+            else:
+                result[key] = value
+        if any(isinstance(value, _UNRESOLVED) for value in result.values()):
+            return _Pending(result)
+        return result
+
+    # Operations
+
+    def _cached(self, operation: str, url: str, depth: int, compute) -> Any:
+        key = f"{operation}:{url}:{depth}"
+        if key in self.results:
+            self.results.move_to_end(key)
+            self.hits += 1
+            for document, version in self.dependencies.get(key, {}).items():
+                self._record_dependency(document, version)
+            return self.results[key]
+        self.misses += 1
+        dependencies: Dict[str, Dict[str, Any]] = {}
+        self._collecting.append(dependencies)
+        try:
+            self.results[key] = compute()
+        finally:
+            self._collecting.remove(dependencies)
+        self.dependencies[key] = dependencies
+        result = self.results[key]
+        while len(self.results) > self.max_results:
+            evicted, _ = self.results.popitem(last=False)
+            self.dependencies.pop(evicted, None)
+        return result
+
+    def expand(self, url: str, depth: int = 2) -> Any:
+        return self._cached('expand', url, depth, lambda: self._expand_recursive(url, depth, 0, set(), {}))
+
+    def compact(self, url: str, depth: int = 2) -> Any:
+        def compute():
+            expanded = self.expand(url, depth)
+            # PyLD only accepts absolute IRIs as base: compact a local file against its file:// URL
+            if not _is_remote(self.apply_mappings(url)):
+                document_url = self.document_loader(url)['documentUrl']
+            else:
+                document_url = url
+            compacted = jsonld.compact(expanded, document_url, self._options(base=document_url))
+            return compacted.get('@graph', compacted)
+        return self._cached('compact', url, depth, compute)
+
+    def run(self, operation: str, url: str, depth: int = 2) -> Dict[str, Any]:
+        """Run one /batch item's operation: {"result": ..., "cached": bool}."""
+        if operation not in ('expand', 'compact', 'context'):
+            raise ValueError(f"Unknown operation: {operation}")
+        cached = f"{operation}:{url}:{depth}" in self.results
+        return {"result": getattr(self, operation)(url, depth), "cached": cached}
+
+    # Diagnostics (the server's /resolve and /test-load)
+
+    def resolve(self, url: str) -> Dict[str, Any]:
+        """How url is mapped, and whether the mapped file or URL exists."""
+        resolved = self.apply_mappings(url)
+        is_local = not _is_remote(resolved)
+        exists = False
+        file_info = None
+        http_status = None
+        error = None
+
+        if is_local:
+            absolute_path = _document_key(resolved)
+            try:
+                stat = os.stat(absolute_path)
+                exists = True
+                file_info = {
+                    "path": absolute_path,
+                    "size": stat.st_size,
+                    "isFile": os.path.isfile(absolute_path),
+                    "isDirectory": os.path.isdir(absolute_path)
+                }
+            except OSError as e:
+                error = str(e)
+        else:
+            try:
+                with requests.get(
+                    resolved,
+                    headers={'Accept': 'application/ld+json, application/json'},
+                    timeout=5,
+                    stream=True
+                ) as response:
+                    http_status = {"status": response.status_code, "statusMessage": response.reason}
+                    exists = 200 <= response.status_code < 400
+            except requests.RequestException as e:
+                error = str(e)
+
+        return {
+            "original": url,
+            "resolved": resolved,
+            "changed": url != resolved,
+            "isLocal": is_local,
+            "exists": exists,
+            "fileInfo": file_info,
+            "httpStatus": http_status,
+            "error": error
+        }
+
+    def test_load(self, url: str) -> Dict[str, Any]:
+        """Load url through the document loader without processing it."""
+        try:
+            loaded = self.document_loader(url)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        document = loaded['document'] or {}
+        return {
+            "success": True,
+            "documentUrl": loaded['documentUrl'],
+            "hasContext": '@context' in document,
+            "keys": list(document),
+            "preview": json.dumps(loaded['document'], separators=(',', ':'))[:500] + '...'
+        }
+
+    # Compiled contexts (see compileContext in ldr-context.js)
+
+    def _load_context(self, reference: str) -> Tuple[Any, str]:
+        loaded = self.document_loader(reference)
+        document = loaded['document']
+        if not isinstance(document, dict) or '@context' not in document:
+            raise ValueError(f"No @context in {reference}")
+        return document['@context'], loaded['documentUrl']
+
+    def _compile_entries(self, context: Any, base: str, depth: int, remote: bool) -> List[Any]:
+        entries: List[Any] = []
+        for entry in context if isinstance(context, list) else [context]:
+            if isinstance(entry, str):
+                reference = _resolve_reference(entry, base)
+                if depth < 1:
+                    entries.append(reference)
+                else:
+                    loaded, loaded_base = self._load_context(reference)
+                    entries.extend(self._compile_entries(loaded, loaded_base, depth - 1, True))
+            elif isinstance(entry, dict):
+                entries.append(self._compile_object(entry, base, depth, remote))
+            else:
+                entries.append(entry)
+        return _merge_contexts(entries)
+
+    def _compile_value(self, context: Any, base: str, depth: int, remote: bool) -> Any:
+        entries = self._compile_entries(context, base, depth, remote)
+        return entries[0] if len(entries) == 1 else entries
+
+    def _compile_object(self, context: Dict[str, Any], base: str, depth: int, remote: bool) -> Dict[str, Any]:
+        compiled: Dict[str, Any] = {}
+        for key, value in context.items():
+            if key == '@base' and remote:
+                continue
+            if key == '@import' and isinstance(value, str):
+                if depth < 1:
+                    compiled[key] = _resolve_reference(value, base)
+            elif isinstance(value, dict) and '@context' in value:
+                compiled[key] = {**value, '@context': self._compile_value(value['@context'], base, depth, False)}
+            else:
+                compiled[key] = value
+
+        imported = context.get('@import')
+        if not isinstance(imported, str) or depth < 1:
+            return compiled
+        loaded, loaded_base = self._load_context(_resolve_reference(imported, base))
+        return {**self._compile_object(loaded, loaded_base, depth - 1, True), **compiled}
+
+    def context(self, url: str, depth: int = 2) -> Any:
+        def compute():
+            context, base = self._load_context(url)
+            return self._compile_value(context, base, depth - 1, False)
+        return self._cached('context', url, depth, compute)
+
+    # Cache
+
+    def cache_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.results),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0,
+            "documents": {"size": len(self.documents)}
+        }
+
+    def cache_list(self) -> Dict[str, Any]:
+        return {"count": len(self.results), "urls": list(self.results)}
+
+    def cache_clear(self) -> int:
+        size = len(self.results)
+        self.results.clear()
+        self.dependencies.clear()
+        self.documents.clear()
+        return size
+
+    def _changed_documents(self) -> Set[str]:
+        """Local documents modified (or removed) since a cached result loaded them."""
+        changed = set()
+        for dependencies in self.dependencies.values():
+            for document, version in dependencies.items():
+                if not _is_remote(document) and version.get('mtime') != _mtime(document):
+                    changed.add(document)
+        return changed
+
+    def cache_invalidate(
+        self,
+        url: Union[str, List[str], None] = None,
+        path: Union[str, List[str], None] = None,
+        stale: bool = False
+    ) -> Dict[str, Any]:
+        """Drop the cached results (and documents) built from the given documents."""
+        urls = [url] if isinstance(url, str) else url or []
+        paths = [path] if isinstance(path, str) else path or []
+        documents = {_document_key(self.apply_mappings(u)) for u in urls}
+        documents.update(os.path.abspath(p) for p in paths)
+        if stale:
+            documents |= self._changed_documents()
+
+        keys = [key for key, dependencies in self.dependencies.items() if documents & dependencies.keys()]
+        for key in keys:
+            del self.results[key]
+            del self.dependencies[key]
+        for document in documents & self.documents.keys():
+            del self.documents[document]
+        return {"invalidated": len(keys), "keys": keys, "documents": sorted(documents)}
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Summaries of expansion traces returned by the server's /expand and /compact
+endpoints with {"trace": true} (see LdrClient.trace).
+"""
+
+from collections import defaultdict
+from typing import Dict, Any, Iterator, List, Tuple
+
+
+def _walk(node: Dict[str, Any], path: Tuple[str, ...] = ()) -> Iterator[Tuple[Dict[str, Any], Tuple[str, ...]]]:
+    """Yield every node below the root with the URLs leading to it."""
+    for child in node.get('children', []):
+        child_path = path + (child['url'],)
+        yield child, child_path
+        yield from _walk(child, child_path)
+
+
+def _fetches(trace: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield from trace.get('fetches', [])
+    for node, _ in _walk(trace):
+        yield from node.get('fetches', [])
+
+
+def summarize_trace(trace: Dict[str, Any], top: int = 10) -> Dict[str, Any]:
+    """
+    Summarize a trace tree.
+
+    Returns:
+        - total_ms: Wall time of the whole operation
+        - urls: Number of expanded URLs (excluding cycle stubs and reused subtrees)
+        - slowest: The `top` slowest expanded branches (ms includes their children)
+          with the path of URLs from the root
+        - refetched: Documents loaded more than once, most loads first, with
+          how many loads hit the document cache or joined one in flight
+        - errors: The operation itself, nodes and loads that failed
+
+    Example:
+        >>> response = client.trace("cmip7:experiment/graph.jsonld", depth=4)
+        >>> summary = summarize_trace(response['trace'])
+        >>> for branch in summary['slowest']:
+        ...     print(branch['ms'], ' > '.join(branch['path']))
+    """
+    expanded = []
+    errors = []
+    if trace.get('error'):
+        errors.append({"url": trace.get('url'), "path": [], "error": trace['error']})
+    for node, path in _walk(trace):
+        if node.get('error'):
+            errors.append({"url": node['url'], "path": list(path), "error": node['error']})
+        if 'ms' in node:
+            expanded.append({
+                "url": node['url'],
+                "mapped": node.get('mapped'),
+                "depth": node.get('depth'),
+                "ms": node['ms'],
+                "path": list(path)
+            })
+
+    loads: Dict[str, Dict[str, Any]] = defaultdict(
+        lambda: {"loads": 0, "hit": 0, "shared": 0, "miss": 0, "ms": 0.0, "bytes": 0}
+    )
+    for fetch in _fetches(trace):
+        entry = loads[fetch['resolved']]
+        entry["loads"] += 1
+        entry[fetch.get('cache', 'miss')] += 1
+        entry["ms"] += fetch.get('ms', 0)
+        entry["bytes"] = fetch.get('bytes', entry["bytes"])
+        if fetch.get('error'):
+            errors.append({"url": fetch['url'], "resolved": fetch['resolved'], "error": fetch['error']})
+
+    refetched: List[Dict[str, Any]] = [
+        {"resolved": resolved, **entry, "ms": round(entry["ms"], 2)}
+        for resolved, entry in loads.items()
+        if entry["loads"] > 1
+    ]
+    refetched.sort(key=lambda entry: (entry["loads"], entry["ms"]), reverse=True)
+
+    return {
+        "total_ms": trace.get('ms'),
+        "urls": len(expanded),
+        "slowest": sorted(expanded, key=lambda node: node['ms'], reverse=True)[:top],
+        "refetched": refetched[:top],
+        "errors": errors
+    }
@@ -0,0 +1,170 @@
+"""
+Tests for the server's result cache and request coalescing (LruCache and
+SingleFlight in ldr-cache.js).
+
+Run with:
+    python -m pytest lib/test_cache.py
+"""
+
+CACHE = "const { LruCache } = require('./ldr-cache.js');\n"
+
+
+def test_evicts_least_recently_used_entry(node):
+    result = node(
+        CACHE
+        + """
+        const evicted = [];
+        const cache = new LruCache({ maxEntries: 2, onEvict: key => evicted.push(key) });
+        cache.set('a', 1);
+        cache.set('b', 2);
+        cache.get('a');            // 'b' is now the least recently used
+        cache.set('c', 3);
+        return { keys: cache.keys(), evicted, stats: cache.stats() };
+        """
+    )
+    assert result["keys"] == ["a", "c"]
+    assert result["evicted"] == ["b"]
+    assert result["stats"]["evictions"] == 1
+    assert result["stats"]["hits"] == 1
+
+
+def test_byte_budget(node):
+    result = node(
+        CACHE
+        + """
+        const cache = new LruCache({ maxBytes: 100 });
+        cache.set('a', 'x', 40);
+        cache.set('b', 'y', 40);
+        cache.set('c', 'z', 40);   // over budget: 'a' goes
+        const oversized = cache.set('d', 'big', 101);
+        return { keys: cache.keys(), bytes: cache.bytes, oversized, evictions: cache.evictions };
+        """
+    )
+    assert result["keys"] == ["b", "c"]
+    assert result["bytes"] == 80
+    # Larger than the whole budget: refused without evicting anything else
+    assert result["oversized"] is False
+    assert result["evictions"] == 1
+
+
+def test_replacing_an_entry_updates_its_size(node):
+    result = node(
+        CACHE
+        + """
+        const cache = new LruCache({ maxBytes: 100 });
+        cache.set('a', 'x', 60);
+        cache.set('a', 'y', 30);
+        cache.delete('missing');
+        return { size: cache.size, bytes: cache.bytes, value: cache.peek('a') };
+        """
+    )
+    assert result == {"size": 1, "bytes": 30, "value": "y"}
+
+
+def test_expired_entries_are_evicted(node):
+    result = node(
+        CACHE
+        + """
+        const cache = new LruCache({ ttl: 20 });
+        cache.set('a', 1);
+        const fresh = cache.has('a');
+        await new Promise(resolve => setTimeout(resolve, 40));
+        return { fresh, expired: !cache.has('a'), stats: cache.stats() };
+        """
+    )
+    assert result["fresh"] is True
+    assert result["expired"] is True
+    assert result["stats"]["size"] == 0
+    assert result["stats"]["evictions"] == 1
+    assert result["stats"]["ttl_seconds"] == 0.02
+
+
+FLIGHT = "const { SingleFlight } = require('./ldr-cache.js');\n"
+
+
+def test_single_flight_shares_one_call(node):
+    result = node(
+        FLIGHT
+        + """
+        const flight = new SingleFlight();
+        let calls = 0;
+        const work = () => {
+          calls++;
+          return new Promise(resolve => setTimeout(() => resolve(calls), 10));
+        };
+        const results = await Promise.all([
+          flight.run('k', work), flight.run('k', work), flight.run('other', work)
+        ]);
+        return { results, calls, pending: flight.size };
+        """
+    )
+    assert result["calls"] == 2
+    assert result["results"][0] == result["results"][1]
+    assert result["pending"] == 0
+
+
+def test_single_flight_error_reaches_every_caller_and_is_not_kept(node):
+    result = node(
+        FLIGHT
+        + """
+        const flight = new SingleFlight();
+        let calls = 0;
+        const failing = async () => {
+          calls++;
+          await new Promise(resolve => setTimeout(resolve, 10));
+          throw new Error('boom');
+        };
+        const settled = await Promise.allSettled([
+          flight.run('k', failing), flight.run('k', failing)
+        ]);
+        const pendingAfterFailure = flight.has('k');
+        const retried = await flight.run('k', async () => { calls++; return 'ok'; });
+        const errors = settled.map(s => s.status === 'rejected' && s.reason.message);
+        return { errors, calls, pendingAfterFailure, retried };
+        """
+    )
+    assert result["errors"] == ["boom", "boom"]
+    # The failure is not cached: the next call runs again
+    assert result["pendingAfterFailure"] is False
+    assert result["retried"] == "ok"
+    assert result["calls"] == 2
+
+
+def test_single_flight_synchronous_throw_rejects(node):
+    result = node(
+        FLIGHT
+        + """
+        const flight = new SingleFlight();
+        try {
+          await flight.run('k', () => { throw new Error('sync'); });
+          return null;
+        } catch (error) {
+          return { error: error.message, pending: flight.size };
+        }
+        """
+    )
+    assert result == {"error": "sync", "pending": 0}
+
+
+def test_size_estimate_does_not_serialise(node):
+    result = node(
+        """
+        const { LruCache, estimateSize } = require('./ldr-cache.js');
+        const value = {
+          '@id': 'http://example.org/a',
+          'http://example.org/vocab#link': [{ '@id': 'http://example.org/b' }, { '@value': 'B' }]
+        };
+        const stringify = JSON.stringify;
+        let calls = 0;
+        JSON.stringify = (...args) => (calls++, stringify(...args));
+        const cache = new LruCache();
+        cache.set('a', value);
+        cache.set('b', value, 7);   // a size the caller already has is used as is
+        JSON.stringify = stringify;
+        const sizes = Array.from(cache.map.values(), entry => entry.size);
+        return { calls, sizes, estimate: estimateSize(value), actual: stringify(value).length };
+        """
+    )
+    assert result["calls"] == 0
+    assert result["sizes"] == [result["estimate"], 7]
+    assert abs(result["estimate"] - result["actual"]) <= result["actual"] * 0.1
@@ -0,0 +1,141 @@
+"""
+Tests for compiled contexts and their fingerprints (ldr-context.js).
+
+Documents are served from memory by a stand-in documentLoader, so no server
+or network is needed.
+
+Run with:
+    python -m pytest lib/test_compile_context.py
+"""
+
+import json
+
+DOCUMENTS = {
+    "http://example.org/data.jsonld": {
+        "@context": ["ctx/a.jsonld", {"local": "http://example.org/vocab#local"}],
+        "@id": "http://example.org/data",
+    },
+    "http://example.org/ctx/a.jsonld": {
+        "@context": [
+            "b.jsonld",
+            {"@base": "http://ignored.example/", "name": "http://schema.org/name"},
+        ]
+    },
+    "http://example.org/ctx/b.jsonld": {
+        "@context": {
+            "@import": "c.jsonld",
+            "knows": {"@id": "http://xmlns.com/foaf/0.1/knows", "@context": "c.jsonld"},
+        }
+    },
+    "http://example.org/ctx/c.jsonld": {
+        "@context": {"@vocab": "http://example.org/c#", "knows": "http://example.org/c#knows"}
+    },
+    "http://example.org/protected.jsonld": {
+        "@context": [
+            {"@protected": True, "id": "@id"},
+            {"name": "http://schema.org/name"},
+            {"extra": "http://example.org/extra"},
+        ]
+    },
+    "http://example.org/no-context.jsonld": {"@id": "http://example.org/none"},
+}
+
+
+def compile_in_node(node, body: str):
+    return node(
+        f"""
+        const {{ compileContext, fingerprint }} = require('./ldr-context.js');
+        const documents = {json.dumps(DOCUMENTS)};
+        const documentLoader = async url => {{
+          if (!(url in documents)) throw new Error(`Not found: ${{url}}`);
+          return {{ document: documents[url], documentUrl: url }};
+        }};
+        """
+        + body
+    )
+
+
+def test_depth_one_makes_references_absolute(node):
+    result = compile_in_node(
+        node, "return compileContext(documentLoader, 'http://example.org/data.jsonld', 1);"
+    )
+    assert result == [
+        "http://example.org/ctx/a.jsonld",
+        {"local": "http://example.org/vocab#local"},
+    ]
+
+
+def test_references_imports_and_scoped_contexts_are_inlined(node):
+    result = compile_in_node(
+        node, "return compileContext(documentLoader, 'http://example.org/data.jsonld', 4);"
+    )
+    # One merged object: c (imported by b), b, a without its @base, then the
+    # document's own terms; b's terms override the imported `knows`
+    assert result == {
+        "@vocab": "http://example.org/c#",
+        "knows": {
+            "@id": "http://xmlns.com/foaf/0.1/knows",
+            "@context": {
+                "@vocab": "http://example.org/c#",
+                "knows": "http://example.org/c#knows",
+            },
+        },
+        "name": "http://schema.org/name",
+        "local": "http://example.org/vocab#local",
+    }
+
+
+def test_references_deeper_than_depth_are_left(node):
+    result = compile_in_node(
+        node, "return compileContext(documentLoader, 'http://example.org/data.jsonld', 3);"
+    )
+    # b is loaded at depth 3, so its @import and scoped context stay references
+    assert result["@import"] == "http://example.org/ctx/c.jsonld"
+    assert result["knows"]["@context"] == "http://example.org/ctx/c.jsonld"
+
+
+def test_protected_contexts_are_not_merged(node):
+    result = compile_in_node(
+        node, "return compileContext(documentLoader, 'http://example.org/protected.jsonld', 2);"
+    )
+    assert result == [
+        {"@protected": True, "id": "@id"},
+        {"name": "http://schema.org/name", "extra": "http://example.org/extra"},
+    ]
+
+
+def test_missing_context_is_an_error(node):
+    result = compile_in_node(
+        node,
+        """
+        try {
+          await compileContext(documentLoader, 'http://example.org/no-context.jsonld');
+          return null;
+        } catch (error) {
+          return error.message;
+        }
+        """,
+    )
+    assert result == "No @context in http://example.org/no-context.jsonld"
+
+
+def test_fingerprint_follows_content(node):
+    result = compile_in_node(
+        node,
+        """
+        const url = 'http://example.org/data.jsonld';
+        const first = fingerprint(await compileContext(documentLoader, url, 4));
+        const again = fingerprint(await compileContext(documentLoader, url, 4));
+        const shallow = fingerprint(await compileContext(documentLoader, url, 1));
+        const c = documents['http://example.org/ctx/c.jsonld']['@context'];
+        c['@vocab'] = 'http://example.org/v2#';
+        const changed = fingerprint(await compileContext(documentLoader, url, 4));
+        const shallowChanged = fingerprint(await compileContext(documentLoader, url, 1));
+        return { first, again, changed, shallow, shallowChanged };
+        """,
+    )
+    assert len(result["first"]) == 64
+    assert result["again"] == result["first"]
+    assert result["changed"] != result["first"]
+    # c is not loaded at depth 1, so editing it does not change that fingerprint
+    assert result["shallowChanged"] == result["shallow"]
@@ -0,0 +1,241 @@
+"""
+Tests for the expand/compact engine (createEngine in ldr-engine.js).
+
+A stand-in jsonld package is written to a temporary directory. Like jsonld.js,
+it resolves @context URLs through a ContextResolver (lib/ContextResolver.js)
+whose shared cache is process-wide unless the caller passes its own.
+
+Run with:
+    python -m pytest lib/test_engine.py
+"""
+
+import json
+
+CONTEXT_RESOLVER = """
+module.exports = class ContextResolver {
+  constructor({ sharedCache }) {
+    this.sharedCache = sharedCache;
+  }
+
+  // A context URL is resolved once, with the contexts it references
+  async resolve(context, documentLoader) {
+    if (Array.isArray(context)) {
+      const merged = {};
+      for (const entry of context) Object.assign(merged, await this.resolve(entry, documentLoader));
+      return merged;
+    }
+    if (typeof context !== 'string') return context;
+    let resolved = this.sharedCache.get(context);
+    if (!resolved) {
+      const loaded = await documentLoader(context);
+      resolved = await this.resolve(loaded.document['@context'], documentLoader);
+      this.sharedCache.set(context, resolved);
+    }
+    return resolved;
+  }
+};
+"""
+
+JSONLD = """
+const ContextResolver = require('./ContextResolver.js');
+const processWide = new Map();
+
+const jsonld = module.exports = {
+  documentLoader: null,
+
+  // Terms become IRIs and values become value objects; nothing else
+  async expand(input, options = {}) {
+    const resolver = options.contextResolver || new ContextResolver({ sharedCache: processWide });
+    const { document } = await jsonld.documentLoader(input);
+    const context = await resolver.resolve(document['@context'], jsonld.documentLoader);
+    const node = {};
+    for (const [key, value] of Object.entries(document)) {
+      if (key === '@id') node[key] = value;
+      else if (key !== '@context') node[context[key] || key] = [{ '@value': value }];
+    }
+    return [node];
+  },
+
+  async compact(input, contextUrl, options = {}) {
+    const resolver = options.contextResolver || new ContextResolver({ sharedCache: processWide });
+    const context = await resolver.resolve(contextUrl, jsonld.documentLoader);
+    const terms = Object.fromEntries(Object.entries(context).map(([term, iri]) => [iri, term]));
+    const compacted = { '@context': contextUrl };
+    for (const [key, value] of Object.entries(input)) {
+      compacted[terms[key] || key] = key === '@id' ? value : [].concat(value)[0]['@value'];
+    }
+    return compacted;
+  }
+};
+"""
+
+
+def run_engine(node, tmp_path, body: str):
+    package = tmp_path / "jsonld" / "lib"
+    package.mkdir(parents=True)
+    (package / "index.js").write_text(JSONLD)
+    (package / "ContextResolver.js").write_text(CONTEXT_RESOLVER)
+    base = tmp_path / "base.jsonld"
+    context = tmp_path / "context.jsonld"
+    data = tmp_path / "data.jsonld"
+    base.write_text(json.dumps({"@context": {"label": "http://example.org/label"}}))
+    context.write_text(
+        json.dumps({"@context": [str(base), {"name": "http://example.org/v1#name"}]})
+    )
+    data.write_text(json.dumps({"@context": str(context), "@id": "http://x/a", "name": "A"}))
+    (tmp_path / "other.jsonld").write_text(
+        json.dumps({"@context": str(context), "@id": "http://x/b", "name": "B"})
+    )
+    return node(
+        f"""
+        const fs = require('fs');
+        const {{ createEngine, loadContextResolver }} = require('./ldr-engine.js');
+        const {{ LruCache }} = require('./ldr-cache.js');
+        const {{ MappingResolver }} = require('./ldr-mappings.js');
+        const {{ forgetDocuments, documentKey }} = require('./ldr-loader.js');
+
+        const jsonldPath = {json.dumps(str(package / "index.js"))};
+        const basePath = {json.dumps(str(base))};
+        const contextPath = {json.dumps(str(context))};
+        const dataPath = {json.dumps(str(data))};
+        const otherPath = {json.dumps(str(tmp_path / "other.jsonld"))};
+        const documentCache = new LruCache();
+        const engine = createEngine(require(jsonldPath), {{
+          mappings: new MappingResolver(),
+          documentCache,
+          ContextResolver: loadContextResolver(jsonldPath)
+        }});
+        const editContext = vocab => {{
+          const context = {{ '@context': [basePath, {{ name: vocab }}] }};
+          fs.writeFileSync(contextPath, JSON.stringify(context));
+          forgetDocuments(documentCache, new Set([documentKey(contextPath)]));
+        }};
+        const expandedKeys = async () =>
+          Object.keys((await engine.run('expand', dataPath, 1)).result);
+        """
+        + body
+    )
+
+
+def test_reset_contexts_drops_resolved_contexts(node, tmp_path):
+    result = run_engine(
+        node,
+        tmp_path,
+        """
+        const before = await expandedKeys();
+        editContext('http://example.org/v2#name');
+        const cached = await expandedKeys();
+        engine.resetContexts();
+        const reset = await expandedKeys();
+        return { before, cached, reset };
+        """,
+    )
+    assert result["before"] == ["@id", "http://example.org/v1#name"]
+    # Until reset, the resolved context outlives its document
+    assert result["cached"] == result["before"]
+    assert result["reset"] == ["@id", "http://example.org/v2#name"]
+
+
+def test_compact_resolves_against_the_current_context(node, tmp_path):
+    # As when the server compacts an expansion made elsewhere (a worker)
+    result = run_engine(
+        node,
+        tmp_path,
+        """
+        await engine.run('compact', dataPath, 1);
+        editContext('http://example.org/v2#name');
+        const expanded = { '@id': 'http://x/a', 'http://example.org/v2#name': { '@value': 'A' } };
+        const cached = (await engine.compact(dataPath, expanded)).result;
+        engine.resetContexts();
+        const reset = (await engine.compact(dataPath, expanded)).result;
+        return { cached, reset };
+        """,
+    )
+    assert "http://example.org/v2#name" in result["cached"]
+    assert result["reset"]["name"] == "A"
+
+
+def test_reused_contexts_are_dependencies(node, tmp_path):
+    result = run_engine(
+        node,
+        tmp_path,
+        """
+        await engine.run('compact', dataPath, 1);
+        // other.jsonld uses the contexts data.jsonld resolved, without loading them
+        const names = ({ dependencies }) =>
+          Object.keys(dependencies).map(p => require('path').basename(p)).sort();
+        return {
+          expand: names(await engine.run('expand', otherPath, 1)),
+          compact: names(await engine.run('compact', otherPath, 1))
+        };
+        """,
+    )
+    assert result["expand"] == ["base.jsonld", "context.jsonld", "other.jsonld"]
+    assert result["compact"] == ["base.jsonld", "context.jsonld", "other.jsonld"]
+
+
+def test_operations_do_not_share_jsonlds_process_wide_cache(node, tmp_path):
+    result = run_engine(
+        node,
+        tmp_path,
+        """
+        await expandedKeys();
+        // A second engine on the same jsonld starts with nothing resolved
+        editContext('http://example.org/v2#name');
+        const other = createEngine(require(jsonldPath), {
+          mappings: new MappingResolver(),
+          documentCache: new LruCache(),
+          ContextResolver: loadContextResolver(jsonldPath)
+        });
+        return Object.keys((await other.run('expand', dataPath, 1)).result);
+        """,
+    )
+    assert result == ["@id", "http://example.org/v2#name"]
+
+
+def test_jsonld_without_context_resolver(node, tmp_path):
+    result = run_engine(
+        node,
+        tmp_path,
+        "return loadContextResolver('/nonexistent/jsonld/lib/index.js');",
+    )
+    assert result is None
+
+
+def test_expansions_of_edited_local_files_are_not_reused(node, tmp_path):
+    result = run_engine(
+        node,
+        tmp_path,
+        """
+        const { ExpandedDocumentCache } = require('./ldr-engine.js');
+        const cached = createEngine(require(jsonldPath), {
+          mappings: new MappingResolver(),
+          documentCache: new LruCache(),
+          expandedCache: new ExpandedDocumentCache()
+        });
+        const name = async () => {
+          const { result } = await cached.run('expand', dataPath, 1);
+          return result['http://example.org/v1#name'];
+        };
+        const before = await name();
+        const data = JSON.parse(fs.readFileSync(dataPath, 'utf8'));
+        fs.writeFileSync(dataPath, JSON.stringify({ ...data, name: 'B' }));
+        fs.utimesSync(dataPath, new Date(), new Date(Date.now() + 5000));
+        return { before, after: await name() };
+        """,
+    )
+    assert result["before"] == {"@value": "A"}
+    assert result["after"] == {"@value": "B"}
+
+
+def test_compact_output_keeps_the_document_url_as_context(node, tmp_path):
+    # The document's own @context URL is only used to compact
+    result = run_engine(
+        node,
+        tmp_path,
+        """
+        const { result } = await engine.run('compact', dataPath, 1);
+        return { context: result['@context'], dataPath };
+        """,
+    )
+    assert result["context"] == result["dataPath"]
@@ -0,0 +1,165 @@
+"""
+Tests for recursive expansion (expandRecursive in ldr-core.js).
+
+A stand-in jsonld serves a graph of documents that only link to each other,
+with a configurable delay per document, so the order in which branches
+finish can be forced.
+
+Run with:
+    python -m pytest lib/test_expand.py
+"""
+
+LINK = "http://example.org/vocab#link"
+
+GRAPH = """
+const { expandRecursive, createExpansionState } = require('./ldr-core.js');
+const LINK = 'http://example.org/vocab#link';
+
+// links: url -> [url]; delays: url -> ms before its expansion resolves
+function graphJsonld(links, delays = {}) {
+  const loads = [];
+  return {
+    loads,
+    expand: async url => {
+      loads.push(url);
+      await new Promise(resolve => setTimeout(resolve, delays[url] || 0));
+      return [{ '@id': url, [LINK]: (links[url] || []).map(target => ({ '@id': target })) }];
+    }
+  };
+}
+
+// The tree expandRecursive should produce, built without any memoization
+function reference(links, url, maxDepth, depth = 0, path = new Set()) {
+  if (depth >= maxDepth || path.has(url)) return { '@id': url };
+  const inner = new Set(path).add(url);
+  const children = (links[url] || []).map(target => depth + 1 < maxDepth
+    ? reference(links, target, maxDepth, depth + 1, inner)
+    : { '@id': target });
+  const node = { '@id': url };
+  if (children.length) node[LINK] = children.length === 1 ? children[0] : children;
+  else node[LINK] = [];
+  return node;
+}
+"""
+
+
+def stub(url):
+    return {"@id": url}
+
+
+def test_reused_subtree_is_not_truncated_by_another_paths_cycle(node):
+    # R -> [A, C], A -> B, C -> B, B -> A: B is reached at the same remaining
+    # depth through A (where its link to A is a cycle) and through C (where it
+    # is not); either branch may finish first
+    result = node(
+        GRAPH
+        + """
+        const links = { R: ['A', 'C'], A: ['B'], C: ['B'], B: ['A'] };
+        const prefixed = Object.fromEntries(Object.entries(links).map(
+          ([url, targets]) => [`http://g/${url}`, targets.map(t => `http://g/${t}`)]
+        ));
+        const run = async delays => {
+          const jsonld = graphJsonld(prefixed, delays);
+          return expandRecursive(jsonld, 'http://g/R', 5, 0, new Set(), createExpansionState());
+        };
+        return {
+          viaAFirst: await run({ 'http://g/C': 20 }),
+          viaCFirst: await run({ 'http://g/A': 20 }),
+          expected: reference(prefixed, 'http://g/R', 5)
+        };
+        """
+    )
+    assert result["viaAFirst"] == result["expected"]
+    assert result["viaCFirst"] == result["expected"]
+
+    a_branch, c_branch = result["expected"][LINK]
+    # Through A, B's link back to A is a cycle
+    assert a_branch[LINK][LINK] == stub("http://g/A")
+    # Through C it is not: A is expanded, and its link to B is the cycle
+    assert c_branch[LINK][LINK] == {"@id": "http://g/A", LINK: stub("http://g/B")}
+
+
+def test_matches_unmemoized_expansion_on_random_graphs(node):
+    result = node(
+        GRAPH
+        + """
+        let seed = 7;
+        const random = () => (seed = (seed * 48271) % 2147483647) / 2147483647;
+        const mismatches = [];
+        for (let round = 0; round < 60; round++) {
+          const size = 3 + Math.floor(random() * 5);
+          const urls = Array.from({ length: size }, (_, i) => `http://g/${i}`);
+          const links = {}, delays = {};
+          for (const url of urls) {
+            links[url] = urls.filter(() => random() < 0.4);
+            delays[url] = Math.floor(random() * 4);
+          }
+          const maxDepth = 2 + Math.floor(random() * 4);
+          const jsonld = graphJsonld(links, delays);
+          const actual = await expandRecursive(
+            jsonld, urls[0], maxDepth, 0, new Set(), createExpansionState()
+          );
+          const expected = reference(links, urls[0], maxDepth);
+          if (JSON.stringify(actual) !== JSON.stringify(expected)) {
+            mismatches.push({ links, maxDepth });
+          }
+        }
+        return mismatches.slice(0, 2);
+        """
+    )
+    assert result == []
+
+
+def test_each_document_is_expanded_once_per_request(node):
+    result = node(
+        GRAPH
+        + """
+        const links = {
+          'http://g/R': ['http://g/A', 'http://g/B'],
+          'http://g/A': ['http://g/S'],
+          'http://g/B': ['http://g/S'],
+          'http://g/S': ['http://g/R']
+        };
+        const jsonld = graphJsonld(links);
+        await expandRecursive(jsonld, 'http://g/R', 6, 0, new Set(), createExpansionState());
+        return jsonld.loads.sort();
+        """
+    )
+    assert result == ["http://g/A", "http://g/B", "http://g/R", "http://g/S"]
+
+
+def test_failed_document_becomes_an_error_stub(node):
+    result = node(
+        GRAPH
+        + """
+        const jsonld = graphJsonld({ 'http://g/R': ['http://g/missing'] });
+        const expand = jsonld.expand;
+        jsonld.expand = async url => {
+          if (url === 'http://g/missing') throw new Error('not found');
+          return expand(url);
+        };
+        return expandRecursive(jsonld, 'http://g/R', 3, 0, new Set(), createExpansionState());
+        """
+    )
+    assert result == {
+        "@id": "http://g/R",
+        LINK: {"@id": "http://g/missing", "_error": "not found"},
+    }
+
+
+def test_reference(node):
+    """The reference itself: depth limits and cycle stubs on a small chain."""
+    result = node(GRAPH + "return reference({ a: ['b'], b: ['a'] }, 'a', 5);")
+    assert result == {"@id": "a", LINK: {"@id": "b", LINK: stub("a")}}
+
+
+def test_process_object_defaults_its_state(node):
+    # Callers of the exported processObject from before expansion state existed
+    result = node(
+        """
+        const { processObject } = require('./ldr-core.js');
+        const jsonld = { expand: async url => [{ '@id': url, 'http://x/p': [{ '@value': 1 }] }] };
+        return processObject(jsonld, { 'http://x/link': { '@id': 'http://g/a' } }, 2, 1);
+        """
+    )
+    assert result == {"http://x/link": {"@id": "http://g/a", "http://x/p": {"@value": 1}}}
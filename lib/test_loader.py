@@ -0,0 +1,91 @@
+"""
+Tests for the document loader (createDocumentLoader in ldr-loader.js).
+
+A throwaway HTTP server on a free local port stands in for remote documents.
+
+Run with:
+    python -m pytest lib/test_loader.py
+"""
+
+
+def test_permanent_redirect_targets_follow_mapping_changes(node, tmp_path):
+    local = tmp_path / "new.jsonld"
+    local.write_text('{"from": "local"}')
+    result = node(
+        f"""
+        const http = require('http');
+        const {{ createDocumentLoader }} = require('./ldr-loader.js');
+        const hits = {{ '/old': 0, '/new': 0 }};
+        const server = http.createServer((req, res) => {{
+          hits[req.url]++;
+          if (req.url === '/old') {{
+            res.writeHead(301, {{ Location: '/new' }});
+            res.end();
+          }} else {{
+            res.writeHead(200, {{ 'Content-Type': 'application/ld+json' }});
+            res.end('{{"from": "remote"}}');
+          }}
+        }});
+        await new Promise(resolve => server.listen(0, '127.0.0.1', resolve));
+        const origin = `http://127.0.0.1:${{server.address().port}}`;
+
+        let mappings = {{}};
+        const documentLoader = createDocumentLoader({{ resolveUrl: url => mappings[url] || url }});
+        const load = async () => (await documentLoader(`${{origin}}/old`)).document.from;
+
+        const before = await load();
+        mappings = {{ [`${{origin}}/new`]: {str(local)!r} }};
+        const mapped = await load();
+        const oldHitsWhileRemembered = hits['/old'];
+        documentLoader.forgetRedirects();
+        const forgotten = await load();
+
+        documentLoader.close();
+        server.close();
+        return {{ before, mapped, oldHitsWhileRemembered, oldHits: hits['/old'], forgotten }};
+        """
+    )
+    assert result["before"] == "remote"
+    # The remembered redirect is mapped when used, not when it was recorded
+    assert result["mapped"] == "local"
+    assert result["oldHitsWhileRemembered"] == 1
+    # Forgotten redirects are requested again
+    assert result["oldHits"] == 2
+    assert result["forgotten"] == "local"
+
+
+def test_cached_local_file_is_reloaded_once_changed(node, tmp_path):
+    local = tmp_path / "doc.jsonld"
+    local.write_text('{"version": 1}')
+    result = node(
+        f"""
+        const fs = require('fs');
+        const {{ createDocumentLoader }} = require('./ldr-loader.js');
+        const {{ LruCache }} = require('./ldr-cache.js');
+        const path = {str(local)!r};
+        const loads = [];
+        const documentLoader = createDocumentLoader({{
+          cache: new LruCache(),
+          onLoad: load => loads.push(load.cache)
+        }});
+        const load = async () => (await documentLoader(path)).document.version;
+
+        const first = await load();
+        const unchanged = await load();
+        fs.writeFileSync(path, '{{"version": 2}}');
+        // The edit keeps the size; move the mtime even on coarse-grained filesystems
+        fs.utimesSync(path, new Date(), new Date(Date.now() + 5000));
+        const edited = await load();
+        fs.unlinkSync(path);
+        let missing;
+        try {{
+          await load();
+        }} catch (error) {{
+          missing = error.message;
+        }}
+        return {{ versions: [first, unchanged, edited], loads, missing }};
+        """
+    )
+    assert result["versions"] == [1, 1, 2]
+    assert result["loads"][:3] == ["miss", "hit", "miss"]
+    assert "Could not load local file" in result["missing"]
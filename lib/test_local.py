@@ -0,0 +1,122 @@
+"""
+Tests for the in-process engine (LocalEngine in ldr_local.py).
+
+Documents are files in a temporary directory, reached through a wildcard
+mapping as the engine is normally used.
+
+Run with:
+    python -m pytest lib/test_local.py
+"""
+
+import json
+import os
+
+import pytest
+
+pytest.importorskip("pyld")
+
+from .ldr_local import LocalEngine  # noqa: E402
+
+LINK = "http://example.org/vocab#link"
+
+
+def write_graph(directory, links):
+    """One document per name in `links`, linking to the named documents."""
+    for name, targets in links.items():
+        document = {"@id": f"http://g/{name}", LINK: [{"@id": f"http://g/{t}"} for t in targets]}
+        (directory / f"{name}.jsonld").write_text(json.dumps(document))
+    return LocalEngine({"http://g/*": f"{directory}/${{rest}}.jsonld"})
+
+
+def test_reused_subtree_is_not_truncated_by_another_paths_cycle(tmp_path):
+    # B is reached at the same remaining depth through A, where its link back
+    # to A is a cycle, and through C, where it is not
+    engine = write_graph(tmp_path, {"R": ["A", "C"], "A": ["B"], "C": ["B"], "B": ["A"]})
+    a_branch, c_branch = engine.expand("http://g/R", depth=5)[LINK]
+    assert a_branch == {
+        "@id": "http://g/A",
+        LINK: {"@id": "http://g/B", LINK: {"@id": "http://g/A"}},
+    }
+    assert c_branch == {
+        "@id": "http://g/C",
+        LINK: {"@id": "http://g/B", LINK: {"@id": "http://g/A", LINK: {"@id": "http://g/B"}}},
+    }
+
+
+def test_compact_local_file_by_relative_path(tmp_path, monkeypatch):
+    (tmp_path / "context.jsonld").write_text(
+        json.dumps({"@context": {"name": "http://schema.org/name"}})
+    )
+    (tmp_path / "main.jsonld").write_text(
+        json.dumps({"@context": "./context.jsonld", "@id": "http://x/a", "name": "A"})
+    )
+    monkeypatch.chdir(tmp_path)
+    result = LocalEngine().compact("main.jsonld", depth=1)
+    assert result["name"] == "A"
+    assert result["@context"] == f"file://{tmp_path}/main.jsonld"
+
+
+def test_results_and_documents_are_bounded(tmp_path):
+    engine = write_graph(tmp_path, {name: [] for name in "abcd"})
+    engine.max_results = 2
+    engine.max_documents = 3
+    for name in "abcd":
+        engine.expand(f"http://g/{name}", depth=1)
+    engine.expand("http://g/c", depth=1)  # a hit: c becomes the most recently used
+    engine.expand("http://g/a", depth=1)
+
+    assert list(engine.results) == ["expand:http://g/c:1", "expand:http://g/a:1"]
+    assert list(engine.dependencies) == list(engine.results)
+    assert len(engine.documents) == 3
+
+
+def test_documents_are_keyed_by_document_key(tmp_path, monkeypatch):
+    (tmp_path / "doc.jsonld").write_text(json.dumps({"@id": "http://x/a", "http://x/p": "A"}))
+    monkeypatch.chdir(tmp_path)
+    engine = LocalEngine({"http://g/doc": "doc.jsonld"})
+    # Three spellings of one file: loaded once, as by the server's loader
+    for url in ("http://g/doc", "doc.jsonld", f"file://{tmp_path}/doc.jsonld"):
+        engine.expand(url, depth=1)
+    assert list(engine.documents) == [str(tmp_path / "doc.jsonld")]
+
+    engine.cache_invalidate(path="doc.jsonld")
+    assert not engine.documents
+
+
+def test_edited_local_file_is_read_again(tmp_path):
+    document = tmp_path / "doc.jsonld"
+    document.write_text(json.dumps({"@id": "http://x/a", "http://x/p": "A"}))
+    engine = LocalEngine()
+    assert engine.document_loader(str(document))["document"]["http://x/p"] == "A"
+    document.write_text(json.dumps({"@id": "http://x/a", "http://x/p": "B"}))
+    stat = document.stat()
+    os.utime(document, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5 * 10**9))
+    assert engine.document_loader(str(document))["document"]["http://x/p"] == "B"
+
+
+def test_client_diagnoses_through_the_engine(tmp_path, capsys, monkeypatch):
+    from .ldr_client import LdrClient, requests
+
+    (tmp_path / "a.jsonld").write_text(json.dumps({"@id": "http://g/a", LINK: "x"}))
+    (tmp_path / "bad.jsonld").write_text("{not json")
+    client = LdrClient(local_engine=True, mappings={"http://g/*": f"{tmp_path}/${{rest}}.jsonld"})
+
+    def no_server(*args, **kwargs):
+        raise AssertionError("request sent with local_engine=True")
+
+    monkeypatch.setattr(requests.Session, "request", no_server)
+
+    assert client.resolve("http://g/a")["resolved"] == f"{tmp_path}/a.jsonld"
+    assert client.resolve("http://g/missing")["exists"] is False
+    assert client.test_load("http://g/a")["success"] is True
+    assert "Could not load local file" in client.test_load("http://g/bad")["error"]
+
+    items = list(client.iter_batch(["http://g/a", "http://g/a"], depth=1, operation="expand"))
+    assert [(item["index"], item["cached"]) for item in items] == [(0, False), (1, True)]
+    assert items[0]["result"] == client.expand("http://g/a", depth=1)
+
+    results = client.compact_batch(["http://g/bad"], depth=1, return_errors=True)
+    assert isinstance(results[0], Exception)
+    diagnosis = capsys.readouterr().out
+    assert "Engine Error Details" in diagnosis
+    assert "Could not diagnose" not in diagnosis
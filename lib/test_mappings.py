@@ -0,0 +1,141 @@
+"""
+Tests for the URL mapping resolver (MappingResolver in ldr-mappings.js).
+
+The resolver compiles rules into a prefix trie; it must give exactly the
+results of the original linear scan over the rules, reproduced here as
+`linearApply`.
+
+Run with:
+    python -m pytest lib/test_mappings.py
+"""
+
+import json
+
+RESOLVER = r"""
+const { MappingResolver } = require('./ldr-mappings.js');
+
+// The linear applyMappings the resolver replaced: try each rule in order,
+// exact match first, and apply mappings until the URL stops changing
+function linearApply(urlMappings, url, maxDepth = 10) {
+  function applySingleMapping(url) {
+    if (urlMappings[url]) return urlMappings[url];
+    for (const [pattern, replacement] of Object.entries(urlMappings)) {
+      if (pattern.includes('*')) {
+        const regexPattern = pattern.replace(/[.+?^${}()|[\]\\]/g, '\\$&').replace(/\*/g, '(.*)');
+        const match = url.match(new RegExp('^' + regexPattern + '$'));
+        if (match) {
+          let result = replacement.replace(/\$\{rest\}/g, match[1] || '');
+          for (let i = 0; i < match.length; i++) {
+            result = result.replace(new RegExp(`\\$${i}`, 'g'), match[i] || '');
+          }
+          return result;
+        }
+      }
+    }
+    return url;
+  }
+  let currentUrl = url;
+  for (let depth = 0; depth < maxDepth; depth++) {
+    const nextUrl = applySingleMapping(currentUrl);
+    if (nextUrl === currentUrl) break;
+    currentUrl = nextUrl;
+  }
+  return currentUrl;
+}
+
+console.warn = () => {};
+"""
+
+CHAINED = {
+    "cmip7:*": "https://wcrp-cmip.github.io/CMIP7-CVs/${rest}",
+    "https://wcrp-cmip.github.io/CMIP7-CVs/*": "/data/cvs/${rest}",
+    "https://wcrp-cmip.github.io/*": "https://mirror.example.org/$1",
+    "https://mirror.example.org/*/v*/*": "/mirror/$2/$1/$3",
+    "https://example.org/exact": "cmip7:experiment/graph.jsonld",
+    "https://example.org/*.json": "https://example.org/$1.jsonld",
+    "https://example.org/a*": "https://example.org/b$1",
+    "https://example.org/b*": "https://example.org/a$1",
+    "*": "$0",
+}
+
+URLS = [
+    "cmip7:experiment/graph.jsonld",
+    "https://wcrp-cmip.github.io/CMIP7-CVs/source/x.json",
+    "https://wcrp-cmip.github.io/other/page",
+    "https://mirror.example.org/cvs/v2/tables.json",
+    "https://example.org/exact",
+    "https://example.org/doc.json",
+    "https://example.org/abc",
+    "https://unmapped.test/doc",
+    "cmip7:",
+    "",
+]
+
+
+def test_chained_wildcards_match_linear_scan(node):
+    result = node(
+        RESOLVER
+        + f"""
+        const mappings = {json.dumps(CHAINED)};
+        const urls = {json.dumps(URLS)};
+        const resolver = new MappingResolver();
+        resolver.set(mappings);
+        // Resolve twice so memoized results are checked too
+        const trie = urls.map(url => resolver.resolve(url));
+        const memoized = urls.map(url => resolver.resolve(url));
+        return {{ trie, memoized, linear: urls.map(url => linearApply(mappings, url)) }};
+        """
+    )
+    assert result["trie"] == result["linear"]
+    assert result["memoized"] == result["linear"]
+    assert result["trie"][0] == "/data/cvs/experiment/graph.jsonld"
+    assert result["trie"][4] == "/data/cvs/experiment/graph.jsonld"
+
+
+def test_randomized_rules_match_linear_scan(node):
+    result = node(
+        RESOLVER
+        + """
+        // Small alphabet so prefixes overlap and chains form
+        let seed = 1;
+        const random = () => (seed = (seed * 48271) % 2147483647) / 2147483647;
+        const pick = items => items[Math.floor(random() * items.length)];
+        const word = () => Array.from(
+          { length: 1 + Math.floor(random() * 3) },
+          () => pick(['a', 'b', '/', '.'])
+        ).join('');
+        const mismatches = [];
+        for (let round = 0; round < 200; round++) {
+          const mappings = {};
+          for (let i = 0; i < 6; i++) {
+            const tail = random() < 0.3 ? word() + '*' : '';
+            const pattern = random() < 0.8 ? `${word()}*${tail}` : word();
+            mappings[pattern] = pick(['x${rest}', '$1b', 'a$2/$1', word(), '${rest}.', 'b/$0']);
+          }
+          const resolver = new MappingResolver();
+          resolver.set(mappings);
+          for (let j = 0; j < 20; j++) {
+            const url = word() + word() + word();
+            const expected = linearApply(mappings, url);
+            const actual = resolver.resolve(url);
+            if (actual !== expected) mismatches.push({ mappings, url, expected, actual });
+          }
+        }
+        return mismatches.slice(0, 3);
+        """
+    )
+    assert result == []
+
+
+def test_memo_is_reset_when_mappings_change(node):
+    result = node(
+        RESOLVER
+        + """
+        const resolver = new MappingResolver();
+        resolver.set({ 'http://a.test/*': '/old/${rest}' });
+        const before = resolver.resolve('http://a.test/doc');
+        resolver.set({ 'http://a.test/*': '/new/${rest}' });
+        return [before, resolver.resolve('http://a.test/doc')];
+        """
+    )
+    assert result == ["/old/doc", "/new/doc"]
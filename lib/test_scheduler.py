@@ -0,0 +1,90 @@
+"""
+Tests for the document load scheduler (createScheduler in ldr-core.js).
+
+Run with:
+    python -m pytest lib/test_scheduler.py
+"""
+
+SCHEDULER = """
+const { createScheduler } = require('./ldr-core.js');
+const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+"""
+
+
+def test_concurrency_cap(node):
+    result = node(
+        SCHEDULER
+        + """
+        const scheduler = createScheduler({ concurrency: 2 });
+        let running = 0, peak = 0;
+        const task = async () => { peak = Math.max(peak, ++running); await sleep(10); running--; };
+        await Promise.all([1, 2, 3, 4, 5].map(n => scheduler.run(`http://h${n}.test/`, 0, task)));
+        return { peak, stats: scheduler.stats() };
+        """
+    )
+    assert result["peak"] == 2
+    assert result["stats"]["active"] == 0
+    assert result["stats"]["queued"] == 0
+
+
+def test_per_host_cap(node):
+    result = node(
+        SCHEDULER
+        + """
+        const scheduler = createScheduler({ concurrency: 10, perHost: 1 });
+        const running = {}, peak = {};
+        const task = host => async () => {
+          running[host] = (running[host] || 0) + 1;
+          peak[host] = Math.max(peak[host] || 0, running[host]);
+          await sleep(10);
+          running[host]--;
+        };
+        const urls = [
+          'http://a.test/1', 'http://a.test/2', 'http://a.test/3',
+          'http://b.test/1', 'http://b.test/2'
+        ];
+        await Promise.all(urls.map(url => scheduler.run(url, 0, task(new URL(url).host))));
+        return { peak };
+        """
+    )
+    # One load at a time per host, but the hosts run alongside each other
+    assert result["peak"] == {"a.test": 1, "b.test": 1}
+
+
+def test_shallower_depth_starts_first(node):
+    result = node(
+        SCHEDULER
+        + """
+        const scheduler = createScheduler({ concurrency: 1 });
+        const order = [];
+        const task = name => async () => { order.push(name); await sleep(5); };
+        const blocker = scheduler.run('http://a.test/0', 0, task('blocker'));
+        const queued = [
+          scheduler.run('http://a.test/3', 3, task('depth 3')),
+          scheduler.run('http://b.test/2', 2, task('depth 2')),
+          scheduler.run('http://c.test/1', 1, task('depth 1'))
+        ];
+        await Promise.all([blocker, ...queued]);
+        return order;
+        """
+    )
+    assert result == ["blocker", "depth 1", "depth 2", "depth 3"]
+
+
+def test_failed_task_rejects_and_frees_its_slot(node):
+    result = node(
+        SCHEDULER
+        + """
+        const scheduler = createScheduler({ concurrency: 1, perHost: 1 });
+        const failed = scheduler
+          .run('http://a.test/1', 0, async () => { throw new Error('load failed'); })
+          .then(() => null, error => error.message);
+        const next = scheduler.run('http://a.test/2', 0, async () => 'loaded');
+        const outcome = { failed: await failed, next: await next };
+        await sleep(0);  // the slot is released just after the task settles
+        return { ...outcome, stats: scheduler.stats() };
+        """
+    )
+    assert result["failed"] == "load failed"
+    assert result["next"] == "loaded"
+    assert result["stats"]["active"] == 0
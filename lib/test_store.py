@@ -0,0 +1,256 @@
+"""
+Tests for the cache log (CacheLog) and cache snapshots (writeSnapshot /
+readSnapshot) in ldr-store.js.
+
+Run with:
+    python -m pytest lib/test_store.py
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+
+STORE = """
+const { writeSnapshot, readSnapshot } = require('./ldr-store.js');
+const results = [
+  ['expand:2:http://example.org/a', [{ '@id': 'http://example.org/a' }],
+   { '/data/a.jsonld': { mtime: 1 } }],
+  ['compact:1:http://example.org/b', { '@id': 'http://example.org/b' }]
+];
+const documents = [
+  ['http://example.org/ctx.jsonld',
+   { document: { '@context': {} }, documentUrl: 'http://example.org/ctx.jsonld', bytes: 15 }]
+];
+"""
+
+
+def rejection(node, corrupt: str):
+    """The error readSnapshot throws for a snapshot altered by the `corrupt` snippet."""
+    return node(
+        STORE
+        + f"""
+        const {{ snapshot }} = await writeSnapshot(results, documents);
+        const magicEnd = snapshot.indexOf('\\n');
+        const digestEnd = snapshot.indexOf('\\n', magicEnd + 1);
+        const header = snapshot.subarray(0, digestEnd + 1);
+        const payload = snapshot.subarray(digestEnd + 1);
+        const sha256 = data => require('crypto').createHash('sha256').update(data).digest('hex');
+        const sign = data => Buffer.concat([
+          Buffer.from(`LDR-CACHE-SNAPSHOT 1\\nsha256:${{sha256(data)}}\\n`), data
+        ]);
+        const gzip = text => require('zlib').gzipSync(text);
+        try {{
+          readSnapshot({corrupt});
+          return null;
+        }} catch (error) {{
+          return error.message;
+        }}
+        """
+    )
+
+
+def test_round_trip(node):
+    result = node(
+        STORE
+        + """
+        const written = await writeSnapshot(results, documents);
+        const read = readSnapshot(written.snapshot);
+        const counts = [written.results, written.documents];
+        return { counts, read, expected: { results, documents } };
+        """
+    )
+    assert result["counts"] == [2, 1]
+    # A result without dependencies comes back with none
+    expected = result["expected"]
+    expected["results"][1].append(None)
+    assert result["read"] == expected
+
+
+def test_format(node):
+    """The documented layout, parsed independently of ldr-store.js."""
+    snapshot = base64.b64decode(
+        node(
+            STORE
+            + """
+            const { snapshot } = await writeSnapshot(results, documents);
+            return snapshot.toString('base64');
+            """
+        )
+    )
+    magic, digest, payload = snapshot.split(b"\n", 2)
+    assert magic == b"LDR-CACHE-SNAPSHOT 1"
+    assert digest == b"sha256:" + hashlib.sha256(payload).hexdigest().encode()
+    records = [json.loads(line) for line in gzip.decompress(payload).decode().splitlines()]
+    assert [sorted(record) for record in records] == [
+        ["deps", "k", "v"],
+        ["k", "v"],
+        ["doc", "e"],
+    ]
+
+
+def test_empty_snapshot(node):
+    result = node(
+        STORE
+        + """
+        const written = await writeSnapshot([], []);
+        return readSnapshot(written.snapshot);
+        """
+    )
+    assert result == {"results": [], "documents": []}
+
+
+def test_rejects_other_files(node):
+    assert rejection(node, "Buffer.alloc(0)") == "Not an LDR cache snapshot"
+    assert rejection(node, "Buffer.from('{\"results\": []}\\n')") == "Not an LDR cache snapshot"
+    assert rejection(node, "payload") == "Not an LDR cache snapshot"
+    other_version = "Buffer.concat([Buffer.from('LDR-CACHE-SNAPSHOT 2'), snapshot.subarray(20)])"
+    assert rejection(node, other_version) == "Not an LDR cache snapshot"
+
+
+def test_rejects_damaged_snapshots(node):
+    # Truncated, one payload byte flipped, and another payload under the header
+    truncated = "snapshot.subarray(0, snapshot.length - 5)"
+    assert rejection(node, truncated) == "Snapshot checksum mismatch"
+    flipped = "(() => { const b = Buffer.from(snapshot); b[b.length - 10] ^= 1; return b; })()"
+    assert rejection(node, flipped) == "Snapshot checksum mismatch"
+    assert rejection(node, "Buffer.concat([header, gzip('')])") == "Snapshot checksum mismatch"
+
+
+def test_rejects_well_signed_garbage(node):
+    # A matching checksum does not make the payload a snapshot
+    assert rejection(node, "sign(Buffer.from('not gzip'))").startswith("Corrupt snapshot:")
+    assert rejection(node, "sign(gzip('{\"k\": \"a\", \"v\": 1}\\nnot json\\n'))").startswith(
+        "Corrupt snapshot record 2:"
+    )
+    assert rejection(node, "sign(gzip('{\"other\": 1}\\n'))") == (
+        "Corrupt snapshot record 1: not a result or document"
+    )
+
+
+def cache_log(node, tmp_path, body: str):
+    """Run `body` with `file` (a path in tmp_path) and a live Map `live` of entries."""
+    return node(
+        f"""
+        const fs = require('fs');
+        const {{ CacheLog }} = require('./ldr-store.js');
+        const file = {json.dumps(str(tmp_path / "cache.log"))};
+        const live = new Map();
+        const records = () => fs.readFileSync(file, 'utf8').split('\\n').filter(Boolean).length;
+        const set = (log, key, value) => {{
+          live.set(key, value);
+          log.append(key, value, {{ [`/data/${{key}}.jsonld`]: {{ mtime: 1 }} }});
+        }};
+        const options = {{
+          liveSize: () => live.size,
+          liveEntries: function* () {{
+            for (const [key, value] of live) yield [key, value, {{ [`/data/${{key}}.jsonld`]: {{ mtime: 1 }} }}];
+          }}
+        }};
+        """
+        + body
+    )
+
+
+def test_log_replay(node, tmp_path):
+    result = cache_log(
+        node,
+        tmp_path,
+        """
+        const log = new CacheLog(file);
+        set(log, 'a', 1);
+        set(log, 'b', 2);
+        log.append('c', 3);
+        log.remove('a');
+        log.append('b', 20);
+        await log.close();
+        fs.appendFileSync(file, '{"k": "d", "v"');  // cut short by a crash
+        const replayed = await new CacheLog(file).load();
+        log.clear();
+        log.append('e', 5);
+        await log.close();
+        return { replayed: Object.fromEntries(replayed), cleared: Array.from((await log.load()).keys()) };
+        """,
+    )
+    assert result["replayed"] == {
+        "b": {"value": 20},
+        "c": {"value": 3},
+    }
+    assert result["cleared"] == ["e"]
+
+
+def test_log_keeps_dependencies(node, tmp_path):
+    result = cache_log(
+        node,
+        tmp_path,
+        """
+        const log = new CacheLog(file);
+        set(log, 'a', { '@id': 'http://example.org/a' });
+        await log.close();
+        return Object.fromEntries(await new CacheLog(file).load());
+        """,
+    )
+    assert result == {
+        "a": {"value": {"@id": "http://example.org/a"}, "dependencies": {"/data/a.jsonld": {"mtime": 1}}}
+    }
+
+
+def test_log_compacts_itself_at_runtime(node, tmp_path):
+    result = cache_log(
+        node,
+        tmp_path,
+        """
+        const log = new CacheLog(file, options);
+        for (let i = 0; i < 300; i++) set(log, `k${i % 5}`, i);
+        await log.maybeCompact();
+        await log.close();
+        return { records: records(), replayed: Object.fromEntries(await new CacheLog(file).load()) };
+        """,
+    )
+    # Rewritten at least once: far fewer than the 300 records written
+    assert result["records"] < 150
+    assert {key: entry["value"] for key, entry in result["replayed"].items()} == {
+        "k0": 295,
+        "k1": 296,
+        "k2": 297,
+        "k3": 298,
+        "k4": 299,
+    }
+
+
+def test_writes_during_compaction_are_kept(node, tmp_path):
+    result = cache_log(
+        node,
+        tmp_path,
+        """
+        const log = new CacheLog(file, options);
+        set(log, 'a', 1);
+        set(log, 'b', 2);
+        const compacting = log.compact(options.liveEntries);
+        // While the old log is flushed
+        set(log, 'c', 3);
+        live.delete('a');
+        log.remove('a');
+        await compacting;
+        set(log, 'd', 4);
+        await log.close();
+        const replayed = await new CacheLog(file).load();
+        return { keys: Array.from(replayed.keys()).sort(), leftover: fs.existsSync(`${file}.tmp`) };
+        """,
+    )
+    assert result == {"keys": ["b", "c", "d"], "leftover": False}
+
+
+def test_no_compaction_while_most_records_are_live(node, tmp_path):
+    result = cache_log(
+        node,
+        tmp_path,
+        """
+        const log = new CacheLog(file, options);
+        for (let i = 0; i < 300; i++) set(log, `k${i}`, i);
+        await log.maybeCompact();
+        await log.close();
+        return records();
+        """,
+    )
+    assert result == 300
@@ -0,0 +1,85 @@
+"""
+Tests for the server's response encoding (ldr-wire.js).
+
+The CBOR encoder is checked by decoding its output with cbor2, the library
+the clients use, and comparing with what JSON.stringify makes of the value.
+
+Run with:
+    python -m pytest lib/test_wire.py
+"""
+
+import base64
+
+import pytest
+
+WIRE = "const { encodeCbor, pickEncoding } = require('./ldr-wire.js');\n"
+
+
+def roundtrip(node, values: str):
+    """Encode each of the JavaScript `values` and decode it with cbor2."""
+    cbor2 = pytest.importorskip("cbor2")
+    result = node(
+        WIRE
+        + f"""
+        const values = {values};
+        return values.map(value => ({{
+          cbor: encodeCbor(value).toString('base64'),
+          json: JSON.parse(JSON.stringify(value) ?? 'null')
+        }}));
+        """
+    )
+    return [(cbor2.loads(base64.b64decode(item["cbor"])), item["json"]) for item in result]
+
+
+def test_integer_widths(node):
+    # Each side of every length boundary: 1, 2, 3, 5 and 9 byte heads
+    values = """[0, 23, 24, 255, 256, 65535, 65536, 4294967295, 4294967296,
+        Number.MAX_SAFE_INTEGER, -1, -24, -25, -256, -257, -65537, -4294967297,
+        Number.MIN_SAFE_INTEGER]"""
+    for decoded, expected in roundtrip(node, values):
+        assert decoded == expected
+        assert isinstance(decoded, int)
+
+
+def test_floats_and_non_finite_numbers(node):
+    for decoded, expected in roundtrip(node, "[0.5, -1.25, 1e300, 2 ** 60, NaN, Infinity]"):
+        # Sent as doubles (JSON text would turn 2 ** 60 into a rounded integer);
+        # NaN and Infinity become null as with JSON.stringify
+        assert decoded == (None if expected is None else float(expected))
+
+
+def test_strings(node):
+    values = """['', 'a', 'é', '日本語', '\\u{1F600}', 'x'.repeat(23), 'x'.repeat(24),
+        'y'.repeat(70000)]"""
+    for decoded, expected in roundtrip(node, values):
+        assert decoded == expected
+
+
+def test_json_ld_documents(node):
+    values = """[
+      null, true, false, [], {},
+      { '@id': 'http://example.org/a', '@type': ['T'], 'n': 1,
+        'nested': { 'list': [1, 'two', null] } },
+      Array.from({ length: 300 }, (_, i) => ({ '@id': `http://example.org/${i}`, 'i': i })),
+      Object.fromEntries(Array.from({ length: 30 }, (_, i) => [`key${i}`, i])),
+      { kept: 1, dropped: undefined, fn: () => 1, when: new Date(0) },
+      [undefined, () => 1]
+    ]"""
+    for decoded, expected in roundtrip(node, values):
+        assert decoded == expected
+
+
+def test_pick_encoding(node):
+    result = node(
+        WIRE
+        + """
+        return [
+          pickEncoding('gzip, deflate'),
+          pickEncoding('deflate;q=0.9, gzip;q=0.5'),
+          pickEncoding('br, identity'),
+          pickEncoding('gzip;q=0'),
+          pickEncoding(undefined)
+        ];
+        """
+    )
+    assert result == ["gzip", "deflate", None, None, None]
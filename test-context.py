@@ -24,4 +24,4 @@ with LdrClient(auto_start_server=True) as client:
     print("=" * 60)
     stats = client.cache_stats()
     print(f"Cache size: {stats['size']}")
-    print(f"Cached keys: {stats['keys']}")
+    print(f"Heaviest entries: {stats['heaviest']}")